@@ -0,0 +1,719 @@
+"""
+Fleet Simulation Engine
+=======================
+Keeps the state of every simulated vehicle in columnar NumPy arrays and
+advances the whole fleet in one vectorized step per tick.
+
+Every mutation replaces the column arrays instead of writing into them and
+then publishes an immutable FleetSnapshot. Readers only ever touch a
+snapshot, so they never see a half-updated fleet. Vehicle dicts in the API
+format are only built on demand, for the rows a response actually returns.
+"""
+
+import bisect
+import threading
+import uuid
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from features.route_records import Route
+from features.vehicle_grid import GRID_CELL_DEGREES, VehicleGrid
+
+
+# Status codes stored in the `status` column
+STATUSES = ["On Time", "Delayed 2 min"]
+
+# Per-tick movement and simulation parameters
+POSITION_JITTER = 0.001   # degrees
+SPEED_RANGE = (20, 60)    # km/h
+HEADING_DRIFT = 10        # degrees
+OCCUPANCY_DRIFT = 5
+STATUS_CHANGE_CHANCE = 0.1
+
+# Number of vehicle removals (and moves off a route) remembered for answering "changed since" queries
+REMOVAL_LOG_SIZE = 10000
+
+# Top-level fields of the API vehicle dict, in output order
+VEHICLE_FIELDS = (
+    "id", "route_id", "route_name", "route_number", "type", "position", "speed", "heading",
+    "next_stops", "capacity", "occupancy", "last_updated", "status", "version",
+)
+
+
+class SequentialIds(Sequence):
+    """
+    The ids vehicle_1 ... vehicle_n without holding n strings, for large
+    fleets loaded from disk. Slicing and appending give a plain list.
+    """
+
+    PREFIX = "vehicle_"
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [f"{self.PREFIX}{i + 1}" for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("vehicle row out of range")
+        return f"{self.PREFIX}{index + 1}"
+
+    def __iter__(self):
+        return (f"{self.PREFIX}{i}" for i in range(1, self.count + 1))
+
+    def __add__(self, other):
+        return self[:] + list(other)
+
+    def lexicographic_order(self) -> np.ndarray:
+        """Rows sorted by id as strings (vehicle_1, vehicle_10, vehicle_100, ...), from the numbers alone"""
+        numbers = np.arange(1, self.count + 1, dtype=np.int64)
+        width = len(str(self.count))
+        digits = np.searchsorted(10 ** np.arange(1, width + 1, dtype=np.int64), numbers, side="right") + 1
+        # Left-aligned numbers compare like the digit strings; a prefix sorts before its extensions
+        return np.lexsort((digits, numbers * 10 ** (width - digits)))
+
+    def row_of(self, vehicle_id: str) -> Optional[int]:
+        digits = vehicle_id[len(self.PREFIX):] if vehicle_id.startswith(self.PREFIX) else ""
+        if not (digits.isascii() and digits.isdigit()) or digits[0] == "0":
+            return None
+        row = int(digits) - 1
+        return row if row < self.count else None
+
+
+class _IdsInOrder(Sequence):
+    """ids[order[i]] on access, in place of a sorted copy of the ids"""
+
+    def __init__(self, ids: Sequence, order: np.ndarray):
+        self.ids = ids
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, index):
+        return self.ids[int(self.order[index])]
+
+
+class FleetSimulation:
+    """Columnar vehicle store and vectorized movement simulation"""
+
+    COLUMNS = {
+        "route": np.int32,        # index into the route table
+        "lat": np.float64,
+        "lng": np.float64,
+        "speed": np.int16,
+        "heading": np.int16,
+        "capacity": np.int16,
+        "occupancy": np.int16,
+        "next_stop": np.int32,    # index of the next stop within the route, -1 at terminal
+        "eta_1": np.int16,
+        "eta_2": np.int16,
+        "status": np.int8,
+        "updated_at": np.float64, # unix timestamp
+        "version": np.int64,      # fleet version in which the vehicle last changed
+    }
+
+    def __init__(self, routes: List[Route], seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.structure_version = 0
+        self.removals = ()
+        self.removal_floor = 0
+        self._lock = threading.Lock()
+        self._set_routes(routes)
+
+        self.statuses = list(STATUSES)
+        self.ids: List[str] = []
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.grid = None
+        self._grid_structure = None
+        self.latest = None
+        self._publish()
+
+    # =========================================
+    # ROUTE TABLE
+    # =========================================
+
+    def _set_routes(self, routes: List[Route]):
+        """Flatten route stops into arrays so stops can be addressed by index"""
+        self.routes = routes
+        self.route_index = {route.id: i for i, route in enumerate(routes)}
+
+        self.stop_count = np.array([route.stop_count for route in routes], dtype=np.int32)
+        self.stop_offset = np.zeros(len(routes), dtype=np.int64)
+        if routes:
+            self.stop_offset[1:] = np.cumsum(self.stop_count)[:-1]
+
+        self.stop_names = [name for route in routes for name in route.stop_names]
+        # Each route's packed lat/lng pairs, concatenated into one (stops x 2) block
+        coords = np.concatenate([
+            np.frombuffer(route.coords, dtype=np.float64, count=2 * route.stop_count) for route in routes
+        ]) if routes else np.empty(0)
+        coords = coords.reshape(-1, 2)
+        self.stop_lat = np.ascontiguousarray(coords[:, 0])
+        self.stop_lng = np.ascontiguousarray(coords[:, 1])
+
+        # Routes without stops keep their vehicles parked at the first path point
+        paths = [route.path_coords for route in routes]
+        self.origin_lat = np.array([path[0] if path else 0.0 for path in paths])
+        self.origin_lng = np.array([path[1] if path else 0.0 for path in paths])
+
+    # =========================================
+    # FLEET SETUP
+    # =========================================
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def __len__(self):
+        return self.size
+
+    def spawn(self, min_per_route: int = 2, max_per_route: int = 5):
+        """Place a random number of vehicles on every route"""
+        with self._lock:
+            self._begin_change(structural=True)
+            self._spawn(min_per_route, max_per_route)
+            self._publish()
+
+    def _spawn(self, min_per_route: int, max_per_route: int):
+        rng = self.rng
+        counts = rng.integers(min_per_route, max_per_route + 1, len(self.routes))
+        route = np.repeat(np.arange(len(self.routes), dtype=np.int32), counts)
+        n = len(route)
+
+        stop_count = self.stop_count[route]
+        has_stops = stop_count > 0
+        last_stop = np.maximum(stop_count - 1, 0)
+
+        # Position each vehicle near a random stop along its route
+        stop_index = (rng.random(n) * last_stop).astype(np.int32)
+        flat_index = np.minimum(self.stop_offset[route] + stop_index, max(len(self.stop_lat) - 1, 0))
+        stop_lat = self.stop_lat[flat_index] if len(self.stop_lat) else np.zeros(n)
+        stop_lng = self.stop_lng[flat_index] if len(self.stop_lng) else np.zeros(n)
+        lat = np.where(has_stops, stop_lat + rng.uniform(-0.002, 0.002, n), self.origin_lat[route])
+        lng = np.where(has_stops, stop_lng + rng.uniform(-0.002, 0.002, n), self.origin_lng[route])
+
+        columns = {
+            "route": route,
+            "lat": lat,
+            "lng": lng,
+            "speed": rng.integers(SPEED_RANGE[0], SPEED_RANGE[1] + 1, n),
+            "heading": rng.integers(0, 361, n),
+            "capacity": rng.integers(30, 101, n),
+            "occupancy": rng.integers(10, 81, n),
+            "next_stop": np.where(has_stops, np.minimum(stop_index + 1, last_stop), -1),
+            "eta_1": np.where(has_stops, rng.integers(2, 9, n), 0),
+            "eta_2": np.where(has_stops, rng.integers(10, 21, n), 0),
+            "status": (rng.random(n) < 0.25).astype(np.int8),
+            "updated_at": np.full(n, datetime.now().timestamp()),
+            "version": np.full(n, self.version),
+        }
+
+        start = self.size
+        self.ids = self.ids + [f"vehicle_{start + i + 1}" for i in range(n)]
+        self.columns = {
+            name: np.concatenate([self.columns[name], columns[name].astype(dtype)])
+            for name, dtype in self.COLUMNS.items()
+        }
+
+    def load(self, columns: Dict[str, np.ndarray], ids: Optional[Sequence] = None,
+             statuses: Optional[List[str]] = None, grid: Optional[VehicleGrid] = None):
+        """
+        Replace the whole fleet with saved columns (e.g. a generated scenario
+        or a warm snapshot). Arrays of the right dtype, including
+        memory-mapped ones, are used without copying; ids default to
+        vehicle_1 ... vehicle_n and statuses to STATUSES. A saved grid for
+        the same positions and cell size is reused instead of rebuilt.
+        """
+        with self._lock:
+            size = len(columns["route"])
+            if ids is not None and len(ids) != size:
+                raise ValueError(f"{len(ids)} ids for {size} vehicles")
+            self._begin_change(structural=True)
+            self.columns = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in self.COLUMNS.items()}
+            self.ids = ids if ids is not None else SequentialIds(size)
+            self.statuses = list(statuses or STATUSES)
+            if grid is not None and len(grid) == size and grid.cell_size == GRID_CELL_DEGREES:
+                self.grid = grid
+                self._grid_structure = self.structure_version
+            self._publish()
+
+    def add(self, vehicle: Dict) -> int:
+        """Append a vehicle given in API dict format. Returns its row."""
+        with self._lock:
+            if self.latest.row_of(vehicle["id"]) is not None:
+                raise ValueError(f"Vehicle {vehicle['id']} already exists")
+            if vehicle["route_id"] not in self.route_index:
+                raise ValueError(f"Route {vehicle['route_id']} not found")
+            self._begin_change(structural=True)
+            row = self._add(vehicle)
+            self._publish()
+            return row
+
+    def _add(self, vehicle: Dict) -> int:
+        route = self.route_index[vehicle["route_id"]]
+        next_stops = vehicle.get("next_stops") or []
+        next_stop = self._find_stop(route, next_stops[0]["name"]) if next_stops else -1
+        status = vehicle.get("status", self.statuses[0])
+        if status not in self.statuses:
+            self.statuses.append(status)
+        updated_at = vehicle.get("last_updated")
+
+        row_values = {
+            "route": route,
+            "lat": vehicle["position"]["lat"],
+            "lng": vehicle["position"]["lng"],
+            "speed": vehicle.get("speed", 0),
+            "heading": vehicle.get("heading", 0),
+            "capacity": vehicle.get("capacity", 0),
+            "occupancy": vehicle.get("occupancy", 0),
+            "next_stop": next_stop,
+            "eta_1": next_stops[0]["eta"] if len(next_stops) > 0 else 0,
+            "eta_2": next_stops[1]["eta"] if len(next_stops) > 1 else 0,
+            "status": self.statuses.index(status),
+            "updated_at": datetime.fromisoformat(updated_at).timestamp() if updated_at else datetime.now().timestamp(),
+            "version": self.version,
+        }
+
+        row = self.size
+        self.columns = {
+            name: np.append(self.columns[name], np.array([row_values[name]], dtype=dtype))
+            for name, dtype in self.COLUMNS.items()
+        }
+        self.ids = self.ids + [vehicle["id"]]
+        return row
+
+    def remove(self, vehicle_id: str) -> bool:
+        """Remove a vehicle by moving the last row into its slot"""
+        with self._lock:
+            row = self.latest.row_of(vehicle_id)
+            if row is None:
+                return False
+            self._begin_change(structural=True)
+            self._log_removal(vehicle_id, int(self.columns["route"][row]))
+            self._remove(row)
+            self._publish()
+            return True
+
+    def _remove(self, row: int):
+        last = self.size - 1
+        columns = {}
+        for name, column in self.columns.items():
+            column = column[:last].copy()
+            if row != last:
+                column[row] = self.columns[name][last]
+            columns[name] = column
+
+        ids = self.ids[:last]
+        if row != last:
+            ids[row] = self.ids[last]
+
+        self.columns = columns
+        self.ids = ids
+
+    def move(self, vehicle_id: str, route_id: str) -> int:
+        """Reassign a vehicle to another route, heading for its first stop"""
+        with self._lock:
+            row = self.latest.row_of(vehicle_id)
+            if row is None:
+                raise ValueError(f"Vehicle {vehicle_id} not found")
+            if route_id not in self.route_index:
+                raise ValueError(f"Route {route_id} not found")
+            self._begin_change(structural=True)
+            # Left its old route: route-scoped "changed since" queries report it as removed
+            self._log_removal(vehicle_id, int(self.columns["route"][row]))
+            self._move(row, self.route_index[route_id])
+            self._publish()
+            return row
+
+    def _move(self, row: int, route: int):
+        has_stops = self.stop_count[route] > 0
+        columns = dict(self.columns)
+        for name, value in (("route", route), ("next_stop", 0 if has_stops else -1), ("version", self.version)):
+            column = columns[name].copy()
+            column[row] = value
+            columns[name] = column
+
+        self.columns = columns
+
+    def _find_stop(self, route: int, stop_name: str) -> int:
+        offset, count = int(self.stop_offset[route]), int(self.stop_count[route])
+        for i, name in enumerate(self.stop_names[offset:offset + count]):
+            if name == stop_name:
+                return i
+        return 0 if count else -1
+
+    # =========================================
+    # SNAPSHOTS
+    # =========================================
+
+    def _begin_change(self, structural: bool = False):
+        """Open a new fleet version; structural changes also invalidate row indexes"""
+        self.version += 1
+        if structural:
+            self.structure_version += 1
+
+    def _log_removal(self, vehicle_id: str, route: int):
+        """Remember that a vehicle left a route (route index) in the current version"""
+        removals = self.removals + ((self.version, vehicle_id, route),)
+        if len(removals) > REMOVAL_LOG_SIZE:
+            self.removal_floor = removals[-REMOVAL_LOG_SIZE - 1][0]
+            removals = removals[-REMOVAL_LOG_SIZE:]
+        self.removals = removals
+
+    def _update_grid(self):
+        """Rebuild the spatial grid after structural changes, otherwise move only vehicles that changed cell"""
+        lat, lng = self.columns["lat"], self.columns["lng"]
+        if self.grid is None or self._grid_structure != self.structure_version:
+            self.grid = VehicleGrid.build(lat, lng)
+            self._grid_structure = self.structure_version
+        else:
+            self.grid = self.grid.moved(lat, lng)
+
+    def _publish(self):
+        """Swap in a new immutable snapshot of the current columns"""
+        self._update_grid()
+        previous = self.latest
+        shared = previous.indexes if previous and previous.structure_version == self.structure_version else None
+        self.latest = FleetSnapshot(self, indexes=shared)
+
+    def snapshot(self) -> "FleetSnapshot":
+        """Latest published snapshot. Safe to read from any thread."""
+        return self.latest
+
+    # =========================================
+    # SIMULATION
+    # =========================================
+
+    def step(self, now: Optional[float] = None):
+        """Advance every vehicle by one tick"""
+        with self._lock:
+            self._begin_change()
+            self._step(now)
+            self._publish()
+
+    def _step(self, now: Optional[float]):
+        n = self.size
+        if not n:
+            return
+
+        rng = self.rng
+        c = self.columns
+        stop_count = self.stop_count[c["route"]]
+        moving = stop_count > 0
+
+        # Move vehicles slightly and refresh their telemetry
+        lat = np.where(moving, c["lat"] + rng.uniform(-POSITION_JITTER, POSITION_JITTER, n), c["lat"])
+        lng = np.where(moving, c["lng"] + rng.uniform(-POSITION_JITTER, POSITION_JITTER, n), c["lng"])
+        speed = np.where(moving, rng.integers(SPEED_RANGE[0], SPEED_RANGE[1] + 1, n, dtype=np.int16), c["speed"])
+        heading = np.where(
+            moving,
+            (c["heading"] + rng.integers(-HEADING_DRIFT, HEADING_DRIFT + 1, n, dtype=np.int16)) % 360,
+            c["heading"],
+        )
+        occupancy = c["occupancy"] + rng.integers(-OCCUPANCY_DRIFT, OCCUPANCY_DRIFT + 1, n, dtype=np.int16)
+        occupancy = np.where(moving, np.maximum(5, np.minimum(c["capacity"], occupancy)), c["occupancy"])
+
+        # Count down ETAs and advance to the following stop on arrival
+        eta_1 = np.where(moving, np.maximum(1, c["eta_1"] - 1), c["eta_1"])
+        eta_2 = np.where(moving, np.maximum(2, c["eta_2"] - 1), c["eta_2"])
+        arrived = moving & (eta_1 <= 1)
+        next_stop = np.where(arrived, np.minimum(c["next_stop"] + 1, stop_count - 1), c["next_stop"])
+        eta_1 = np.where(arrived, rng.integers(3, 9, n, dtype=np.int16), eta_1)
+        eta_2 = np.where(arrived, rng.integers(10, 19, n, dtype=np.int16), eta_2)
+
+        # Occasionally update status
+        change_status = moving & (rng.random(n) < STATUS_CHANGE_CHANCE)
+        status = np.where(change_status, (rng.random(n) < 0.2).astype(np.int8), c["status"])
+
+        updated_at = c["updated_at"].copy()
+        updated_at[moving] = datetime.now().timestamp() if now is None else now
+        version = np.where(moving, self.version, c["version"])
+
+        # New arrays replace the old ones, so readers holding the previous columns are unaffected
+        self.columns = {
+            **c,
+            "lat": lat,
+            "lng": lng,
+            "speed": speed.astype(np.int16, copy=False),
+            "heading": heading.astype(np.int16, copy=False),
+            "occupancy": occupancy.astype(np.int16, copy=False),
+            "next_stop": next_stop.astype(np.int32, copy=False),
+            "eta_1": eta_1.astype(np.int16, copy=False),
+            "eta_2": eta_2.astype(np.int16, copy=False),
+            "status": status.astype(np.int8, copy=False),
+            "updated_at": updated_at,
+            "version": version,
+        }
+
+
+class FleetSnapshot:
+    """Immutable view of the fleet at one version"""
+
+    def __init__(self, fleet: FleetSimulation, indexes: Optional[Dict] = None):
+        self.epoch = fleet.epoch
+        self.version = fleet.version
+        self.structure_version = fleet.structure_version
+        self.removals = fleet.removals
+        self.removal_floor = fleet.removal_floor
+        self.taken_at = datetime.now().timestamp()
+        self.routes = fleet.routes
+        self.route_index = fleet.route_index
+        self.stop_count = fleet.stop_count
+        self.stop_offset = fleet.stop_offset
+        self.stop_names = fleet.stop_names
+        self.statuses = tuple(fleet.statuses)
+        self.ids = fleet.ids
+        self.columns = fleet.columns
+        self.grid = fleet.grid
+        for column in self.columns.values():
+            column.flags.writeable = False
+
+        # Lazily built row indexes, shared with later snapshots until the fleet structure changes
+        self.indexes = indexes if indexes is not None else {}
+        self._all_vehicles = None
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def __len__(self):
+        return self.size
+
+    def row_of(self, vehicle_id: str) -> Optional[int]:
+        if isinstance(self.ids, SequentialIds):
+            return self.ids.row_of(vehicle_id)
+        row_by_id = self.indexes.get("row_by_id")
+        if row_by_id is None:
+            row_by_id = {vehicle_id: row for row, vehicle_id in enumerate(self.ids)}
+            self.indexes["row_by_id"] = row_by_id
+        return row_by_id.get(vehicle_id)
+
+    def rows_for_route(self, route_id: str) -> np.ndarray:
+        """Rows of all vehicles on a route, via a route-sorted row permutation"""
+        route = self.route_index.get(route_id)
+        if route is None:
+            return np.empty(0, dtype=np.int64)
+
+        by_route = self.indexes.get("by_route")
+        if by_route is None:
+            route_column = self.columns["route"]
+            order = np.argsort(route_column, kind="stable")
+            starts = np.searchsorted(route_column[order], np.arange(len(self.routes) + 1))
+            by_route = (order, starts)
+            self.indexes["by_route"] = by_route
+        order, starts = by_route
+        return order[starts[route]:starts[route + 1]]
+
+    def rows_in_bbox(self, bbox) -> np.ndarray:
+        """Sorted rows of the vehicles inside (lat_min, lng_min, lat_max, lng_max), via the spatial grid"""
+        return self.grid.rows_in(self.columns["lat"], self.columns["lng"], bbox)
+
+    def _id_order(self):
+        """(rows sorted by vehicle id, the sorted ids, each row's rank), shared until the fleet structure changes"""
+        by_id = self.indexes.get("by_id")
+        if by_id is None:
+            if isinstance(self.ids, SequentialIds):
+                order = self.ids.lexicographic_order()
+                sorted_ids = _IdsInOrder(self.ids, order)
+            else:
+                ids = np.array(self.ids, dtype=str)
+                order = np.argsort(ids, kind="stable")
+                sorted_ids = ids[order]
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            by_id = (order, sorted_ids, rank)
+            self.indexes["by_id"] = by_id
+        return by_id
+
+    def page_by_id(self, rows, limit: int, after: Optional[str] = None):
+        """
+        Up to limit of the rows (all rows when None) in vehicle id order,
+        starting after the vehicle id `after`. Returns (rows, last id or None
+        when this is the last page). Keyed by id, so pages stay consistent
+        while vehicles are added and removed.
+        """
+        if not self.size:
+            return np.empty(0, dtype=np.int64), None
+        order, sorted_ids, rank = self._id_order()
+        ranks = rank if rows is None else rank[np.asarray(rows, dtype=np.int64)]
+        if after is not None:
+            ranks = ranks[ranks >= bisect.bisect_right(sorted_ids, after)]
+        more = len(ranks) > limit
+        if more:
+            ranks = np.partition(ranks, limit - 1)[:limit]
+        ranks = np.sort(ranks)
+        return order[ranks], (str(sorted_ids[ranks[-1]]) if more else None)
+
+    def can_diff_since(self, since: int) -> bool:
+        """Whether changes since a version can be answered without a full response"""
+        return self.removal_floor <= since <= self.version
+
+    def changed_since(self, rows: np.ndarray, since: int) -> np.ndarray:
+        """Subset of rows whose vehicles changed after the given version"""
+        rows = np.asarray(rows, dtype=np.int64)
+        return rows[self.columns["version"][rows] > since]
+
+    def removed_since(self, since: int, route_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Ids of vehicles that left the scope after the given version: removed
+        from the fleet or, when route_ids is given, removed from or moved off
+        those routes. Vehicles back in scope by now are left out.
+        """
+        routes = None if route_ids is None else {self.route_index[r] for r in route_ids if r in self.route_index}
+        removed = {}
+        for version, vehicle_id, route in self.removals:
+            if version <= since or (routes is not None and route not in routes):
+                continue
+            row = self.row_of(vehicle_id)
+            if row is not None and (routes is None or int(self.columns["route"][row]) in routes):
+                continue
+            removed[vehicle_id] = True
+        return list(removed)
+
+    def last_change(self, rows: np.ndarray) -> int:
+        """Latest vehicle version among rows (0 when empty)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        return int(self.columns["version"][rows].max()) if len(rows) else 0
+
+    def all_vehicles(self) -> List[Dict]:
+        """Every vehicle as an API dict, built once per snapshot"""
+        if self._all_vehicles is None:
+            self._all_vehicles = self.vehicle_dicts()
+        return self._all_vehicles
+
+    def project_vehicles(self, rows, fields) -> List[Dict]:
+        """API vehicle dicts with only the given VEHICLE_FIELDS, built column by column"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return []
+        c = self.columns
+        routes = [self.routes[r] for r in c["route"][rows].tolist()] \
+            if {"route_id", "route_name", "route_number", "type"} & set(fields) else None
+
+        values = []
+        for field in fields:
+            if field == "id":
+                ids = self.ids
+                values.append([ids[row] for row in rows.tolist()])
+            elif field == "route_id":
+                values.append([route.id for route in routes])
+            elif field == "route_name":
+                values.append([route.name for route in routes])
+            elif field == "route_number":
+                values.append([route.route_number for route in routes])
+            elif field == "type":
+                values.append([route.type for route in routes])
+            elif field == "position":
+                values.append([{"lat": lat, "lng": lng} for lat, lng in zip(c["lat"][rows].tolist(), c["lng"][rows].tolist())])
+            elif field == "next_stops":
+                values.append(self._next_stops(rows))
+            elif field == "last_updated":
+                values.append([datetime.fromtimestamp(t).isoformat() for t in c["updated_at"][rows].tolist()])
+            elif field == "status":
+                statuses = self.statuses
+                values.append([statuses[s] for s in c["status"][rows].tolist()])
+            else:
+                values.append(c[field][rows].tolist())
+        return [dict(zip(fields, row_values)) for row_values in zip(*values)]
+
+    def _next_stops(self, rows: np.ndarray) -> List[List[Dict]]:
+        c = self.columns
+        route = c["route"][rows]
+        next_stop = c["next_stop"][rows]
+        offset = self.stop_offset[route]
+        stop_1 = (offset + next_stop).tolist()
+        stop_2 = (offset + np.minimum(next_stop + 1, self.stop_count[route] - 1)).tolist()
+        stop_names = self.stop_names
+        next_stops = []
+        for s1, s2, terminal, eta_1, eta_2 in zip(stop_1, stop_2, (next_stop < 0).tolist(),
+                                                  c["eta_1"][rows].tolist(), c["eta_2"][rows].tolist()):
+            if terminal:
+                next_stops.append([{"name": "Terminal", "eta": eta_1}, {"name": "End of Line", "eta": eta_2}])
+            else:
+                next_stops.append([{"name": stop_names[s1], "eta": eta_1}, {"name": stop_names[s2], "eta": eta_2}])
+        return next_stops
+
+    def vehicle_dicts(self, rows=None, static: bool = True) -> List[Dict]:
+        """
+        Build API vehicle dicts for the given rows (all rows by default).
+        With static=False the fields copied from the route and the capacity are left out.
+        """
+        c = self.columns
+        if rows is None:
+            rows = np.arange(self.size)
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return []
+
+        route = c["route"][rows]
+        next_stop = c["next_stop"][rows]
+        last_stop = self.stop_count[route] - 1
+        offset = self.stop_offset[route]
+        stop_1 = (offset + next_stop).tolist()
+        stop_2 = (offset + np.minimum(next_stop + 1, last_stop)).tolist()
+        at_terminal = (next_stop < 0).tolist()
+
+        ids = self.ids
+        routes = self.routes
+        statuses = self.statuses
+        stop_names = self.stop_names
+        vehicles = []
+        for i, (row, r, lat, lng, speed, heading, capacity, occupancy, eta_1, eta_2, status, updated_at, version) in enumerate(zip(
+            rows.tolist(), route.tolist(), c["lat"][rows].tolist(), c["lng"][rows].tolist(),
+            c["speed"][rows].tolist(), c["heading"][rows].tolist(), c["capacity"][rows].tolist(),
+            c["occupancy"][rows].tolist(), c["eta_1"][rows].tolist(), c["eta_2"][rows].tolist(),
+            c["status"][rows].tolist(), c["updated_at"][rows].tolist(), c["version"][rows].tolist(),
+        )):
+            route_data = routes[r]
+            if at_terminal[i]:
+                next_stops = [{"name": "Terminal", "eta": eta_1}, {"name": "End of Line", "eta": eta_2}]
+            else:
+                next_stops = [{"name": stop_names[stop_1[i]], "eta": eta_1}, {"name": stop_names[stop_2[i]], "eta": eta_2}]
+            if not static:
+                vehicles.append({
+                    "id": ids[row],
+                    "route_id": route_data.id,
+                    "position": {
+                        "lat": lat,
+                        "lng": lng
+                    },
+                    "speed": speed,
+                    "heading": heading,
+                    "next_stops": next_stops,
+                    "occupancy": occupancy,
+                    "last_updated": datetime.fromtimestamp(updated_at).isoformat(),
+                    "status": statuses[status],
+                    "version": version
+                })
+                continue
+            vehicles.append({
+                "id": ids[row],
+                "route_id": route_data.id,
+                "route_name": route_data.name,
+                "route_number": route_data.route_number,
+                "type": route_data.type,
+                "position": {
+                    "lat": lat,
+                    "lng": lng
+                },
+                "speed": speed,
+                "heading": heading,
+                "next_stops": next_stops,
+                "capacity": capacity,
+                "occupancy": occupancy,
+                "last_updated": datetime.fromtimestamp(updated_at).isoformat(),
+                "status": statuses[status],
+                "version": version
+            })
+        return vehicles
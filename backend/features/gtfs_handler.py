@@ -1,49 +1,294 @@
 
 import os
-import requests
+import threading
 import time
+import numpy as np
+from google.protobuf.message import DecodeError
 from google.transit import gtfs_realtime_pb2
-import googlemaps
 from datetime import datetime
 import json
 
+from features.mock_data_generator import mock_data
+from features.road_snapper import RoadSnapper
+from features.tick_scheduler import TickScheduler
+
 # Placeholder for real API endpoints - these would be moved to config/env
 GTFS_ENDPOINTS = {
     'delhi': 'https://otd.delhi.gov.in/api/realtime/VehiclePositions.pb?key={}', 
     # Add other endpoints as needed
 }
 
+# Seconds between polls of every configured feed
+GTFS_POLL_SECONDS = float(os.environ.get('GTFS_POLL_SECONDS', 15))
+
+# Request timeout, and how long polled positions are served after the feed was last reachable
+GTFS_TIMEOUT_SECONDS = 10
+GTFS_STALE_SECONDS = 120
+# After a failed poll a feed is left alone for GTFS_POLL_SECONDS, doubling per
+# consecutive failure up to GTFS_STALE_SECONDS
+
+
+def _endpoints_from_env():
+    """Overrides like GTFS_ENDPOINTS="delhi=http://localhost:8765/delhi.pb,mumbai=..." """
+    endpoints = {}
+    for item in os.environ.get('GTFS_ENDPOINTS', '').split(','):
+        region_key, _, url = item.partition('=')
+        if region_key.strip() and url.strip():
+            endpoints[region_key.strip()] = url.strip()
+    return endpoints
+
+
+GTFS_ENDPOINTS.update(_endpoints_from_env())
+
+# 'dicts' keeps one dict per vehicle, ready to serve whole; 'columnar' stores each parsed
+# feed as a NumPy structured array: about a third of the memory, but slower to parse and
+# every unfiltered response builds its dicts again (scripts/bench_gtfs_parse.py)
+GTFS_PARSE_MODE = os.environ.get('GTFS_PARSE_MODE', 'dicts')
+
+# One row per vehicle in columnar mode. Occupancy is -1 when the feed doesn't report it.
+VEHICLE_DTYPE = np.dtype([
+    ('id', object),
+    ('lat', np.float64),
+    ('lng', np.float64),
+    ('route_id', object),
+    ('timestamp', np.int64),
+    ('occupancy', np.int8),
+])
+
+# Snap polled positions onto roads (Roads API with a key, route polylines without)
+GTFS_SNAP_TO_ROADS = os.environ.get('GTFS_SNAP_TO_ROADS', '').lower() in ('1', 'true', 'yes')
+
+# Only poll in the background when a real feed (or a local replay server) is configured
+GTFS_POLLING_ENABLED = bool(os.environ.get('GTFS_ENDPOINTS') or os.environ.get('OTD_API_KEY'))
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def peek_header_timestamp(content):
+    """
+    FeedMessage.header.timestamp, read without decoding the entities.
+    Returns 0 when the header can't be found.
+    """
+    pos = 0
+    try:
+        while pos < len(content):
+            key, pos = _read_varint(content, pos)
+            field, wire_type = key >> 3, key & 7
+            if wire_type == 2:
+                length, pos = _read_varint(content, pos)
+                if field == 1:
+                    header = gtfs_realtime_pb2.FeedHeader()
+                    header.ParseFromString(content[pos:pos + length])
+                    return header.timestamp
+                pos += length
+            elif wire_type == 0:
+                _, pos = _read_varint(content, pos)
+            elif wire_type == 1:
+                pos += 8
+            elif wire_type == 5:
+                pos += 4
+            else:
+                return 0
+    except (IndexError, DecodeError):
+        return 0
+    return 0
+
+
 class GTFSHandler:
     def __init__(self):
         self.api_key = os.environ.get('GOOGLE_MAPS_API_KEY')
-        self.gmaps = googlemaps.Client(key=self.api_key) if self.api_key else None
+        self._gmaps = None
+        # Route lookups go through mock_data per call, so building the handler doesn't build the catalog
+        self.road_snapper = RoadSnapper(api_key=os.environ.get('ROADS_API_KEY', self.api_key),
+                                        route_lookup=lambda route_id: mock_data.get_route_by_id(route_id))
         self._vehicle_cache = {}
         self._last_update = {}
+        self._feed_state = {}
+        self._polling = set()
+        # Guards the vehicle store, feed state and stats (poller thread and request threads)
+        self._lock = threading.Lock()
+        self._session = None
+        self.stats = {'polls': 0, 'not_modified': 0, 'unchanged': 0, 'parsed': 0, 'errors': 0}
+
+    @property
+    def gmaps(self):
+        """googlemaps.Client, created on first use (None without an API key)"""
+        if self._gmaps is None and self.api_key:
+            import googlemaps
+            self._gmaps = googlemaps.Client(key=self.api_key)
+        return self._gmaps
+
+    @property
+    def session(self):
+        """One pooled, keep-alive session shared by every poll, created on the first one"""
+        if self._session is None:
+            self._session = self._make_session()
+        return self._session
+
+    @staticmethod
+    def _make_session():
+        # requests takes tens of ms to import, so only pay for it once feeds are polled
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=max(len(GTFS_ENDPOINTS), 1), pool_maxsize=4, max_retries=retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Accept'] = 'application/x-protobuf'
+        return session
 
-    def fetch_vehicle_positions(self, region_key='delhi'):
+    def fetch_vehicle_positions(self, region_key='delhi', route_id=None):
         """
-        Fetches and parses GTFS-Realtime FeedMessage for vehicle positions.
+        Returns the latest vehicle positions parsed from the region's
+        GTFS-Realtime feed, optionally only those on route_id. Served from the
+        store filled by the poller; polls once inline if the store is cold,
+        unless the feed failed recently or another request is already polling.
+        Falls back to mock data when polling is not enabled (no GTFS_ENDPOINTS
+        or OTD_API_KEY), the region has no feed, or the feed is unreachable.
         """
-        url = GTFS_ENDPOINTS.get(region_key)
-        if not url:
-            # Fallback to mock data if no URL configured for region
-            return self._get_mock_vehicles(region_key)
+        if not GTFS_POLLING_ENABLED or not GTFS_ENDPOINTS.get(region_key):
+            # Fallback to mock data if no feed is configured for region
+            return self._filter_route(self._get_mock_vehicles(region_key), route_id)
 
-        # In a real scenario, we would need the API key for the OTD service
-        # url = url.format(os.environ.get('OTD_API_KEY', ''))
-        
+        if not self.is_fresh(region_key) and not self.backing_off(region_key):
+            try:
+                self.poll_region(region_key)
+            except Exception as e:
+                print(f"Error fetching GTFS data: {e}")
+
+        if not self.is_fresh(region_key):
+            return self._filter_route(self._get_mock_vehicles(region_key), route_id)
+
+        with self._lock:
+            vehicles = self._vehicle_cache[region_key]
+        if isinstance(vehicles, np.ndarray):
+            # Only the vehicles in the response are turned into dicts
+            rows = None if route_id is None else np.flatnonzero(vehicles['route_id'] == route_id)
+            return self.vehicle_dicts(vehicles, rows)
+        return self._filter_route(vehicles, route_id)
+
+    @staticmethod
+    def _filter_route(vehicles, route_id):
+        if route_id is None:
+            return vehicles
+        return [v for v in vehicles if v['route_id'] == route_id]
+
+    def is_fresh(self, region_key):
+        """True if the store holds positions from a feed that answered recently"""
+        with self._lock:
+            state = self._feed_state.get(region_key, {})
+            return region_key in self._vehicle_cache and time.time() - state.get('checked_at', 0) < GTFS_STALE_SECONDS
+
+    def backing_off(self, region_key):
+        """True while a feed that failed is waiting out its retry delay"""
+        with self._lock:
+            state = self._feed_state.get(region_key, {})
+            failures = state.get('failures', 0)
+            if not failures:
+                return False
+            delay = min(GTFS_POLL_SECONDS * 2 ** (failures - 1), GTFS_STALE_SECONDS)
+            return time.time() - state['failed_at'] < delay
+
+    def source(self, region_key):
+        return 'gtfs-rt' if self.is_fresh(region_key) else 'mock'
+
+    # =========================================
+    # POLLING
+    # =========================================
+
+    def poll_region(self, region_key):
+        """
+        Fetch one feed. Sends If-None-Match / If-Modified-Since and skips
+        parsing when the feed header timestamp hasn't moved.
+        Returns True if the vehicle store was updated; False as well when
+        another thread is already polling this feed. A failure is recorded
+        (see backing_off) and re-raised.
+        """
+        with self._lock:
+            if region_key in self._polling:
+                return False
+            self._polling.add(region_key)
+            state = dict(self._feed_state.get(region_key, {}))
+            self.stats['polls'] += 1
         try:
-            # Simulating fetch for now as we don't have real keys
-            # response = requests.get(url)
-            # if response.status_code == 200:
-            #     feed = gtfs_realtime_pb2.FeedMessage()
-            #     feed.ParseFromString(response.content)
-            #     return self._parse_feed(feed)
-            pass
-        except Exception as e:
-            print(f"Error fetching GTFS data: {e}")
-        
-        return self._get_mock_vehicles(region_key)
+            return self._poll(region_key, state)
+        except Exception:
+            with self._lock:
+                state = self._feed_state.setdefault(region_key, {})
+                state['failures'] = state.get('failures', 0) + 1
+                state['failed_at'] = time.time()
+                self.stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._polling.discard(region_key)
+
+    def _poll(self, region_key, state):
+        # In a real scenario, we would need the API key for the OTD service
+        url = GTFS_ENDPOINTS[region_key].format(os.environ.get('OTD_API_KEY', ''))
+
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=GTFS_TIMEOUT_SECONDS)
+        if response.status_code == 304:
+            self._checked(region_key, 'not_modified')
+            return False
+        response.raise_for_status()
+
+        content = response.content
+        header_timestamp = peek_header_timestamp(content)
+        if header_timestamp and header_timestamp == state.get('header_timestamp') and region_key in self._vehicle_cache:
+            self._checked(region_key, 'unchanged', etag=response.headers.get('ETag'),
+                          last_modified=response.headers.get('Last-Modified'))
+            return False
+
+        feed = gtfs_realtime_pb2.FeedMessage()
+        feed.ParseFromString(content)
+        if GTFS_PARSE_MODE == 'columnar':
+            vehicles = self._parse_feed_columnar(feed)
+        else:
+            vehicles = self._parse_feed(feed)
+        if GTFS_SNAP_TO_ROADS:
+            vehicles = self.snap_to_road(vehicles)
+
+        with self._lock:
+            self._vehicle_cache[region_key] = vehicles
+            self._last_update[region_key] = time.time()
+        self._checked(region_key, 'parsed', etag=response.headers.get('ETag'),
+                      last_modified=response.headers.get('Last-Modified'), header_timestamp=feed.header.timestamp)
+        return True
+
+    def _checked(self, region_key, outcome, **changes):
+        """Record a successful poll: clears any failures and counts the outcome"""
+        with self._lock:
+            state = self._feed_state.setdefault(region_key, {})
+            state.update(changes, checked_at=time.time(), failures=0)
+            self.stats[outcome] += 1
+
+    def poll_all(self):
+        """Poll every configured feed; one failing feed doesn't block the others"""
+        for region_key in list(GTFS_ENDPOINTS):
+            if self.backing_off(region_key):
+                continue
+            try:
+                self.poll_region(region_key)
+            except Exception as e:
+                print(f"Error fetching GTFS data for {region_key}: {e}")
 
     def _parse_feed(self, feed):
         vehicles = []
@@ -56,20 +301,82 @@ class GTFSHandler:
                     'lng': v.position.longitude,
                     'route_id': v.trip.route_id,
                     'timestamp': v.timestamp,
-                    # 'occupancy': v.occupancy_status # valid in some feeds
+                    'occupancy': v.occupancy_status if v.HasField('occupancy_status') else None,
                 })
         return vehicles
 
+    def _parse_feed_columnar(self, feed):
+        """
+        Store a parsed feed's vehicle positions as a VEHICLE_DTYPE structured
+        array instead of one dict per entity: columnar storage, not zero-copy
+        decoding. The protobuf library still decodes every entity; its fields
+        are gathered into column lists in one pass and copied into the array.
+        A pure-Python wire decoder filling the array directly measured about
+        3x slower than this (605 ms vs 176 ms for 50k entities), so it isn't used.
+        """
+        entities = feed.entity
+        n = len(entities)
+        ids = [None] * n
+        lats = [0.0] * n
+        lngs = [0.0] * n
+        route_ids = [None] * n
+        timestamps = [0] * n
+        occupancy = [-1] * n
+
+        k = 0
+        for entity in entities:
+            if not entity.HasField('vehicle'):
+                continue
+            v = entity.vehicle
+            position = v.position
+            ids[k] = v.vehicle.id
+            lats[k] = position.latitude
+            lngs[k] = position.longitude
+            route_ids[k] = v.trip.route_id
+            timestamps[k] = v.timestamp
+            if v.HasField('occupancy_status'):
+                occupancy[k] = v.occupancy_status
+            k += 1
+
+        table = np.empty(k, dtype=VEHICLE_DTYPE)
+        table['id'] = ids[:k]
+        table['lat'] = lats[:k]
+        table['lng'] = lngs[:k]
+        table['route_id'] = route_ids[:k]
+        table['timestamp'] = timestamps[:k]
+        table['occupancy'] = occupancy[:k]
+        return table
+
+    @staticmethod
+    def vehicle_dicts(table, rows=None):
+        """Materialize API dicts for the given rows of a columnar vehicle table (all rows if None)"""
+        if rows is not None:
+            table = table[rows]
+        return [
+            {
+                'id': vehicle_id,
+                'lat': lat,
+                'lng': lng,
+                'route_id': route_id,
+                'timestamp': timestamp,
+                'occupancy': occupancy if occupancy >= 0 else None,
+            }
+            for vehicle_id, lat, lng, route_id, timestamp, occupancy in zip(
+                table['id'].tolist(), table['lat'].tolist(), table['lng'].tolist(),
+                table['route_id'].tolist(), table['timestamp'].tolist(), table['occupancy'].tolist())
+        ]
+
     def snap_to_road(self, vehicles):
         """
-        Uses Google Maps Roads API to snap points to roads.
+        Uses Google Maps Roads API to snap points to roads (see road_snapper.py).
+        Accepts vehicle dicts or a columnar vehicle table and returns a snapped copy.
         """
-        if not self.gmaps:
-            return vehicles
-            
-        # Limit to 100 points per request as per API limits
-        # implementation details...
-        return vehicles
+        if isinstance(vehicles, np.ndarray):
+            snapped = vehicles.copy()
+            snapped['lat'], snapped['lng'] = self.road_snapper.snap_points(
+                vehicles['lat'], vehicles['lng'], vehicles['route_id'])
+            return snapped
+        return self.road_snapper.snap_vehicles(vehicles)
 
     def _get_mock_vehicles(self, region_key):
         """
@@ -90,3 +397,6 @@ class GTFSHandler:
 
 # Singleton instance
 gtfs_handler = GTFSHandler()
+
+# Background poller, started from main.py when GTFS_POLLING_ENABLED
+gtfs_poller = TickScheduler(gtfs_handler.poll_all, interval=GTFS_POLL_SECONDS)
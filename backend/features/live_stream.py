@@ -0,0 +1,243 @@
+"""
+Live Vehicle Stream
+===================
+Push updates of vehicle positions to subscribed clients over Server-Sent
+Events (or WebSocket, see tracking.py).
+
+A client subscribes to a route, a city or a bounding box. It first receives a
+`snapshot` event with every matching vehicle, then one `delta` event per
+simulation tick with only the vehicles that changed, entered or left.
+
+Idle subscribers cost one blocked wait each, on an Event replaced at every
+publish. Deltas are computed and serialized once per (subscription, version)
+pair and shared by every client with the same subscription; different
+subscriptions build their events concurrently.
+
+Every open stream holds its connection's worker. Under the threaded Flask
+development server that is an OS thread per subscriber, bounded by the
+host's thread limits; served by gunicorn with gevent (backend/gunicorn.conf.py)
+it is a greenlet, and one process holds 10k+ subscribers in about 24 KB each
+(scripts/bench_live_stream.py).
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from features.mock_data_generator import mock_data
+from features.tick_scheduler import tick_scheduler
+from services.json_encoding import dumps
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_SECONDS = 15
+
+# Number of recent snapshots kept for computing deltas and resuming streams
+HISTORY_SIZE = 16
+
+
+def parse_bbox(text: str) -> Tuple[float, float, float, float]:
+    """Parse "lat_min,lng_min,lat_max,lng_max"; raises ValueError"""
+    try:
+        lat_min, lng_min, lat_max, lng_max = (float(x) for x in text.split(","))
+    except ValueError:
+        raise ValueError("bbox must be lat_min,lng_min,lat_max,lng_max")
+    if lat_min > lat_max or lng_min > lng_max:
+        raise ValueError("bbox minimums must not exceed maximums")
+    return lat_min, lng_min, lat_max, lng_max
+
+
+class Subscription:
+    """What a client is watching: a route, a city or a bounding box"""
+
+    def __init__(self, route_id: str = None, city: str = None, country_code: str = None, bbox: Tuple = None):
+        self.route_id = route_id
+        self.city = city
+        self.country_code = country_code
+        self.bbox = bbox
+
+        if route_id:
+            self.key = ("route", route_id)
+        elif city:
+            self.key = ("city", country_code, city)
+        else:
+            self.key = ("bbox",) + tuple(bbox)
+
+    @classmethod
+    def from_args(cls, args) -> "Subscription":
+        """Parse ?route=<id>, ?city=<name>[&country=<code>] or ?bbox=lat_min,lng_min,lat_max,lng_max"""
+        route_id = args.get("route")
+        city = args.get("city")
+        bbox = args.get("bbox")
+
+        if route_id:
+            if not mock_data.get_route_by_id(route_id):
+                raise LookupError("Route not found")
+            return cls(route_id=route_id)
+        if city:
+            return cls(city=city, country_code=args.get("country"))
+        if bbox:
+            return cls(bbox=parse_bbox(bbox))
+        raise ValueError("One of route, city or bbox is required")
+
+    def rows(self, snapshot) -> np.ndarray:
+        """Sorted snapshot rows of the vehicles this subscription covers"""
+        if self.route_id:
+            return np.sort(snapshot.rows_for_route(self.route_id))
+        if self.city:
+            routes = mock_data.get_routes_by_region(self.country_code, self.city)
+            if not routes:
+                return np.empty(0, dtype=np.int64)
+            return np.sort(np.concatenate([snapshot.rows_for_route(r.id) for r in routes]))
+
+        return snapshot.rows_in_bbox(self.bbox)
+
+
+class StreamHub:
+    """Keeps recent snapshots, wakes waiting subscribers and caches encoded events"""
+
+    def __init__(self, history: int = HISTORY_SIZE):
+        self.history = history
+        self._snapshots: "OrderedDict[int, object]" = OrderedDict()
+        self._events: Dict[Tuple, str] = {}
+        self._building: Dict[Tuple, threading.Lock] = {}
+        self._history_lock = threading.RLock()
+        # Set, and replaced by a fresh one, whenever a new snapshot is published
+        self._published = threading.Event()
+        self._lock = threading.Lock()
+        self.subscribers = 0
+        # The first snapshot is recorded on first use, so creating the hub doesn't build the mock data
+
+    def publish(self):
+        """Record the latest fleet snapshot and wake every subscriber"""
+        snapshot = mock_data.snapshot()
+        with self._history_lock:
+            if snapshot.version in self._snapshots:
+                return
+            self._snapshots[snapshot.version] = snapshot
+            while len(self._snapshots) > self.history:
+                self._snapshots.popitem(last=False)
+            with self._lock:
+                oldest = next(iter(self._snapshots))
+                self._events = {key: event for key, event in self._events.items() if key[-1] >= oldest}
+            published, self._published = self._published, threading.Event()
+        published.set()
+
+    def latest(self):
+        with self._history_lock:
+            if not self._snapshots:
+                self.publish()
+            return next(reversed(self._snapshots.values()))
+
+    def wait_for_newer(self, version: int, timeout: float):
+        """Block until a snapshot newer than version is published, or timeout"""
+        with self._history_lock:
+            current = self.latest()
+            if current.version > version:
+                return current
+            published = self._published
+        published.wait(timeout)
+        return self.latest()
+
+    # =========================================
+    # EVENTS
+    # =========================================
+
+    def snapshot_event(self, subscription: Subscription, snapshot) -> str:
+        """Encoded full snapshot for a subscription"""
+        cache_key = ("snapshot", subscription.key, snapshot.version)
+        return self._cached(cache_key, lambda: {
+            "version": snapshot.version,
+            "vehicles": snapshot.vehicle_dicts(subscription.rows(snapshot)),
+        })
+
+    def delta_event(self, subscription: Subscription, previous, snapshot) -> str:
+        """Encoded changes between two snapshots with the same fleet structure"""
+        cache_key = ("delta", subscription.key, previous.version, snapshot.version)
+
+        def build():
+            rows = subscription.rows(snapshot)
+            previous_rows = subscription.rows(previous)
+
+            changed = snapshot.columns["version"][rows] > previous.version
+            changed |= ~np.isin(rows, previous_rows, assume_unique=True)
+            left = previous_rows[~np.isin(previous_rows, rows, assume_unique=True)]
+
+            return {
+                "version": snapshot.version,
+                "since": previous.version,
+                "changed": snapshot.vehicle_dicts(rows[changed]),
+                "removed": [snapshot.ids[row] for row in left.tolist()],
+            }
+
+        return self._cached(cache_key, build)
+
+    def _cached(self, cache_key: Tuple, build) -> str:
+        with self._lock:
+            event = self._events.get(cache_key)
+            if event is not None:
+                return event
+            building = self._building.setdefault(cache_key, threading.Lock())
+
+        # Only one thread builds a given event; the others wait for it and take the cached copy
+        with building:
+            with self._lock:
+                event = self._events.get(cache_key)
+            if event is None:
+                try:
+                    event = dumps(build())
+                    with self._lock:
+                        self._events[cache_key] = event
+                finally:
+                    with self._lock:
+                        self._building.pop(cache_key, None)
+        return event
+
+    def events(self, subscription: Subscription, last_version: Optional[int] = None,
+               keepalive: float = KEEPALIVE_SECONDS) -> Iterator[Optional[Tuple[str, int, str]]]:
+        """
+        Yield (event_type, version, data) for a subscriber, or None when a
+        keep-alive is due. Resumes with a delta when last_version is still
+        in the history, otherwise starts with a full snapshot.
+        """
+        with self._lock:
+            self.subscribers += 1
+        try:
+            current = self.latest()
+            with self._history_lock:
+                previous = self._snapshots.get(last_version) if last_version is not None else None
+
+            if previous is not None and previous.structure_version == current.structure_version:
+                if current.version != previous.version:
+                    yield "delta", current.version, self.delta_event(subscription, previous, current)
+            else:
+                yield "snapshot", current.version, self.snapshot_event(subscription, current)
+
+            while True:
+                snapshot = self.wait_for_newer(current.version, keepalive)
+                if snapshot.version == current.version:
+                    yield None
+                    continue
+                if snapshot.structure_version == current.structure_version:
+                    yield "delta", snapshot.version, self.delta_event(subscription, current, snapshot)
+                else:
+                    # Vehicles were added, removed or moved: rows shifted, start over
+                    yield "snapshot", snapshot.version, self.snapshot_event(subscription, snapshot)
+                current = snapshot
+        finally:
+            with self._lock:
+                self.subscribers -= 1
+
+
+def format_sse(event: Optional[Tuple[str, int, str]]) -> str:
+    """Encode one hub event as a Server-Sent Events frame"""
+    if event is None:
+        return ": keep-alive\n\n"
+    event_type, version, data = event
+    return f"id: {version}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+# Global instance, fed by the simulation tick scheduler
+stream_hub = StreamHub()
+tick_scheduler.add_listener(stream_hub.publish)
@@ -3,17 +3,71 @@ Mock Data Generator for Global Public Transport System
 Generates realistic transport data for 50+ countries
 """
 
+import json
+import os
 import random
 import math
 from datetime import datetime, timedelta
 
+from features.fleet_simulation import FleetSimulation
+from features.route_search import RouteSearchIndex, DEFAULT_PAGE_SIZE
+from features.route_records import Route
+from features.scenario_generator import MANIFEST, load_scenario
+from features.warm_snapshot import WARM_SNAPSHOT_PATH, load_snapshot, save_snapshot
+from services.lazy import LazyInstance
+
+# Seed for reproducible routes and vehicles (random when unset)
+MOCK_DATA_SEED = int(os.environ["MOCK_DATA_SEED"]) if os.environ.get("MOCK_DATA_SEED") else None
+
+# Directory written by scripts/generate_scenario.py, loaded instead of generating data
+SCENARIO_PATH = os.environ.get("SCENARIO_PATH")
+
+# Bump whenever a change to _generate_regions, _generate_routes or the fleet
+# spawn makes a seed generate different data, so old warm snapshots are not reused
+GENERATOR_VERSION = 1
+
 class MockDataGenerator:
-    def __init__(self):
-        self.regions = self._generate_regions()
-        self.routes = self._generate_routes()
-        self.vehicles = self._generate_vehicles()
+    def __init__(self, seed=MOCK_DATA_SEED, scenario_path=SCENARIO_PATH, snapshot_path=WARM_SNAPSHOT_PATH):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Bumped whenever the route catalog is (re)indexed, so cached responses can tell
+        self.catalog_version = 0
+        # What the data is generated from; a warm snapshot is only reused for the same source
+        self.source = self._source(seed, scenario_path)
+        if seed is None and not scenario_path:
+            # Unseeded data differs on every start, so there is no snapshot to reuse
+            snapshot_path = None
+        if snapshot_path and self.load_snapshot(snapshot_path):
+            return
+        if scenario_path:
+            self.load_scenario(scenario_path)
+        else:
+            self.regions = self._generate_regions()
+            self.routes = self._generate_routes()
+            self._build_indexes()
+            self.fleet = self._generate_vehicles()
+        if snapshot_path:
+            self.save_snapshot(snapshot_path)
+    
+    @staticmethod
+    def _source(seed, scenario_path):
+        """Seed, generator version and scenario (path plus its manifest's config and generated_at)"""
+        source = {"seed": seed, "generator": GENERATOR_VERSION, "scenario": None}
+        if scenario_path:
+            try:
+                with open(os.path.join(scenario_path, MANIFEST)) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                manifest = {}
+            source["scenario"] = {
+                "path": os.path.abspath(scenario_path),
+                "config": manifest.get("config"),
+                "generated_at": manifest.get("generated_at"),
+            }
+        return source
     
-    def _generate_regions(self):
+    @staticmethod
+    def _generate_regions():
         """Generate data for major cities in India"""
         return {
             "india": {
@@ -227,7 +281,7 @@ class MockDataGenerator:
                             kr["country"] = "India" 
                             kr["country_code"] = "india" 
                             kr["continent"] = "asia"
-                            routes.append(kr)
+                            routes.append(Route.from_dict(kr))
                             route_id += 1
                         continue 
 
@@ -235,69 +289,54 @@ class MockDataGenerator:
                     city_stops = city.get("stops", [])
                     
                     for i in range(num_routes):
-                        transport_type = random.choice(transport_types)
-                        prefix = random.choice(route_prefixes[transport_type])
+                        transport_type = self.rng.choice(transport_types)
+                        prefix = self.rng.choice(route_prefixes[transport_type])
                         
                         # Generate route number/name
                         if transport_type == "Metro":
-                            route_name = f"{prefix} {random.choice(['Red', 'Blue', 'Green', 'Yellow', 'Orange', 'Purple'])}"
+                            route_name = f"{prefix} {self.rng.choice(['Red', 'Blue', 'Green', 'Yellow', 'Orange', 'Purple'])}"
                         else:
-                            route_number = random.randint(1, 999)
+                            route_number = self.rng.randint(1, 999)
                             route_name = f"{prefix} {route_number}" if prefix else str(route_number)
                         
                         # Generate route path (simplified as a line)
-                        start_lat = city["lat"] + random.uniform(-0.1, 0.1)
-                        start_lng = city["lng"] + random.uniform(-0.1, 0.1)
-                        end_lat = city["lat"] + random.uniform(-0.1, 0.1)
-                        end_lng = city["lng"] + random.uniform(-0.1, 0.1)
+                        start_lat = city["lat"] + self.rng.uniform(-0.1, 0.1)
+                        start_lng = city["lng"] + self.rng.uniform(-0.1, 0.1)
+                        end_lat = city["lat"] + self.rng.uniform(-0.1, 0.1)
+                        end_lng = city["lng"] + self.rng.uniform(-0.1, 0.1)
                         
                         # Generate stops along the route using actual stop names
-                        num_stops = random.randint(8, 15)
-                        stops = []
+                        num_stops = self.rng.randint(8, 15)
                         
                         if city_stops and len(city_stops) >= num_stops:
                             # Use actual stop names from city data
-                            selected_stops = random.sample(city_stops, num_stops)
-                            for j, stop_name in enumerate(selected_stops):
-                                t = j / (num_stops - 1) if num_stops > 1 else 0
-                                stop_lat = start_lat + (end_lat - start_lat) * t
-                                stop_lng = start_lng + (end_lng - start_lng) * t
-                                stops.append({
-                                    "name": stop_name,
-                                    "lat": stop_lat,
-                                    "lng": stop_lng,
-                                    "order": j + 1
-                                })
+                            stop_names = self.rng.sample(city_stops, num_stops)
                         else:
                             # Fallback to generic names if no city stops available
-                            for j in range(num_stops):
-                                t = j / (num_stops - 1) if num_stops > 1 else 0
-                                stop_lat = start_lat + (end_lat - start_lat) * t
-                                stop_lng = start_lng + (end_lng - start_lng) * t
-                                stops.append({
-                                    "name": f"Stop {j + 1}",
-                                    "lat": stop_lat,
-                                    "lng": stop_lng,
-                                    "order": j + 1
-                                })
+                            stop_names = [f"Stop {j + 1}" for j in range(num_stops)]
                         
-                        route = {
-                            "id": f"route_{route_id}",
-                            "route_number": route_name,
-                            "name": f"{city['name']} {transport_type} {route_name}",
-                            "type": transport_type,
-                            "city": city["name"],
-                            "country": country_data["name"],
-                            "country_code": country_code,
-                            "continent": continent,
-                            "stops": stops,
-                            "path": [
-                                {"lat": start_lat, "lng": start_lng},
-                                {"lat": end_lat, "lng": end_lng}
-                            ],
-                            "active": True,
-                            "frequency": f"{random.randint(5, 30)} mins"
-                        }
+                        # Stop coordinates packed as lat, lng pairs
+                        stop_coords = []
+                        for j in range(num_stops):
+                            t = j / (num_stops - 1) if num_stops > 1 else 0
+                            stop_coords.append(start_lat + (end_lat - start_lat) * t)
+                            stop_coords.append(start_lng + (end_lng - start_lng) * t)
+                        
+                        route = Route(
+                            id=f"route_{route_id}",
+                            route_number=route_name,
+                            name=f"{city['name']} {transport_type} {route_name}",
+                            type=transport_type,
+                            city=city["name"],
+                            country=country_data["name"],
+                            country_code=country_code,
+                            continent=continent,
+                            stop_names=stop_names,
+                            stop_coords=stop_coords,
+                            path_coords=(start_lat, start_lng, end_lat, end_lng),
+                            active=True,
+                            frequency=f"{self.rng.randint(5, 30)} mins"
+                        )
                         
                         routes.append(route)
                         route_id += 1
@@ -425,75 +464,19 @@ class MockDataGenerator:
 
     def _generate_vehicles(self):
         """Generate vehicle positions for active routes"""
-        vehicles = []
-        vehicle_id = 1
-        
-        for route in self.routes:
-            # Each route has 2-5 active vehicles
-            num_vehicles = random.randint(2, 5)
-            
-            for i in range(num_vehicles):
-                # Position vehicle somewhere along the route
-                progress = random.random()
-                
-                if len(route["stops"]) > 0:
-                    stop_index = int(progress * (len(route["stops"]) - 1))
-                    current_stop = route["stops"][stop_index]
-                    
-                    # Add some randomness to position
-                    lat = current_stop["lat"] + random.uniform(-0.002, 0.002)
-                    lng = current_stop["lng"] + random.uniform(-0.002, 0.002)
-                    
-                    # Get next two stops
-                    next_stop_1_index = min(stop_index + 1, len(route["stops"]) - 1)
-                    next_stop_2_index = min(stop_index + 2, len(route["stops"]) - 1)
-                    
-                    next_stop_1 = route["stops"][next_stop_1_index]["name"]
-                    next_stop_2 = route["stops"][next_stop_2_index]["name"]
-                    
-                    # Calculate ETA for next stops (in minutes)
-                    eta_1 = random.randint(2, 8)
-                    eta_2 = random.randint(10, 20)
-                else:
-                    lat = route["path"][0]["lat"]
-                    lng = route["path"][0]["lng"]
-                    next_stop_1 = "Terminal"
-                    next_stop_2 = "End of Line"
-                    eta_1 = 0
-                    eta_2 = 0
-                
-                vehicle = {
-                    "id": f"vehicle_{vehicle_id}",
-                    "route_id": route["id"],
-                    "route_name": route["name"],
-                    "route_number": route["route_number"],
-                    "type": route["type"],
-                    "position": {
-                        "lat": lat,
-                        "lng": lng
-                    },
-                    "speed": random.randint(20, 60),  # km/h
-                    "heading": random.randint(0, 360),
-                    "next_stops": [
-                        {
-                            "name": next_stop_1,
-                            "eta": eta_1
-                        },
-                        {
-                            "name": next_stop_2,
-                            "eta": eta_2
-                        }
-                    ],
-                    "capacity": random.randint(30, 100),
-                    "occupancy": random.randint(10, 80),
-                    "last_updated": datetime.now().isoformat(),
-                    "status": random.choice(["On Time", "Delayed 2 min", "On Time", "On Time"])
-                }
-                
-                vehicles.append(vehicle)
-                vehicle_id += 1
-        
-        return vehicles
+        fleet = FleetSimulation(self.routes, seed=self.seed)
+        # Each route has 2-5 active vehicles
+        fleet.spawn(2, 5)
+        return fleet
+    
+    @property
+    def vehicles(self):
+        """All vehicles as API dicts, built lazily once per fleet snapshot"""
+        return self.fleet.snapshot().all_vehicles()
+    
+    def snapshot(self):
+        """Latest immutable fleet snapshot"""
+        return self.fleet.snapshot()
     
     def get_all_regions(self):
         """Get list of all regions/countries"""
@@ -508,92 +491,117 @@ class MockDataGenerator:
                 })
         return result
     
+    def _build_indexes(self):
+        """Build dict-backed lookup indexes over the Route records"""
+        self.catalog_version += 1
+        self._routes_by_id = {}
+        self._routes_by_country = {}
+        self._routes_by_city = {}
+        for route in self.routes:
+            self._routes_by_id[route.id] = route
+            self._routes_by_country.setdefault(route.country_code, []).append(route)
+            self._routes_by_city.setdefault(route.city, []).append(route)
+        self._search_index = RouteSearchIndex(self.routes)
+    
+    def reload_routes(self, routes=None):
+        """Replace the route catalog (regenerated when routes is None) and respawn the fleet on it"""
+        self.routes = self._generate_routes() if routes is None else routes
+        self._build_indexes()
+        self.fleet = self._generate_vehicles()
+    
+    def load_scenario(self, path):
+        """Replace regions, routes and fleet with a scenario saved by scripts/generate_scenario.py"""
+        scenario = load_scenario(path)
+        self.regions = scenario.regions
+        self.routes = scenario.routes
+        self._build_indexes()
+        fleet = FleetSimulation(self.routes, seed=self.seed)
+        fleet.load(scenario.columns, scenario.ids, scenario.statuses)
+        self.fleet = fleet
+        counts = scenario.manifest["counts"]
+        print(f"Loaded scenario {path}: {counts['routes']} routes, {counts['vehicles']} vehicles")
+    
+    def load_snapshot(self, path):
+        """Load a warm snapshot saved from the same source. Returns False when there is none to use."""
+        snapshot = load_snapshot(path, self.source)
+        if snapshot is None:
+            return False
+        self.regions = snapshot.regions
+        self.routes = snapshot.routes
+        self._build_indexes()
+        fleet = FleetSimulation(self.routes, seed=self.seed)
+        fleet.load(snapshot.columns, snapshot.ids, snapshot.statuses, snapshot.grid)
+        self.fleet = fleet
+        return True
+    
+    def save_snapshot(self, path):
+        """Persist regions, routes and the current fleet for the next start"""
+        try:
+            save_snapshot(path, self.source, self.regions, self.routes, self.fleet.snapshot())
+        except OSError as e:
+            print(f"Could not save warm snapshot to {path}: {e}")
+    
     def get_routes_by_region(self, country_code=None, city=None):
-        """Get routes filtered by region"""
-        filtered_routes = self.routes
+        """Get Route records filtered by region"""
+        if city:
+            filtered_routes = self._routes_by_city.get(city, [])
+            if country_code:
+                filtered_routes = [r for r in filtered_routes if r.country_code == country_code]
+            return list(filtered_routes)
         
         if country_code:
-            filtered_routes = [r for r in filtered_routes if r["country_code"] == country_code]
+            return list(self._routes_by_country.get(country_code, []))
         
-        if city:
-            filtered_routes = [r for r in filtered_routes if r["city"] == city]
-        
-        return filtered_routes
+        return self.routes
     
     def search_routes(self, query, country_code=None):
-        """Search routes by name or number"""
-        query = query.lower()
-        results = []
-        
-        for route in self.routes:
-            if country_code and route["country_code"] != country_code:
-                continue
-            
-            if (query in route["name"].lower() or 
-                query in route["route_number"].lower() or
-                query in route["city"].lower()):
-                results.append(route)
-        
-        return results[:20]  # Limit to 20 results
+        """Search routes by name, number or city (first page of results)"""
+        return self.search_routes_page(query, country_code)["results"]
+    
+    def search_routes_page(self, query, country_code=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        One page of ranked search results: {"results": [...], "next_cursor": ...}.
+        Pass next_cursor back to get the following page.
+        """
+        return self._search_index.search(query, country_code, limit, cursor)
     
     def get_route_by_id(self, route_id):
-        """Get specific route details"""
-        for route in self.routes:
-            if route["id"] == route_id:
-                return route
-        return None
+        """Get a Route record by id"""
+        return self._routes_by_id.get(route_id)
     
     def get_vehicles_by_route(self, route_id):
         """Get all vehicles for a specific route"""
-        return [v for v in self.vehicles if v["route_id"] == route_id]
+        snapshot = self.fleet.snapshot()
+        return snapshot.vehicle_dicts(snapshot.rows_for_route(route_id))
+    
+    def get_vehicle_by_id(self, vehicle_id):
+        """Get a single vehicle"""
+        snapshot = self.fleet.snapshot()
+        row = snapshot.row_of(vehicle_id)
+        if row is None:
+            return None
+        return snapshot.vehicle_dicts([row])[0]
+    
+    def add_vehicle(self, vehicle):
+        """Add a vehicle to the fleet and index it under its route"""
+        self.fleet.add(vehicle)
+        return self.get_vehicle_by_id(vehicle["id"])
+    
+    def remove_vehicle(self, vehicle_id):
+        """Remove a vehicle from the fleet. Returns the removed vehicle or None."""
+        vehicle = self.get_vehicle_by_id(vehicle_id)
+        if vehicle:
+            self.fleet.remove(vehicle_id)
+        return vehicle
+    
+    def move_vehicle(self, vehicle_id, route_id):
+        """Reassign a vehicle to another route"""
+        self.fleet.move(vehicle_id, route_id)
+        return self.get_vehicle_by_id(vehicle_id)
     
     def update_vehicle_positions(self):
-        """Simulate vehicle movement"""
-        for vehicle in self.vehicles:
-            route = self.get_route_by_id(vehicle["route_id"])
-            if not route or not route["stops"]:
-                continue
-            
-            # Move vehicle slightly along the route
-            vehicle["position"]["lat"] += random.uniform(-0.001, 0.001)
-            vehicle["position"]["lng"] += random.uniform(-0.001, 0.001)
-            vehicle["speed"] = random.randint(20, 60)
-            vehicle["heading"] = (vehicle["heading"] + random.randint(-10, 10)) % 360
-            vehicle["occupancy"] = max(5, min(vehicle["capacity"], vehicle["occupancy"] + random.randint(-5, 5)))
-            
-            # Update next stops ETAs (decrease by 1 minute)
-            if "next_stops" in vehicle and len(vehicle["next_stops"]) >= 2:
-                vehicle["next_stops"][0]["eta"] = max(1, vehicle["next_stops"][0]["eta"] - 1)
-                vehicle["next_stops"][1]["eta"] = max(2, vehicle["next_stops"][1]["eta"] - 1)
-                
-                # If first stop ETA is 0, move to next stop
-                if vehicle["next_stops"][0]["eta"] <= 1:
-                    # Find current position in route
-                    for i, stop in enumerate(route["stops"]):
-                        if stop["name"] == vehicle["next_stops"][0]["name"]:
-                            # Move to next stops
-                            next_1_idx = min(i + 1, len(route["stops"]) - 1)
-                            next_2_idx = min(i + 2, len(route["stops"]) - 1)
-                            
-                            vehicle["next_stops"] = [
-                                {
-                                    "name": route["stops"][next_1_idx]["name"],
-                                    "eta": random.randint(3, 8)
-                                },
-                                {
-                                    "name": route["stops"][next_2_idx]["name"],
-                                    "eta": random.randint(10, 18)
-                                }
-                            ]
-                            break
-            
-            # Occasionally update status
-            if random.random() < 0.1:  # 10% chance
-                vehicle["status"] = random.choice(["On Time", "Delayed 2 min", "On Time", "On Time", "On Time"])
-            
-            vehicle["last_updated"] = datetime.now().isoformat()
-        
-        return self.vehicles
+        """Simulate vehicle movement for the whole fleet in one vectorized step"""
+        self.fleet.step()
 
-# Global instance
-mock_data = MockDataGenerator()
+# Global instance, generated (or loaded) on first use
+mock_data = LazyInstance(MockDataGenerator, "Mock data")
\ No newline at end of file
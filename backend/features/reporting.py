@@ -1,11 +1,15 @@
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
+import heapq
+import os
+import threading
+import time
 
 reporting_bp = Blueprint('reporting', __name__)
 
-from services.firebase_service import firebase
-from firebase_admin import firestore
+from services.firebase_service import firebase, server_timestamp
+from services.write_behind import write_behind, new_document_id, WRITE_BEHIND_ENABLED
 
 reporting_bp = Blueprint('reporting', __name__)
 
@@ -14,6 +18,83 @@ REPORTS_COLLECTION = 'reports'
 
 EXCLUSION_TIMEOUT_MINUTES = 15
 
+# Seconds between re-reads of the active window, to pick up reports filed through other server processes
+EXCLUSION_RESYNC_SECONDS = float(os.environ.get('EXCLUSION_RESYNC_SECONDS', 60))
+
+
+class ExclusionWindow:
+    """
+    Vehicles reported within the last EXCLUSION_TIMEOUT_MINUTES.
+    A min-heap of (expires_at, vehicle_id) drops reports lazily as they age
+    out, on every add and lookup; a dict of vehicle_id -> latest expiry answers lookups in O(1).
+    Memory is bounded by the reports in the active window.
+    """
+
+    def __init__(self, timeout_minutes: float = EXCLUSION_TIMEOUT_MINUTES):
+        self.window = timedelta(minutes=timeout_minutes)
+        self._heap = []
+        self._expires = {}
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def add(self, vehicle_id: str, created_at: datetime):
+        """Record a report filed at created_at"""
+        expires_at = created_at + self.window
+        with self._lock:
+            now = datetime.now()
+            self._expire(now)
+            if expires_at <= now:
+                return
+            if expires_at > self._expires.get(vehicle_id, datetime.min):
+                self._expires[vehicle_id] = expires_at
+                heapq.heappush(self._heap, (expires_at, vehicle_id))
+
+    def _expire(self, now: datetime):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, vehicle_id = heapq.heappop(self._heap)
+            # A later report for the same vehicle keeps it excluded
+            if self._expires.get(vehicle_id) == expires_at:
+                del self._expires[vehicle_id]
+
+    def _sync(self):
+        """Seed (and periodically refresh) from the reports filed within the window"""
+        if self._synced_at is not None and time.monotonic() - self._synced_at < EXCLUSION_RESYNC_SECONDS:
+            return
+        self._synced_at = time.monotonic()
+        if not firebase.db:
+            return
+        try:
+            cutoff = datetime.now() - self.window
+            # 'created_at' is an ISO string, so string order is time order
+            reports = firebase.query_collection(REPORTS_COLLECTION, 'created_at', '>=', cutoff.isoformat())
+        except Exception as e:
+            print(f"Error fetching exclusions: {e}")
+            return
+        for report in reports:
+            created_at_str = report.get('created_at')
+            if created_at_str and report.get('vehicle_id'):
+                self.add(report['vehicle_id'], datetime.fromisoformat(created_at_str))
+
+    def is_excluded(self, vehicle_id: str) -> bool:
+        self._sync()
+        with self._lock:
+            now = datetime.now()
+            # Each entry is popped once, so expiring here is amortized O(1) per lookup
+            self._expire(now)
+            expires_at = self._expires.get(vehicle_id)
+            return expires_at is not None and expires_at > now
+
+    def vehicles(self) -> list:
+        self._sync()
+        with self._lock:
+            self._expire(datetime.now())
+            return list(self._expires)
+
+
+# Global instance
+exclusions = ExclusionWindow()
+
+
 @reporting_bp.route('/api/report', methods=['POST'])
 def submit_report():
     """
@@ -33,16 +114,21 @@ def submit_report():
             return jsonify({'success': False, 'error': 'Missing fields'}), 400
 
         # Create report object
+        created_at = datetime.now()
         report_data = {
             'vehicle_id': vehicle_id,
             'report_type': report_type,
             'route_id': route_id,
-            'timestamp': firestore.SERVER_TIMESTAMP,
-            'created_at': datetime.now().isoformat()
+            'timestamp': server_timestamp(),
+            'created_at': created_at.isoformat()
         }
         
-        # Save to Firestore
-        firebase.create_document(REPORTS_COLLECTION, report_data)
+        # Save to Firestore; queued, only a vehicle's latest report per flush is written
+        if WRITE_BEHIND_ENABLED and firebase.db:
+            write_behind.set_latest(('report', vehicle_id), (REPORTS_COLLECTION, new_document_id()), report_data)
+        else:
+            firebase.create_document(REPORTS_COLLECTION, report_data)
+        exclusions.add(vehicle_id, created_at)
 
         return jsonify({
             'success': True, 
@@ -58,35 +144,8 @@ def get_excluded_vehicles():
     Returns list of vehicle IDs that should be excluded/avoided.
     Filters out old reports.
     """
+    return exclusions.vehicles()
 
-    if not firebase.db:
-        return []
-
-    try:
-        # Calculate cutoff time
-        cutoff = datetime.now() - timedelta(minutes=EXCLUSION_TIMEOUT_MINUTES)
-        
-        # Query Firestore
-        # Note: In a real app, you would use a proper composite index and query
-        # For prototype, we might fetch recent reports and filter in python if index is missing
-        # But let's try a simple query.
-        
-        # Since we use SERVER_TIMESTAMP, querying by time might be tricky without the exact field type match in potential mock setup
-        # We will fetch all reports and filter in memory for this hackathon scale
-        
-        all_reports = firebase.get_collection(REPORTS_COLLECTION)
-        excluded = set()
-        
-        for report in all_reports:
-            # Check timestamp
-            # 'created_at' is stored as ISO string for easier parsing here if timestamp is a complex object
-            created_at_str = report.get('created_at')
-            if created_at_str:
-                created_at = datetime.fromisoformat(created_at_str)
-                if created_at > cutoff:
-                    excluded.add(report.get('vehicle_id'))
-                    
-        return list(excluded)
-    except Exception as e:
-        print(f"Error fetching exclusions: {e}")
-        return []
+def is_vehicle_excluded(vehicle_id):
+    """True if the vehicle was reported within the last EXCLUSION_TIMEOUT_MINUTES"""
+    return exclusions.is_excluded(vehicle_id)
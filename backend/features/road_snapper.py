@@ -0,0 +1,201 @@
+"""
+Road Snapper
+============
+Snaps vehicle positions onto the road network before they are served.
+
+- Points go to the Roads API `nearestRoads` endpoint in batches of 100, the
+  provider's per-request limit, dispatched concurrently on a thread pool
+- Results are cached by quantized coordinate (~1 m), so parked vehicles and
+  repeat positions never cost another call
+- Without an API key, points are projected onto their route's polyline
+  (the route's path, or its stops when there is no path) instead
+
+ROADS_API_URL can point at a local stand-in (scripts/roads_standin_server.py).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from features.route_records import Route
+
+ROADS_API_URL = os.environ.get("ROADS_API_URL", "https://roads.googleapis.com/v1/nearestRoads")
+
+# Provider limit on points per request
+BATCH_SIZE = 100
+
+# Decimal places kept in cache keys; 5 places is about 1.1 m
+SNAP_PRECISION = 5
+
+SNAP_CACHE_SIZE = 100000
+SNAP_WORKERS = 8
+SNAP_TIMEOUT_SECONDS = 10
+
+
+class RoadSnapper:
+    """Batched, cached, concurrent snap-to-road with a local polyline fallback"""
+
+    def __init__(self, api_key: Optional[str] = None, route_lookup: Optional[Callable[[str], Optional[Route]]] = None,
+                 url: str = ROADS_API_URL, cache_size: int = SNAP_CACHE_SIZE, workers: int = SNAP_WORKERS):
+        self.api_key = api_key
+        self.route_lookup = route_lookup
+        self.url = url
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[int, int], Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="road-snap")
+        self.workers = workers
+        self._session = None
+        self.stats = {"points": 0, "cache_hits": 0, "requests": 0, "projected": 0, "errors": 0}
+
+    @property
+    def session(self):
+        """Pooled HTTP session for the Roads API, created on the first request"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=self.workers))
+            session.mount("http://", HTTPAdapter(pool_maxsize=self.workers))
+            self._session = session
+        return self._session
+
+    # =========================================
+    # PUBLIC
+    # =========================================
+
+    def snap_points(self, lats, lngs, route_ids=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Snapped copies of the coordinate arrays. Points that can't be snapped
+        (API error, unknown route) keep their original position.
+        """
+        lats = np.array(lats, dtype=np.float64)
+        lngs = np.array(lngs, dtype=np.float64)
+        self.stats["points"] += len(lats)
+        if not len(lats):
+            return lats, lngs
+        if self.api_key:
+            return self._snap_with_api(lats, lngs)
+        if route_ids is not None and self.route_lookup:
+            return self._project_onto_routes(lats, lngs, route_ids)
+        return lats, lngs
+
+    def snap_vehicles(self, vehicles: List[Dict]) -> List[Dict]:
+        """Copies of the vehicle dicts with snapped lat/lng"""
+        if not vehicles:
+            return vehicles
+        lats, lngs = self.snap_points([v["lat"] for v in vehicles], [v["lng"] for v in vehicles],
+                                      [v.get("route_id") for v in vehicles])
+        return [{**v, "lat": lat, "lng": lng} for v, lat, lng in zip(vehicles, lats.tolist(), lngs.tolist())]
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    # =========================================
+    # ROADS API
+    # =========================================
+
+    def _snap_with_api(self, lats: np.ndarray, lngs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scale = 10 ** SNAP_PRECISION
+        keys = list(zip(np.round(lats * scale).astype(np.int64).tolist(), np.round(lngs * scale).astype(np.int64).tolist()))
+
+        # Resolve from cache; every distinct uncached key is requested once
+        missing: "OrderedDict[Tuple[int, int], None]" = OrderedDict()
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    self.stats["cache_hits"] += 1
+                else:
+                    missing[key] = None
+
+        if missing:
+            missing_keys = list(missing)
+            batches = [missing_keys[i:i + BATCH_SIZE] for i in range(0, len(missing_keys), BATCH_SIZE)]
+            for batch, snapped in zip(batches, self._pool.map(self._request_batch, batches)):
+                with self._lock:
+                    for key, point in zip(batch, snapped):
+                        if point is not None:
+                            self._cache[key] = point
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        out_lats, out_lngs = lats.copy(), lngs.copy()
+        with self._lock:
+            for i, key in enumerate(keys):
+                point = self._cache.get(key)
+                if point is not None:
+                    out_lats[i], out_lngs[i] = point
+        return out_lats, out_lngs
+
+    def _request_batch(self, batch: List[Tuple[int, int]]) -> List[Optional[Tuple[float, float]]]:
+        """One nearestRoads call for up to BATCH_SIZE quantized points"""
+        scale = 10 ** SNAP_PRECISION
+        points = "|".join(f"{lat / scale:.{SNAP_PRECISION}f},{lng / scale:.{SNAP_PRECISION}f}" for lat, lng in batch)
+        snapped: List[Optional[Tuple[float, float]]] = [None] * len(batch)
+        try:
+            self.stats["requests"] += 1
+            response = self.session.get(self.url, params={"points": points, "key": self.api_key},
+                                        timeout=SNAP_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            # A point near a two-way road can be returned twice; keep the first
+            for item in response.json().get("snappedPoints", []):
+                i = item.get("originalIndex")
+                if i is not None and 0 <= i < len(batch) and snapped[i] is None:
+                    location = item["location"]
+                    snapped[i] = (location["latitude"], location["longitude"])
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Roads API error: {e}")
+        return snapped
+
+    # =========================================
+    # LOCAL FALLBACK
+    # =========================================
+
+    def _project_onto_routes(self, lats: np.ndarray, lngs: np.ndarray, route_ids) -> Tuple[np.ndarray, np.ndarray]:
+        route_ids = np.asarray(route_ids, dtype=object)
+        out_lats, out_lngs = lats.copy(), lngs.copy()
+        for route_id in set(route_ids.tolist()):
+            polyline = self._polyline(route_id)
+            if polyline is None:
+                continue
+            rows = np.flatnonzero(route_ids == route_id)
+            out_lats[rows], out_lngs[rows] = project_onto_polyline(lats[rows], lngs[rows], polyline)
+            self.stats["projected"] += len(rows)
+        return out_lats, out_lngs
+
+    def _polyline(self, route_id) -> Optional[np.ndarray]:
+        route = self.route_lookup(route_id) if route_id is not None else None
+        if not route:
+            return None
+        points = route.polyline()
+        if not len(points):
+            return None
+        return np.frombuffer(points, dtype=np.float64).reshape(-1, 2)
+
+
+def project_onto_polyline(lats: np.ndarray, lngs: np.ndarray, polyline: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Closest point on the polyline (N x 2 lat/lng vertices) to each point, in planar degrees"""
+    if len(polyline) == 1:
+        return np.full(len(lats), polyline[0, 0]), np.full(len(lats), polyline[0, 1])
+
+    start, end = polyline[:-1], polyline[1:]
+    seg = end - start
+    seg_len2 = np.maximum((seg ** 2).sum(axis=1), 1e-18)
+
+    # points x segments: parameter of the projection, clamped to the segment
+    d_lat = lats[:, None] - start[None, :, 0]
+    d_lng = lngs[:, None] - start[None, :, 1]
+    t = np.clip((d_lat * seg[None, :, 0] + d_lng * seg[None, :, 1]) / seg_len2[None, :], 0.0, 1.0)
+    proj_lat = start[None, :, 0] + t * seg[None, :, 0]
+    proj_lng = start[None, :, 1] + t * seg[None, :, 1]
+
+    nearest = np.argmin((proj_lat - lats[:, None]) ** 2 + (proj_lng - lngs[:, None]) ** 2, axis=1)
+    rows = np.arange(len(lats))
+    return proj_lat[rows, nearest], proj_lng[rows, nearest]
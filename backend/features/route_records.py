@@ -0,0 +1,160 @@
+"""
+Route Records
+=============
+Compact in-memory representation of the route catalog.
+
+- Route is a __slots__ record instead of a dict per route plus a dict per stop
+- Strings repeated across routes (city, country, type, stop names, frequency)
+  are interned, so every route shares one copy
+- Stop and path coordinates are packed lat/lng pairs in one array('d') per
+  route (stops first, then the path): 16 bytes per point instead of a dict
+  and two float objects
+- JSON-shaped dicts are built only at the API boundary, by to_dict(),
+  optionally projected to a few fields so stops are only expanded on request
+"""
+
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_intern = sys.intern
+
+
+def _flatten(points: Iterable[Dict]) -> List[float]:
+    """[lat, lng, lat, lng, ...] from {"lat", "lng"} dicts"""
+    return [value for point in points for value in (point["lat"], point["lng"])]
+
+
+# Top-level fields of the API dict, in output order
+ROUTE_FIELDS = (
+    "id", "route_number", "name", "type", "city", "country", "country_code", "continent",
+    "stops", "path", "active", "frequency", "color",
+)
+
+
+class Route:
+    """One transit route. Stops are addressed by index; coordinates are packed."""
+
+    __slots__ = (
+        "id", "route_number", "name", "type", "city", "country", "country_code", "continent",
+        "active", "frequency", "color", "stop_names", "coords",
+    )
+
+    def __init__(self, id: str, route_number: str, name: str, type: str, city: str, country: str,
+                 country_code: str, continent: str, stop_names: Sequence[str], stop_coords: Sequence[float],
+                 path_coords: Sequence[float] = (), active: bool = True, frequency: Optional[str] = None,
+                 color: Optional[str] = None):
+        self.id = id
+        self.route_number = route_number
+        self.name = name
+        self.type = _intern(type)
+        self.city = _intern(city)
+        self.country = _intern(country)
+        self.country_code = _intern(country_code)
+        self.continent = _intern(continent)
+        self.active = active
+        self.frequency = _intern(frequency) if frequency is not None else None
+        self.color = _intern(color) if color is not None else None
+        self.stop_names = tuple(_intern(name) for name in stop_names)
+        # Built from a list so the buffer is allocated at its exact size
+        self.coords = array("d", [*stop_coords, *path_coords])
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Route":
+        """Record from the API dict shape (stops and path as lists of point dicts)"""
+        stops = data.get("stops") or []
+        return cls(
+            id=data["id"],
+            route_number=data["route_number"],
+            name=data["name"],
+            type=data["type"],
+            city=data["city"],
+            country=data["country"],
+            country_code=data["country_code"],
+            continent=data["continent"],
+            stop_names=[stop["name"] for stop in stops],
+            stop_coords=_flatten(stops),
+            path_coords=_flatten(data.get("path") or []),
+            active=data.get("active", True),
+            frequency=data.get("frequency"),
+            color=data.get("color"),
+        )
+
+    def __repr__(self):
+        return f"Route({self.id!r}, {self.name!r})"
+
+    # =========================================
+    # STOPS AND GEOMETRY
+    # =========================================
+
+    @property
+    def stop_count(self) -> int:
+        return len(self.stop_names)
+
+    @property
+    def stop_coords(self) -> array:
+        """Packed lat/lng pairs of the stops"""
+        return self.coords[:2 * len(self.stop_names)]
+
+    @property
+    def path_coords(self) -> array:
+        """Packed lat/lng pairs of the path"""
+        return self.coords[2 * len(self.stop_names):]
+
+    def stop_position(self, index: int) -> Tuple[float, float]:
+        """(lat, lng) of the stop at index (negative indexes count from the end)"""
+        if index < 0:
+            index += self.stop_count
+        return self.coords[2 * index], self.coords[2 * index + 1]
+
+    def polyline(self) -> array:
+        """Packed lat/lng pairs of the path, or of the stops when there is no path"""
+        path = self.path_coords
+        return path if len(path) else self.stop_coords
+
+    # =========================================
+    # API BOUNDARY
+    # =========================================
+
+    def stop_dicts(self) -> List[Dict]:
+        coords = self.coords
+        return [
+            {"name": name, "lat": coords[2 * i], "lng": coords[2 * i + 1], "order": i + 1}
+            for i, name in enumerate(self.stop_names)
+        ]
+
+    def path_dicts(self) -> List[Dict]:
+        coords = self.path_coords
+        return [{"lat": coords[i], "lng": coords[i + 1]} for i in range(0, len(coords), 2)]
+
+    def to_dict(self, fields: Optional[Sequence[str]] = None) -> Dict:
+        """
+        JSON-compatible dict in the shape the API has always returned, or
+        only the given ROUTE_FIELDS
+        """
+        if fields is not None:
+            return {name: self._field(name) for name in fields}
+        data = {
+            "id": self.id,
+            "route_number": self.route_number,
+            "name": self.name,
+            "type": self.type,
+            "city": self.city,
+            "country": self.country,
+            "country_code": self.country_code,
+            "continent": self.continent,
+            "stops": self.stop_dicts(),
+            "path": self.path_dicts(),
+            "active": self.active,
+            "frequency": self.frequency,
+        }
+        if self.color is not None:
+            data["color"] = self.color
+        return data
+
+    def _field(self, name: str):
+        if name == "stops":
+            return self.stop_dicts()
+        if name == "path":
+            return self.path_dicts()
+        return getattr(self, name)
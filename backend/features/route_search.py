@@ -0,0 +1,403 @@
+"""
+Route Search Index
+==================
+Inverted index over route `name`, `route_number` and `city`, built once with
+the route catalog.
+
+- Every query term matches whole tokens; the last term also matches as a
+  prefix, so results update as the user types
+- Words of 4+ letters tolerate one typo, 8+ letters two (insertions,
+  deletions, substitutions and transpositions), found through a
+  deletion-neighbourhood index instead of scanning the vocabulary. Terms with
+  digits (route numbers) must match exactly or as a prefix.
+- Results are ranked by match quality (exact, then prefix, then typo) and
+  returned a page at a time with an opaque cursor
+
+Posting lists are sorted NumPy arrays of route positions in one CSR block.
+When the rarest query term matches few routes, all candidates are scored and
+ranked at once. Otherwise (e.g. a bare city name) the candidate lists are
+intersected lazily from the cursor, one expansion combination at a time, so
+the cost depends on the page size rather than on how many routes match.
+"""
+
+import base64
+import bisect
+import heapq
+import json
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from features.route_records import Route
+
+# Ranking costs: lower is better. A route's cost is the sum over query terms.
+EXACT_COST = 0
+PREFIX_COST = 1
+TYPO_COST = 2  # per edit
+
+# Bounds on how far one query term is expanded, and on the combinations tried
+MAX_EXPANSIONS = 16
+MAX_COMBINATIONS = 32
+
+# Rank every candidate at once when the rarest term matches at most this many routes
+RANK_ALL_LIMIT = 5000
+
+# Candidates examined per streamed page before returning a short page with a cursor
+SCAN_BUDGET = 20000
+SCAN_CHUNK = 512
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def allowed_typos(term: str) -> int:
+    if not term.isalpha():
+        return 0
+    if len(term) >= 8:
+        return 2
+    if len(term) >= 4:
+        return 1
+    return 0
+
+
+def _deletes(token: str, distance: int) -> set:
+    """All strings reachable from token by deleting up to `distance` characters"""
+    found = {token}
+    frontier = {token}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class RouteSearchIndex:
+    """Token/prefix/typo-tolerant search over a fixed list of routes"""
+
+    def __init__(self, routes: List[Route]):
+        self.routes = routes
+        vocabulary: Dict[str, int] = {}
+        pair_tokens: List[int] = []
+        pair_routes: List[int] = []
+
+        for position, route in enumerate(routes):
+            tokens = set(tokenize(f"{route.name} {route.route_number} {route.city}"))
+            tokens.add(self._country_token(route.country_code))
+            for token in tokens:
+                tid = vocabulary.setdefault(token, len(vocabulary))
+                pair_tokens.append(tid)
+                pair_routes.append(position)
+
+        self.vocabulary = vocabulary
+        self.tokens = sorted(vocabulary)
+        self.token_by_id = [""] * len(vocabulary)
+        for token, tid in vocabulary.items():
+            self.token_by_id[tid] = token
+
+        # CSR postings: routes of token tid are members[offsets[tid]:offsets[tid + 1]], ascending
+        tids = np.array(pair_tokens, dtype=np.int32)
+        positions = np.array(pair_routes, dtype=np.int32)
+        order = np.lexsort((positions, tids))
+        self.members = positions[order]
+        self.offsets = np.searchsorted(tids[order], np.arange(len(vocabulary) + 1)).astype(np.int64)
+        self.document_frequency = np.diff(self.offsets)
+
+        self._build_typo_index()
+        self._build_short_prefixes()
+
+    @staticmethod
+    def _country_token(country_code: Optional[str]) -> str:
+        # Not matchable by \w+ tokenization, so user queries can't hit it
+        return f"@country:{country_code}"
+
+    def _build_typo_index(self):
+        """Deletion neighbourhoods: a query within distance d of a token shares a deletion variant with it"""
+        self._typo_index: Dict[str, List[int]] = {}
+        for token, tid in self.vocabulary.items():
+            if token.startswith("@") or len(token) < 3:
+                continue
+            # Queries allowed two typos are 8+ long, so only tokens of 6+ can be two edits away
+            distance = 2 if len(token) >= 6 else 1
+            for variant in _deletes(token, distance):
+                self._typo_index.setdefault(variant, []).append(tid)
+
+    def _build_short_prefixes(self):
+        """Best completions for 1-2 character prefixes, which match too many tokens to rank per query"""
+        self._short_prefixes: Dict[str, List[int]] = {}
+        for token, tid in self.vocabulary.items():
+            if token.startswith("@"):
+                continue
+            for length in (1, 2):
+                if len(token) > length:
+                    self._short_prefixes.setdefault(token[:length], []).append(tid)
+        for prefix, tids in self._short_prefixes.items():
+            tids.sort(key=self._completion_order)
+            del tids[MAX_EXPANSIONS:]
+
+    def _completion_order(self, tid: int):
+        token = self.token_by_id[tid]
+        return (len(token), -int(self.document_frequency[tid]), token)
+
+    def postings(self, tid: int) -> np.ndarray:
+        return self.members[self.offsets[tid]:self.offsets[tid + 1]]
+
+    # =========================================
+    # QUERY EXPANSION
+    # =========================================
+
+    def _expand(self, term: str, is_last: bool) -> List[Tuple[int, int]]:
+        """(token id, cost) matches for one query term, cheapest first"""
+        matches: Dict[int, int] = {}
+        tid = self.vocabulary.get(term)
+        if tid is not None:
+            matches[tid] = EXACT_COST
+
+        if is_last:
+            for tid in self._completions(term):
+                matches.setdefault(tid, PREFIX_COST)
+
+        typos = allowed_typos(term)
+        if typos:
+            candidates = set()
+            for variant in _deletes(term, typos):
+                candidates.update(self._typo_index.get(variant, ()))
+            for tid in candidates:
+                if tid in matches:
+                    continue
+                distance = edit_distance(term, self.token_by_id[tid], typos)
+                if distance <= typos:
+                    matches[tid] = TYPO_COST * distance
+
+        ranked = sorted(matches.items(), key=lambda item: (item[1],) + self._completion_order(item[0]))
+        return ranked[:MAX_EXPANSIONS]
+
+    def _completions(self, prefix: str) -> List[int]:
+        """Tokens strictly longer than prefix that start with it, shortest and most common first"""
+        if len(prefix) <= 2:
+            return self._short_prefixes.get(prefix, [])
+        start = bisect.bisect_left(self.tokens, prefix)
+        tids = []
+        for token in self.tokens[start:start + MAX_EXPANSIONS * 8 + 1]:
+            if not token.startswith(prefix):
+                break
+            if token != prefix:
+                tids.append(self.vocabulary[token])
+        tids.sort(key=self._completion_order)
+        return tids[:MAX_EXPANSIONS]
+
+    def _expansions(self, query: str, country_code: Optional[str]) -> List[List[Tuple[int, int]]]:
+        """Expansions of every query term (plus the country filter), or [] if some term matches nothing"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        expansions = [self._expand(term, i == len(terms) - 1) for i, term in enumerate(terms)]
+        if country_code:
+            tid = self.vocabulary.get(self._country_token(country_code))
+            expansions.append([(tid, EXACT_COST)] if tid is not None else [])
+        if any(not options for options in expansions):
+            return []
+        return expansions
+
+    @staticmethod
+    def _combinations(expansions: List[List[Tuple[int, int]]]) -> List[Tuple[int, Tuple[int, ...]]]:
+        """(cost, token ids) per way of matching every term, best first"""
+        # Best-first walk over one expansion per term, so long queries don't multiply out
+        def cost_of(indexes):
+            return sum(options[i][1] for options, i in zip(expansions, indexes))
+
+        first = (0,) * len(expansions)
+        heap = [(cost_of(first), first)]
+        visited = {first}
+        combinations = []
+        seen_tids = set()
+        while heap and len(combinations) < MAX_COMBINATIONS:
+            cost, indexes = heapq.heappop(heap)
+            tids = tuple(sorted({options[i][0] for options, i in zip(expansions, indexes)}))
+            # Two terms can expand to the same token set
+            if tids not in seen_tids:
+                seen_tids.add(tids)
+                combinations.append((cost, tids))
+            for term in range(len(expansions)):
+                if indexes[term] + 1 < len(expansions[term]):
+                    following = indexes[:term] + (indexes[term] + 1,) + indexes[term + 1:]
+                    if following not in visited:
+                        visited.add(following)
+                        heapq.heappush(heap, (cost_of(following), following))
+        return combinations
+
+    # =========================================
+    # SEARCH
+    # =========================================
+
+    def search(self, query: str, country_code: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+               cursor: Optional[str] = None) -> Dict:
+        """
+        One page of matching routes, best matches first.
+        Returns {"results": [...], "next_cursor": str or None}.
+        Raises ValueError for a cursor that doesn't belong to this query.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        fingerprint = zlib.crc32(f"{query.casefold()}|{country_code}".encode())
+        position = self._decode_cursor(cursor, fingerprint) if cursor else None
+
+        expansions = self._expansions(query, country_code)
+        if not expansions:
+            return {"results": [], "next_cursor": None}
+
+        sizes = [sum(int(self.document_frequency[tid]) for tid, _ in options) for options in expansions]
+        mode = "r" if min(sizes) <= RANK_ALL_LIMIT else "s"
+        if position is not None and position[0] != mode:
+            raise ValueError("Cursor does not match this query")
+        if mode == "r":
+            results, position = self._search_ranked(expansions, sizes, limit, position)
+        else:
+            results, position = self._search_streamed(expansions, limit, position)
+
+        next_cursor = self._encode_cursor(position, fingerprint) if position is not None else None
+        return {"results": [self.routes[i] for i in results], "next_cursor": next_cursor}
+
+    def _search_ranked(self, expansions, sizes, limit, after):
+        """
+        Score every route matching the rarest term, keep those matching all
+        terms, and order by (cost, position). `after` is the cursor position
+        ("r", cost, route) of the last route already returned.
+        """
+        driver = int(np.argmin(sizes))
+        routes = np.concatenate([self.postings(tid) for tid, _ in expansions[driver]])
+        costs = np.concatenate([np.full(self.document_frequency[tid], cost) for tid, cost in expansions[driver]])
+        # Keep each route once, at its cheapest expansion
+        order = np.lexsort((costs, routes))
+        routes, costs = routes[order], costs[order]
+        first = np.ones(len(routes), dtype=bool)
+        first[1:] = routes[1:] != routes[:-1]
+        routes, total = routes[first], costs[first].astype(np.int64)
+
+        for term, options in enumerate(expansions):
+            if term == driver:
+                continue
+            best = np.full(len(routes), np.iinfo(np.int64).max)
+            for tid, cost in options:
+                hit = _contains(self.postings(tid), routes)
+                best[hit] = np.minimum(best[hit], cost)
+            matched = best < np.iinfo(np.int64).max
+            routes, total = routes[matched], total[matched] + best[matched]
+
+        # Rank key packs (cost, position) into one sortable integer
+        keys = np.sort(total * len(self.routes) + routes)
+        start = 0
+        if after is not None:
+            start = int(np.searchsorted(keys, after[1] * len(self.routes) + after[2], side="right"))
+        page = keys[start:start + limit] % len(self.routes)
+        if start + limit >= len(keys):
+            return page.tolist(), None
+        last = int(keys[start + limit - 1])
+        return page.tolist(), ("r", last // len(self.routes), last % len(self.routes))
+
+    def _search_streamed(self, expansions, limit, position):
+        """Walk expansion combinations best first, intersecting posting lists lazily from the cursor"""
+        combinations = self._combinations(expansions)
+        combo_index, start = position[1:] if position else (0, 0)
+        results: List[int] = []
+        budget = SCAN_BUDGET
+
+        while combo_index < len(combinations) and len(results) < limit and budget > 0:
+            lists = [self.postings(tid) for tid in combinations[combo_index][1]]
+            earlier = [[self.postings(tid) for tid in tids] for _, tids in combinations[:combo_index]]
+            found, start, scanned = self._intersect(lists, earlier, start, limit - len(results), budget)
+            results.extend(found)
+            budget -= scanned
+            if start is None:
+                combo_index, start = combo_index + 1, 0
+
+        if combo_index < len(combinations):
+            return results, ("s", combo_index, start)
+        return results, None
+
+    @staticmethod
+    def _intersect(lists: List[np.ndarray], earlier: List[List[np.ndarray]], start: int, wanted: int,
+                   budget: int) -> Tuple[List[int], Optional[int], int]:
+        """
+        Routes in every list from position `start` on, skipping those already
+        returned for an earlier (better ranked) combination.
+        Returns (routes, next start or None when exhausted, candidates scanned).
+        """
+        lists = sorted(lists, key=len)
+        driver, others = lists[0], lists[1:]
+        i = int(np.searchsorted(driver, start))
+        found: List[int] = []
+        scanned = 0
+
+        while i < len(driver) and len(found) < wanted and scanned < budget:
+            chunk = driver[i:i + SCAN_CHUNK]
+            keep = np.ones(len(chunk), dtype=bool)
+            for other in others:
+                keep &= _contains(other, chunk)
+            for combo in earlier:
+                seen = np.ones(len(chunk), dtype=bool)
+                for postings in combo:
+                    seen &= _contains(postings, chunk)
+                keep &= ~seen
+            hits = chunk[keep]
+            scanned += len(chunk)
+            if len(found) + len(hits) >= wanted:
+                # Resume right after the last route this page needs
+                hits = hits[:wanted - len(found)]
+                found.extend(hits.tolist())
+                return found, int(hits[-1]) + 1, scanned
+            found.extend(hits.tolist())
+            i += len(chunk)
+
+        return found, (int(driver[i]) if i < len(driver) else None), scanned
+
+    @staticmethod
+    def _encode_cursor(position: Tuple[str, int, int], fingerprint: int) -> str:
+        """Opaque cursor: ("r", cost, route) after a ranked page, ("s", combination, start) after a streamed one"""
+        raw = json.dumps([*position, fingerprint], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, fingerprint: int) -> Tuple[str, int, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            mode, first, second, cursor_fingerprint = json.loads(raw)
+            first, second = int(first), int(second)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        if cursor_fingerprint != fingerprint or mode not in ("r", "s") or first < 0 or second < 0:
+            raise ValueError("Cursor does not match this query")
+        return mode, first, second
+
+
+def _contains(sorted_array: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Vectorized membership test of values in a sorted array"""
+    if not len(sorted_array):
+        return np.zeros(len(values), dtype=bool)
+    idx = np.searchsorted(sorted_array, values)
+    idx[idx == len(sorted_array)] = 0
+    return sorted_array[idx] == values
@@ -5,22 +5,31 @@ Routes API - Endpoints for managing and querying transport routes
 from flask import Blueprint, jsonify, request
 from features.mock_data_generator import mock_data
 from features.gtfs_handler import gtfs_handler
-from features.reporting import get_excluded_vehicles
-import googlemaps
-import os
+from features.reporting import is_vehicle_excluded
+from features.tick_scheduler import TickScheduler
+from services.directions_cache import directions_cache, DIRECTIONS_PREFETCH_SECONDS
+from services.response_cache import page_cache, response_cache
+from services.pagination import encode_cursor, parse_fields, parse_page
+from features.route_records import ROUTE_FIELDS
 
 routes_bp = Blueprint('routes', __name__)
 
+# Keeps directions for the most viewed routes warm, started from main.py when a Maps key is set
+directions_prefetcher = TickScheduler(directions_cache.prefetch_popular, interval=DIRECTIONS_PREFETCH_SECONDS)
+
 @routes_bp.route('/api/regions', methods=['GET'])
 def get_regions():
-    """Get all available regions/countries"""
+    """Get all available regions/countries (pre-encoded, cached until the catalog reloads)"""
     try:
-        regions = mock_data.get_all_regions()
-        return jsonify({
-            "success": True,
-            "data": regions,
-            "count": len(regions)
-        }), 200
+        def build():
+            regions = mock_data.get_all_regions()
+            return {
+                "success": True,
+                "data": regions,
+                "count": len(regions)
+            }
+        
+        return response_cache.respond(("regions",), mock_data.catalog_version, build)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -29,22 +38,51 @@ def get_regions():
 
 @routes_bp.route('/api/routes', methods=['GET'])
 def get_routes():
-    """Get routes, optionally filtered by region"""
+    """
+    Get routes, optionally filtered by region (pre-encoded per query, cached until the catalog reloads).
+    ?limit=&cursor= page through the catalog; ?fields=id,name,... builds only the listed fields.
+    """
     try:
         country_code = request.args.get('country')
         city = request.args.get('city')
+        version = mock_data.catalog_version
         
-        routes = mock_data.get_routes_by_region(country_code, city)
+        try:
+            page = parse_page(request.args)
+            projection = parse_fields(request.args, ROUTE_FIELDS)
+            start = 0
+            if page and page[1] is not None:
+                cursor_version, start = page[1]
+                if cursor_version != version or not isinstance(start, int) or start < 0:
+                    raise ValueError("Cursor expired: the route catalog was reloaded")
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
         
-        return jsonify({
-            "success": True,
-            "data": routes,
-            "count": len(routes),
-            "filters": {
-                "country": country_code,
-                "city": city
+        def build():
+            routes = mock_data.get_routes_by_region(country_code, city)
+            paging = {}
+            if page is not None:
+                end = start + page[0]
+                paging["next_cursor"] = encode_cursor([version, end]) if end < len(routes) else None
+                routes = routes[start:end]
+            return {
+                "success": True,
+                "data": [route.to_dict(projection) for route in routes],
+                "count": len(routes),
+                "filters": {
+                    "country": country_code,
+                    "city": city
+                },
+                **paging
             }
-        }), 200
+        
+        # Pages and projections have many keys, each rarely reused: cheap compression, separate LRU
+        cache = response_cache if page is None and projection is None else page_cache
+        key = ("routes", country_code, city, page and page[0], start, projection)
+        return cache.respond(key, version, build)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -53,7 +91,7 @@ def get_routes():
 
 @routes_bp.route('/api/routes/search', methods=['GET'])
 def search_routes():
-    """Search routes by name, number, or city"""
+    """Search routes by name, number, or city. Paginated with limit and cursor."""
     try:
         query = request.args.get('q', '')
         country_code = request.args.get('country')
@@ -64,13 +102,24 @@ def search_routes():
                 "error": "Search query is required"
             }), 400
         
-        results = mock_data.search_routes(query, country_code)
+        try:
+            page = mock_data.search_routes_page(
+                query, country_code,
+                limit=request.args.get('limit', 20, type=int),
+                cursor=request.args.get('cursor')
+            )
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
         
         return jsonify({
             "success": True,
-            "data": results,
-            "count": len(results),
-            "query": query
+            "data": [route.to_dict() for route in page["results"]],
+            "count": len(page["results"]),
+            "query": query,
+            "next_cursor": page["next_cursor"]
         }), 200
     except Exception as e:
         return jsonify({
@@ -82,9 +131,6 @@ def search_routes():
 def get_route_details(route_id):
     """Get detailed information about a specific route"""
     try:
-        # Check if route is excluded/disrupted
-        excluded_vehicles = get_excluded_vehicles()
-        
         # Get base route data
         route = mock_data.get_route_by_id(route_id)
         
@@ -94,34 +140,20 @@ def get_route_details(route_id):
                 "error": "Route not found"
             }), 404
 
-        # If we have a Google Maps Key, try to get real Directions
-        api_key = os.environ.get('GOOGLE_MAPS_API_KEY')
-        if api_key:
-            try:
-                gmaps = googlemaps.Client(key=api_key)
-                # Parse origin/dest from route stops (mock data usually has stops)
-                if route.get('stops') and len(route['stops']) >= 2:
-                    origin = f"{route['stops'][0]['lat']},{route['stops'][0]['lng']}"
-                    dest = f"{route['stops'][-1]['lat']},{route['stops'][-1]['lng']}"
-                    
-                    # Request directions
-                    # If there are reports on this route's vehicles, we might want to avoid them
-                    # But Google API 'avoid' is for tools/highways. 
-                    # We can't strictly avoid a specific bus ID via Directions API.
-                    # We simply return the standard route, but frontend will show alerts.
-                    
-                    directions = gmaps.directions(origin, dest, mode='transit')
-                    if directions:
-                        route['google_directions'] = directions[0]
-            except Exception as g_err:
-                print(f"Google Maps API Error: {g_err}")
+        # Real Directions from the shared cache; stale entries are refreshed in the background.
+        # Google's 'avoid' is for tolls/highways, so reported vehicles can't be routed around;
+        # we return the standard route and the frontend shows alerts.
+        directions = directions_cache.get(route)
+        route = route.to_dict()
+        if directions:
+            route['google_directions'] = directions
 
         # Check for active alerts on this route's vehicles
         # This is a bit indirect since we map vehicles to routes manually in mock data
         vehicles = mock_data.get_vehicles_by_route(route_id)
         alerts = []
         for v in vehicles:
-            if v['id'] in excluded_vehicles:
+            if is_vehicle_excluded(v['id']):
                 alerts.append({
                     'vehicle_id': v['id'],
                     'message': 'Vehicle reported with issues. Re-routing suggested.'
@@ -138,3 +170,20 @@ def get_route_details(route_id):
             "success": False,
             "error": str(e)
         }), 500
+
+@routes_bp.route('/api/realtime/<region_key>', methods=['GET'])
+def get_realtime_vehicles(region_key):
+    """Get live vehicle positions from a region's GTFS-Realtime feed, optionally for one route_id"""
+    try:
+        vehicles = gtfs_handler.fetch_vehicle_positions(region_key, request.args.get('route_id'))
+        return jsonify({
+            "success": True,
+            "data": vehicles,
+            "count": len(vehicles),
+            "source": gtfs_handler.source(region_key)
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
@@ -0,0 +1,344 @@
+"""
+Scenario Generator
+==================
+Seeded, vectorized synthetic transit networks for load tests.
+
+generate_scenario() builds cities, routes, stops and vehicles with NumPy
+from a single seed and writes them to a directory of .npy files plus a
+manifest.json. The same seed and ScenarioConfig always produce the same
+network and fleet; only the timestamps differ. Vehicles are generated and
+written to disk chunk by chunk, so multi-million vehicle fleets are never
+held in memory.
+
+load_scenario() reads a saved scenario back as the region table, Route
+records and memory-mapped fleet columns. MockDataGenerator loads one at
+startup when SCENARIO_PATH is set, instead of generating its data.
+
+Distributions:
+- City sizes follow a Zipf law over the base region table's cities (in
+  table order) and the synthetic cities added around them; routes are
+  shared out in proportion
+- Route types are mostly buses; route length is log-normal around a
+  per-type median and stops per route are Poisson, clipped
+- Vehicles per route follow a log-normal route popularity, so a few trunk
+  routes carry many vehicles; headways follow from the vehicle count
+- Speed, capacity and ETAs depend on the route type; occupancy is a
+  beta-distributed share of capacity
+"""
+
+import copy
+import json
+import math
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from features.fleet_simulation import STATUSES, FleetSimulation, SequentialIds
+from features.route_records import Route
+from features.vehicle_grid import VehicleGrid
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+TYPES = ("Bus", "Metro", "Tram", "Light Rail")
+TYPE_SHARE = (0.7, 0.1, 0.12, 0.08)
+TYPE_KM_MEDIAN = (10.0, 18.0, 7.0, 25.0)        # route length
+TYPE_SPEED = (22, 38, 18, 45)                   # mean km/h
+TYPE_CAPACITY = ((40, 90), (600, 1000), (100, 200), (200, 400))
+TYPE_POPULARITY = (1.0, 3.0, 1.5, 2.0)          # vehicles per route, relative
+METRO_LINES = ("Red", "Blue", "Green", "Yellow", "Orange", "Purple")
+
+ZIPF_EXPONENT = 1.1
+SYNTHETIC_CITY_SPREAD = 1.0   # degrees around the base city a synthetic city is placed
+DELAYED_SHARE = 0.15
+KM_PER_DEGREE = 111.0
+
+
+@dataclass
+class ScenarioConfig:
+    """Size and shape of a generated scenario"""
+    seed: int = 0
+    cities: int = 50           # base region table cities first, then synthetic ones
+    routes: int = 10000
+    vehicles: int = 100000
+    stops_mean: float = 14
+    stops_min: int = 5
+    stops_max: int = 40
+    stop_pool: int = 200       # distinct stop names per synthetic city
+    chunk_size: int = 1000000  # vehicles generated and written per chunk
+
+
+@dataclass
+class Scenario:
+    """A scenario loaded back from disk"""
+    manifest: Dict
+    regions: Dict
+    routes: List[Route]
+    columns: Dict[str, np.ndarray]
+    ids: Sequence[str]
+    statuses: List[str]
+    grid: Optional[VehicleGrid] = None
+
+
+# =========================================
+# CITIES
+# =========================================
+
+def _flatten_cities(regions: Dict) -> List[Tuple[str, str, Dict, Dict]]:
+    """(continent, country code, country data, city) for every city, in table order"""
+    return [
+        (continent, country_code, country_data, city)
+        for continent, countries in regions.items()
+        for country_code, country_data in countries.items()
+        for city in country_data["cities"]
+    ]
+
+
+def _add_cities(regions: Dict, count: int, rng: np.random.Generator) -> Dict:
+    """Copy of the region table grown to count cities, placing synthetic towns around existing cities"""
+    regions = copy.deepcopy(regions)
+    base = _flatten_cities(regions)
+    missing = count - len(base)
+    if missing <= 0 or not base:
+        return regions
+
+    anchors = rng.integers(0, len(base), missing)
+    offsets = rng.normal(0, SYNTHETIC_CITY_SPREAD, (missing, 2))
+    for i, (anchor, (d_lat, d_lng)) in enumerate(zip(anchors.tolist(), offsets.tolist())):
+        _, _, country_data, city = base[anchor]
+        country_data["cities"].append({
+            "name": f"{city['name']} Township {i + 1}",
+            "lat": round(city["lat"] + d_lat, 6),
+            "lng": round(city["lng"] + d_lng, 6),
+        })
+    return regions
+
+
+def _stop_pools(cities, pool_size: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Flat stop name table with each city's (offset, size) in it. Cities without stop lists get numbered stops."""
+    names: List[str] = []
+    offsets, sizes = [], []
+    for _, _, _, city in cities:
+        pool = city.get("stops") or [f"{city['name']} Stop {k + 1}" for k in range(pool_size)]
+        offsets.append(len(names))
+        sizes.append(len(pool))
+        names.extend(pool)
+    return names, np.array(offsets, dtype=np.int64), np.array(sizes, dtype=np.int64)
+
+
+# =========================================
+# GENERATION
+# =========================================
+
+def generate_scenario(path: str, config: ScenarioConfig, regions: Dict) -> Dict:
+    """
+    Generate a scenario on top of a base region table (MockDataGenerator's
+    shape) and write it to the directory at path. Returns the manifest.
+    """
+    os.makedirs(path, exist_ok=True)
+    chunks = max(1, math.ceil(config.vehicles / config.chunk_size))
+    network_seed, *chunk_seeds = np.random.SeedSequence(config.seed).spawn(1 + chunks)
+    rng = np.random.default_rng(network_seed)
+
+    regions = _add_cities(regions, config.cities, rng)
+    cities = _flatten_cities(regions)[:config.cities]
+    city_lat = np.array([city["lat"] for *_, city in cities])
+    city_lng = np.array([city["lng"] for *_, city in cities])
+    _, pool_offset, pool_size = _stop_pools(cities, config.stop_pool)
+
+    # Cities: Zipf-distributed size, routes in proportion
+    weight = 1 / np.arange(1, len(cities) + 1) ** ZIPF_EXPONENT
+    weight /= weight.sum()
+    routes_per_city = rng.multinomial(config.routes, weight)
+    radius = 0.03 + 0.12 * np.sqrt(weight / weight.max())
+    for (_, _, _, city), count in zip(cities, routes_per_city.tolist()):
+        city["routes"] = count
+
+    # Routes: type, geometry and stop count
+    n_routes = config.routes
+    route_city = np.repeat(np.arange(len(cities), dtype=np.int32), routes_per_city)
+    route_type = rng.choice(len(TYPES), n_routes, p=TYPE_SHARE).astype(np.int8)
+    route_number = rng.integers(1, 1000, n_routes, dtype=np.int16)
+    length_km = rng.lognormal(np.log(np.array(TYPE_KM_MEDIAN)[route_type]), 0.4)
+    start_lat = city_lat[route_city] + rng.normal(0, 1, n_routes) * radius[route_city]
+    start_lng = city_lng[route_city] + rng.normal(0, 1, n_routes) * radius[route_city]
+    angle = rng.uniform(0, 2 * np.pi, n_routes)
+    length = length_km / KM_PER_DEGREE
+    lng_scale = 1 / np.cos(np.radians(start_lat))
+    d_lat = length * np.cos(angle)
+    d_lng = length * np.sin(angle)
+    bend = rng.normal(0, 0.15, n_routes) * length
+
+    stops = np.clip(rng.poisson(config.stops_mean, n_routes), config.stops_min, config.stops_max)
+    stops = np.maximum(np.minimum(stops, pool_size[route_city]), 2)
+    stop_offset = np.zeros(n_routes + 1, dtype=np.int64)
+    np.cumsum(stops, out=stop_offset[1:])
+
+    # Stops: spread along a gently bent line, consecutive names from the city's pool
+    stop_route = np.repeat(np.arange(n_routes), stops)
+    position = np.arange(stop_offset[-1]) - stop_offset[stop_route]
+    t = position / (stops[stop_route] - 1)
+    sway = bend[stop_route] * np.sin(np.pi * t)
+    stop_lat = start_lat[stop_route] + d_lat[stop_route] * t - np.sin(angle[stop_route]) * sway
+    stop_lng = start_lng[stop_route] + (d_lng[stop_route] * t + np.cos(angle[stop_route]) * sway) * lng_scale[stop_route]
+    first_name = rng.integers(0, pool_size[route_city])
+    city_of_stop = route_city[stop_route]
+    stop_name = (pool_offset[city_of_stop] + (first_name[stop_route] + position) % pool_size[city_of_stop]).astype(np.int32)
+    del stop_route, position, t, sway, city_of_stop
+
+    # Vehicles per route by popularity; headway from the round trip time
+    popularity = rng.lognormal(0, 0.8, n_routes) * np.array(TYPE_POPULARITY)[route_type]
+    vehicles_per_route = rng.multinomial(config.vehicles, popularity / popularity.sum())
+    round_trip = 2 * length_km / np.array(TYPE_SPEED)[route_type] * 60
+    headway = np.clip(np.rint(round_trip / np.maximum(vehicles_per_route, 1)), 2, 60).astype(np.int16)
+
+    arrays = {
+        "route_city": route_city,
+        "route_type": route_type,
+        "route_number": route_number,
+        "route_headway": headway,
+        "stop_offset": stop_offset,
+        "stop_name": stop_name,
+        "stop_lat": stop_lat,
+        "stop_lng": stop_lng,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+
+    _write_vehicles(path, config, chunk_seeds, vehicles_per_route, route_type, stop_offset, stop_lat, stop_lng)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "config": asdict(config),
+        "generated_at": time.time(),
+        "counts": {"cities": len(cities), "routes": n_routes, "stops": int(stop_offset[-1]), "vehicles": config.vehicles},
+        "types": list(TYPES),
+        "statuses": list(STATUSES),
+        "regions": regions,
+    }
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def _write_vehicles(path: str, config: ScenarioConfig, chunk_seeds, vehicles_per_route: np.ndarray,
+                    route_type: np.ndarray, stop_offset: np.ndarray, stop_lat: np.ndarray, stop_lng: np.ndarray):
+    """Generate the fleet chunk by chunk straight into memory-mapped .npy column files"""
+    total = config.vehicles
+    files = {
+        name: np.lib.format.open_memmap(os.path.join(path, f"vehicle_{name}.npy"), mode="w+", dtype=dtype, shape=(total,))
+        for name, dtype in FleetSimulation.COLUMNS.items()
+    }
+    route_end = np.cumsum(vehicles_per_route)
+    speed_mean = np.array(TYPE_SPEED)
+    capacity_range = np.array(TYPE_CAPACITY)
+    generated_at = time.time()
+
+    for seed, start in zip(chunk_seeds, range(0, total, config.chunk_size)):
+        rng = np.random.default_rng(seed)
+        end = min(start + config.chunk_size, total)
+        n = end - start
+
+        # Vehicles are laid out route by route
+        route = np.searchsorted(route_end, np.arange(start, end), side="right").astype(np.int32)
+        kind = route_type[route]
+        stops = stop_offset[route + 1] - stop_offset[route]
+
+        # Somewhere between two consecutive stops, heading for the second
+        segment = rng.random(n) * (stops - 1)
+        leg = segment.astype(np.int64)
+        progress = segment - leg
+        a = stop_offset[route] + leg
+        leg_lat = stop_lat[a + 1] - stop_lat[a]
+        leg_lng = stop_lng[a + 1] - stop_lng[a]
+        lat = stop_lat[a] + leg_lat * progress + rng.normal(0, 0.0003, n)
+        lng = stop_lng[a] + leg_lng * progress + rng.normal(0, 0.0003, n)
+        east = leg_lng * np.cos(np.radians(lat))
+        heading = np.degrees(np.arctan2(east, leg_lat)) % 360
+
+        speed = np.clip(rng.normal(speed_mean[kind], 6), 5, 90)
+        leg_km = np.hypot(leg_lat, east) * KM_PER_DEGREE
+        eta_1 = np.clip(np.ceil(leg_km * (1 - progress) / speed * 60), 1, 60)
+        eta_2 = eta_1 + np.clip(np.ceil(leg_km / speed * 60), 1, 60)
+        capacity = rng.integers(capacity_range[kind, 0], capacity_range[kind, 1] + 1)
+
+        columns = {
+            "route": route,
+            "lat": lat,
+            "lng": lng,
+            "speed": speed,
+            "heading": heading,
+            "capacity": capacity,
+            "occupancy": capacity * rng.beta(2, 3, n),
+            "next_stop": leg + 1,
+            "eta_1": eta_1,
+            "eta_2": eta_2,
+            "status": rng.random(n) < DELAYED_SHARE,
+            "updated_at": generated_at - rng.uniform(0, 30, n),
+            "version": np.zeros(n),
+        }
+        for name, column in columns.items():
+            files[name][start:end] = column
+
+    for column in files.values():
+        column.flush()
+
+
+# =========================================
+# LOADING
+# =========================================
+
+def load_scenario(path: str, mmap_mode: Optional[str] = "r") -> Scenario:
+    """Read a scenario written by generate_scenario; fleet columns stay memory-mapped by default"""
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported scenario format {manifest.get('format')} in {path}")
+
+    def load(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    regions = manifest["regions"]
+    cities = _flatten_cities(regions)[:manifest["counts"]["cities"]]
+    stop_names, _, _ = _stop_pools(cities, manifest["config"]["stop_pool"])
+    types = manifest["types"]
+
+    # Plain lists once, then per-route slices of them
+    stop_offset = load("stop_offset").tolist()
+    name_index = load("stop_name").tolist()
+    coords = np.empty(2 * stop_offset[-1])
+    coords[0::2] = load("stop_lat")
+    coords[1::2] = load("stop_lng")
+    coords = coords.tolist()
+
+    routes = []
+    for i, (city_index, kind, number, headway) in enumerate(zip(
+        load("route_city").tolist(), load("route_type").tolist(),
+        load("route_number").tolist(), load("route_headway").tolist(),
+    )):
+        continent, country_code, country_data, city = cities[city_index]
+        transport_type = types[kind]
+        route_number = f"Line {METRO_LINES[number % len(METRO_LINES)]}" if transport_type == "Metro" else str(number)
+        first, last = stop_offset[i], stop_offset[i + 1]
+        routes.append(Route(
+            id=f"route_{i + 1}",
+            route_number=route_number,
+            name=f"{city['name']} {transport_type} {route_number}",
+            type=transport_type,
+            city=city["name"],
+            country=country_data["name"],
+            country_code=country_code,
+            continent=continent,
+            stop_names=[stop_names[j] for j in name_index[first:last]],
+            stop_coords=coords[2 * first:2 * last],
+            path_coords=coords[2 * first:2 * first + 2] + coords[2 * last - 2:2 * last],
+            active=True,
+            frequency=f"{headway} mins",
+        ))
+
+    columns = {name: load(f"vehicle_{name}") for name in FleetSimulation.COLUMNS}
+    ids = SequentialIds(manifest["counts"]["vehicles"])
+    return Scenario(manifest, regions, routes, columns, ids, manifest["statuses"])
@@ -0,0 +1,91 @@
+"""
+Simulation Tick Scheduler
+=========================
+Advances the simulated fleet on a background thread at a fixed rate, so
+vehicle movement no longer depends on how many clients are polling.
+
+Each tick publishes a new immutable fleet snapshot. Request handlers only read
+the latest snapshot and never move vehicles themselves.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+from features.mock_data_generator import mock_data
+
+# Seconds between simulation ticks (matches the clients' 5 second polling)
+TICK_INTERVAL_SECONDS = float(os.environ.get("SIM_TICK_SECONDS", "5"))
+
+
+class TickScheduler:
+    """Runs a tick function on a daemon thread at a fixed rate"""
+
+    def __init__(self, tick: Callable[[], None], interval: float = TICK_INTERVAL_SECONDS):
+        self.tick = tick
+        self.interval = interval
+        self.ticks = 0
+        self.last_tick_at: Optional[float] = None
+        self._listeners: List[Callable[[], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[], None]):
+        """Call listener after every tick, from the scheduler thread"""
+        self._listeners.append(listener)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start ticking. Calling start on a running scheduler is a no-op."""
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sim-tick", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop ticking and wait for the current tick to finish"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        next_due = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, next_due - time.monotonic())):
+            try:
+                self.tick()
+                self.ticks += 1
+                self.last_tick_at = time.time()
+            except Exception as e:
+                print(f"Simulation tick failed: {e}")
+
+            for listener in self._listeners:
+                try:
+                    listener()
+                except Exception as e:
+                    print(f"Tick listener failed: {e}")
+
+            # Keep a fixed rate; if a tick overran, skip the missed slots instead of bursting
+            next_due += self.interval
+            now = time.monotonic()
+            if next_due < now:
+                next_due = now + self.interval - (now - next_due) % self.interval
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "ticks": self.ticks,
+            "last_tick_at": self.last_tick_at,
+        }
+
+
+# Global instance; mock_data is only looked up per tick, so creating the scheduler doesn't build it
+tick_scheduler = TickScheduler(lambda: mock_data.update_vehicle_positions())
@@ -2,11 +2,109 @@
 Tracking API - Real-time vehicle tracking endpoints
 """
 
-from flask import Blueprint, jsonify, request
+import json
+
+import numpy as np
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from features.mock_data_generator import mock_data
+from features.fleet_simulation import VEHICLE_FIELDS
+from features.live_stream import Subscription, format_sse, parse_bbox, stream_hub
+from features.vehicle_grid import cluster
+from services.http_cache import is_not_modified, make_etag, not_modified, with_etag
+from services.pagination import encode_cursor, parse_fields, parse_page
+
+# Optional WebSocket support for the live stream
+try:
+    from flask_sock import Sock
+    sock = Sock()
+    SOCK_AVAILABLE = True
+except ImportError:
+    sock = None
+    SOCK_AVAILABLE = False
 
 tracking_bp = Blueprint('tracking', __name__)
 
+# Viewports below this zoom, or holding more vehicles than the limit, get clusters
+CLUSTER_MAX_ZOOM = 13
+MAX_VIEWPORT_VEHICLES = 2000
+MAX_ZOOM = 22
+
+def _page_rows(snapshot, rows, page):
+    """(rows of the requested page, next cursor); all rows and no cursor when not paginated"""
+    if page is None:
+        return rows, None
+    limit, cursor = page
+    after = cursor[0] if cursor else None
+    if after is not None and not isinstance(after, str):
+        raise ValueError("Invalid cursor")
+    rows, last_id = snapshot.page_by_id(rows, limit, after)
+    return rows, (encode_cursor([last_id]) if last_id else None)
+
+def _vehicles_response(snapshot, rows, scope, route_ids=None, **fields):
+    """
+    Vehicle list response for snapshot rows (all vehicles when rows is None),
+    which are the vehicles on route_ids (the whole fleet when None).
+    
+    With ?since=<version> only vehicles changed after that version are returned,
+    without their static route fields, plus the ids of vehicles that left
+    route_ids (removed, or moved to another route).
+    Full responses carry a strong ETag and answer If-None-Match with 304.
+    ?limit=&cursor= return one page in vehicle id order plus a next_cursor;
+    ?fields=id,position,... builds only the listed fields.
+    """
+    try:
+        page = parse_page(request.args)
+        projection = parse_fields(request.args, VEHICLE_FIELDS)
+        page_rows, next_cursor = _page_rows(snapshot, rows, page)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    paging = {"next_cursor": next_cursor} if page is not None else {}
+    all_rows = np.arange(snapshot.size) if rows is None else rows
+    
+    since = request.args.get('since', type=int)
+    if since is not None and snapshot.can_diff_since(since):
+        changed = snapshot.changed_since(all_rows if page_rows is None else page_rows, since)
+        if projection is not None:
+            vehicles = snapshot.project_vehicles(changed, projection)
+        else:
+            vehicles = snapshot.vehicle_dicts(changed, static=False)
+        return jsonify({
+            "success": True,
+            **fields,
+            "data": vehicles,
+            "count": len(vehicles),
+            "version": snapshot.version,
+            "since": since,
+            "removed": snapshot.removed_since(since, route_ids),
+            **paging
+        }), 200
+    
+    # Only vehicle versions in scope decide the body, so the ETag survives ticks that didn't touch them
+    version = snapshot.last_change(all_rows)
+    etag = make_etag(snapshot.epoch, snapshot.structure_version, version, *scope,
+                     request.args.get('limit'), request.args.get('cursor'), projection)
+    if is_not_modified(etag):
+        return not_modified(etag)
+    
+    if projection is not None:
+        vehicles = snapshot.project_vehicles(all_rows if page_rows is None else page_rows, projection)
+    elif page_rows is None:
+        vehicles = snapshot.all_vehicles()
+    else:
+        vehicles = snapshot.vehicle_dicts(page_rows)
+    response = jsonify({
+        "success": True,
+        **fields,
+        "data": vehicles,
+        "count": len(vehicles),
+        "version": version,
+        **paging
+    })
+    return with_etag(response, etag), 200
+
 @tracking_bp.route('/api/tracking/<route_id>', methods=['GET'])
 def get_vehicle_positions(route_id):
     """Get current positions of all vehicles on a route"""
@@ -20,15 +118,11 @@ def get_vehicle_positions(route_id):
             }), 404
         
         # Get vehicles for this route
-        vehicles = mock_data.get_vehicles_by_route(route_id)
+        snapshot = mock_data.snapshot()
+        rows = snapshot.rows_for_route(route_id)
         
-        return jsonify({
-            "success": True,
-            "route_id": route_id,
-            "route_name": route["name"],
-            "data": vehicles,
-            "count": len(vehicles)
-        }), 200
+        return _vehicles_response(snapshot, rows, ("route", route_id), [route_id],
+                                  route_id=route_id, route_name=route.name)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -37,7 +131,7 @@ def get_vehicle_positions(route_id):
 
 @tracking_bp.route('/api/tracking/<route_id>/updates', methods=['GET'])
 def get_vehicle_updates(route_id):
-    """Get updated vehicle positions (simulates real-time updates)"""
+    """Get the latest simulated vehicle positions"""
     try:
         # Verify route exists
         route = mock_data.get_route_by_id(route_id)
@@ -47,20 +141,12 @@ def get_vehicle_updates(route_id):
                 "error": "Route not found"
             }), 404
         
-        # Update vehicle positions (simulate movement)
-        mock_data.update_vehicle_positions()
+        # Vehicles are moved by the background tick scheduler; only read the latest snapshot
+        snapshot = mock_data.snapshot()
+        rows = snapshot.rows_for_route(route_id)
         
-        # Get updated vehicles for this route
-        vehicles = mock_data.get_vehicles_by_route(route_id)
-        
-        return jsonify({
-            "success": True,
-            "route_id": route_id,
-            "route_name": route["name"],
-            "data": vehicles,
-            "count": len(vehicles),
-            "updated": True
-        }), 200
+        return _vehicles_response(snapshot, rows, ("route", route_id), [route_id],
+                                  route_id=route_id, route_name=route.name, updated=True)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -75,20 +161,113 @@ def get_all_vehicles():
         city = request.args.get('city')
         
         # Filter vehicles by region if specified
-        vehicles = mock_data.vehicles
+        snapshot = mock_data.snapshot()
+        rows = route_ids = None
         
         if country_code or city:
             routes = mock_data.get_routes_by_region(country_code, city)
-            route_ids = [r["id"] for r in routes]
-            vehicles = [v for v in vehicles if v["route_id"] in route_ids]
+            route_ids = [r.id for r in routes]
+            rows = np.concatenate([snapshot.rows_for_route(r.id) for r in routes]) if routes else np.empty(0, dtype=np.int64)
         
+        return _vehicles_response(snapshot, rows, ("all", country_code, city), route_ids)
+    except Exception as e:
         return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@tracking_bp.route('/api/tracking/viewport', methods=['GET'])
+def get_viewport_vehicles():
+    """
+    Vehicles inside a map viewport: ?bbox=lat_min,lng_min,lat_max,lng_max&zoom=<0-22>
+    
+    Zoomed out (below CLUSTER_MAX_ZOOM), or with more than MAX_VIEWPORT_VEHICLES
+    in view, returns clusters ({lat, lng, count, bbox}) instead of vehicles.
+    """
+    try:
+        try:
+            bbox = parse_bbox(request.args.get('bbox', ''))
+            zoom = request.args.get('zoom', MAX_ZOOM, type=int)
+            if not 0 <= zoom <= MAX_ZOOM:
+                raise ValueError(f"zoom must be between 0 and {MAX_ZOOM}")
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        snapshot = mock_data.snapshot()
+        rows = snapshot.rows_in_bbox(bbox)
+        clustered = zoom < CLUSTER_MAX_ZOOM or len(rows) > MAX_VIEWPORT_VEHICLES
+        
+        version = snapshot.last_change(rows)
+        etag = make_etag(snapshot.epoch, snapshot.structure_version, version, len(rows), "viewport", *bbox, zoom)
+        if is_not_modified(etag):
+            return not_modified(etag)
+        
+        if clustered:
+            data = cluster(snapshot.columns["lat"], snapshot.columns["lng"], rows, zoom)
+        else:
+            data = snapshot.vehicle_dicts(rows)
+        response = jsonify({
             "success": True,
-            "data": vehicles,
-            "count": len(vehicles)
-        }), 200
+            "bbox": list(bbox),
+            "zoom": zoom,
+            "clustered": clustered,
+            "data": data,
+            "count": len(data),
+            "vehicle_count": len(rows),
+            "version": version
+        })
+        return with_etag(response, etag), 200
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
+
+@tracking_bp.route('/api/tracking/stream', methods=['GET'])
+def stream_vehicle_positions():
+    """
+    Push vehicle positions as Server-Sent Events.
+    Query: route=<route_id> | city=<name>[&country=<code>] | bbox=lat_min,lng_min,lat_max,lng_max
+    Sends a `snapshot` event first, then a `delta` event per simulation tick.
+    """
+    try:
+        subscription = Subscription.from_args(request.args)
+    except LookupError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    # Browsers resend the last event id on reconnect, so we can resume with a delta
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_version = int(last_event_id) if last_event_id.isdigit() else None
+    
+    events = (format_sse(event) for event in stream_hub.events(subscription, last_version))
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+if SOCK_AVAILABLE:
+    @sock.route('/api/tracking/ws', bp=tracking_bp)
+    def stream_vehicle_positions_ws(ws):
+        """WebSocket variant of /api/tracking/stream, same query parameters"""
+        try:
+            subscription = Subscription.from_args(request.args)
+        except (LookupError, ValueError) as e:
+            ws.send(json.dumps({"type": "error", "error": str(e)}))
+            return
+        
+        for event in stream_hub.events(subscription):
+            if event is None:
+                continue
+            event_type, version, data = event
+            ws.send(f'{{"type":"{event_type}","version":{version},"data":{data}}}')
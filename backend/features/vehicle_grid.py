@@ -0,0 +1,145 @@
+"""
+Vehicle Grid
+============
+Spatial index over vehicle positions for viewport queries.
+
+The world is cut into square cells of GRID_CELL_DEGREES. Every vehicle row
+has a cell key (lat band * cells per band + lng column), and the rows are
+kept sorted by key, so the rows of one band of cells are a single
+searchsorted range.
+
+A grid is immutable, like the fleet snapshot it belongs to. After a tick,
+moved() derives the next grid: only the vehicles whose cell changed are
+taken out and merged back in at their new cells, instead of re-sorting the
+whole fleet.
+
+cluster() bins vehicles into zoom-dependent cells and returns one aggregate
+per cell, for map views too far out to draw individual vehicles.
+"""
+
+import math
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# ~1.1 km cells at the equator
+GRID_CELL_DEGREES = float(os.environ.get("GRID_CELL_DEGREES", 0.01))
+
+# Above this share of vehicles changing cell, a full re-sort is cheaper than merging
+RESORT_FRACTION = 0.25
+
+# Cluster cells per map tile edge: 256 px tiles make ~32 px clusters
+CLUSTER_CELLS_PER_TILE = 8
+
+
+class VehicleGrid:
+    """Cell-sorted row permutation over vehicle positions"""
+
+    def __init__(self, cell_size: float, cells: np.ndarray, order: np.ndarray, sorted_cells: np.ndarray):
+        self.cell_size = cell_size
+        self.lng_cells = math.ceil(360 / cell_size) + 1
+        self.cells = cells                # cell key per row
+        self.order = order                # rows sorted by cell key
+        self.sorted_cells = sorted_cells  # cells[order]
+
+    @classmethod
+    def build(cls, lat: np.ndarray, lng: np.ndarray, cell_size: float = GRID_CELL_DEGREES) -> "VehicleGrid":
+        cells = _cell_keys(lat, lng, cell_size)
+        order = np.argsort(cells, kind="stable")
+        return cls(cell_size, cells, order, cells[order])
+
+    def __len__(self):
+        return len(self.cells)
+
+    def moved(self, lat: np.ndarray, lng: np.ndarray) -> "VehicleGrid":
+        """Grid for new positions of the same rows, moving only the rows that changed cell"""
+        cells = _cell_keys(lat, lng, self.cell_size)
+        changed = np.flatnonzero(cells != self.cells)
+        if not len(changed):
+            return VehicleGrid(self.cell_size, cells, self.order, self.sorted_cells)
+        if len(changed) > RESORT_FRACTION * len(cells):
+            return VehicleGrid.build(lat, lng, self.cell_size)
+
+        is_changed = np.zeros(len(cells), dtype=bool)
+        is_changed[changed] = True
+        keep = ~is_changed[self.order]
+        order, sorted_cells = self.order[keep], self.sorted_cells[keep]
+
+        # Merge the moved rows back in at their new cells
+        moved = changed[np.argsort(cells[changed], kind="stable")]
+        at = np.searchsorted(sorted_cells, cells[moved], side="right")
+        return VehicleGrid(self.cell_size, cells, np.insert(order, at, moved), np.insert(sorted_cells, at, cells[moved]))
+
+    # =========================================
+    # QUERIES
+    # =========================================
+
+    def rows_in(self, lat: np.ndarray, lng: np.ndarray, bbox: Tuple[float, float, float, float]) -> np.ndarray:
+        """Sorted rows whose position lies in bbox (lat_min, lng_min, lat_max, lng_max)"""
+        lat_min, lng_min, lat_max, lng_max = bbox
+        band_min, column_min = _cell_index(lat_min, lng_min, self.cell_size)
+        band_max, column_max = _cell_index(lat_max, lng_max, self.cell_size)
+
+        # One contiguous key range per band of cells, padded by a cell against rounding at cell edges
+        bands = np.arange(band_min - 1, band_max + 2, dtype=np.int64) * self.lng_cells
+        starts = np.searchsorted(self.sorted_cells, bands + column_min - 1, side="left")
+        ends = np.searchsorted(self.sorted_cells, bands + column_max + 1, side="right")
+        if not len(starts) or not (ends > starts).any():
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate([self.order[s:e] for s, e in zip(starts.tolist(), ends.tolist()) if e > s])
+
+        # Edge cells stick out of the box
+        inside = (lat[candidates] >= lat_min) & (lat[candidates] <= lat_max) & \
+                 (lng[candidates] >= lng_min) & (lng[candidates] <= lng_max)
+        return np.sort(candidates[inside])
+
+
+def _cell_index(lat, lng, cell_size: float):
+    """(lat band, lng column) of a position"""
+    return math.floor((lat + 90) / cell_size), math.floor((lng + 180) / cell_size)
+
+
+def _cell_keys(lat: np.ndarray, lng: np.ndarray, cell_size: float) -> np.ndarray:
+    lng_cells = math.ceil(360 / cell_size) + 1
+    # Offsets make both operands non-negative, so truncation is floor
+    bands = ((lat + 90) * (1 / cell_size)).astype(np.int64)
+    columns = ((lng + 180) * (1 / cell_size)).astype(np.int64)
+    return bands * lng_cells + columns
+
+
+def cluster_size(zoom: int) -> float:
+    """Cluster cell edge in degrees at a web map zoom level"""
+    return 360 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+
+
+def cluster(lat: np.ndarray, lng: np.ndarray, rows: np.ndarray, zoom: int) -> List[Dict]:
+    """
+    One aggregate per zoom-dependent cell over the given rows: vehicle count,
+    centroid and the bounds of its vehicles (for zooming in on a cluster).
+    """
+    if not len(rows):
+        return []
+    size = cluster_size(zoom)
+    lat, lng = lat[rows], lng[rows]
+    keys = _cell_keys(lat, lng, size)
+    cells, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+    centre_lat = np.bincount(inverse, weights=lat) / counts
+    centre_lng = np.bincount(inverse, weights=lng) / counts
+    lat_min = np.full(len(cells), np.inf)
+    lng_min = np.full(len(cells), np.inf)
+    lat_max = np.full(len(cells), -np.inf)
+    lng_max = np.full(len(cells), -np.inf)
+    np.minimum.at(lat_min, inverse, lat)
+    np.minimum.at(lng_min, inverse, lng)
+    np.maximum.at(lat_max, inverse, lat)
+    np.maximum.at(lng_max, inverse, lng)
+
+    return [
+        {"lat": c_lat, "lng": c_lng, "count": count, "bbox": [s, w, n, e]}
+        for c_lat, c_lng, count, s, w, n, e in zip(
+            centre_lat.tolist(), centre_lng.tolist(), counts.tolist(),
+            lat_min.tolist(), lng_min.tolist(), lat_max.tolist(), lng_max.tolist(),
+        )
+    ]
@@ -0,0 +1,104 @@
+"""
+Warm Snapshot
+=============
+Persisted copy of the generated mock data, so a restarted server can skip
+generation.
+
+When WARM_SNAPSHOT_PATH is set, MockDataGenerator loads the snapshot in that
+directory if it was saved from the same source, and otherwise generates its
+data as usual and saves a new snapshot there. The source is the seed, the
+generator version and, for a scenario, its path, config and generation time,
+so a regenerated scenario or changed generator is never served stale.
+Unseeded runs neither load nor save a snapshot.
+
+- Fleet columns are plain .npy files, memory-mapped on load: pages are read
+  from the OS page cache as they are touched, not copied up front
+- The spatial vehicle grid is saved too, so it isn't re-sorted on load
+- The route catalog is one pickle of the Route records (strings shared
+  between routes stay shared)
+- The directory is written under a temporary name and renamed into place,
+  so a crash mid-save never leaves a half-written snapshot behind
+
+The pickle is trusted input: only point WARM_SNAPSHOT_PATH at a directory
+this server writes.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from features.fleet_simulation import FleetSimulation, FleetSnapshot, SequentialIds
+from features.scenario_generator import MANIFEST, Scenario
+from features.vehicle_grid import VehicleGrid
+
+FORMAT_VERSION = 1
+ROUTES_FILE = "routes.pickle"
+IDS_FILE = "vehicle_ids.npy"
+GRID_ARRAYS = ("cells", "order", "sorted_cells")
+
+# Directory for the warm snapshot (disabled when unset)
+WARM_SNAPSHOT_PATH = os.environ.get("WARM_SNAPSHOT_PATH")
+
+
+def save_snapshot(path: str, source: Dict, regions: Dict, routes, snapshot: FleetSnapshot):
+    """Write regions, routes and one fleet snapshot to the directory at path, replacing any previous one"""
+    temp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(temp, ignore_errors=True)
+    os.makedirs(temp)
+
+    with open(os.path.join(temp, ROUTES_FILE), "wb") as f:
+        pickle.dump(routes, f, protocol=pickle.HIGHEST_PROTOCOL)
+    for name, column in snapshot.columns.items():
+        np.save(os.path.join(temp, f"vehicle_{name}.npy"), column)
+    for name in GRID_ARRAYS:
+        np.save(os.path.join(temp, f"grid_{name}.npy"), getattr(snapshot.grid, name))
+    sequential = isinstance(snapshot.ids, SequentialIds)
+    if not sequential:
+        np.save(os.path.join(temp, IDS_FILE), np.array(snapshot.ids, dtype=str))
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "source": source,
+        "saved_at": time.time(),
+        "vehicles": snapshot.size,
+        "sequential_ids": sequential,
+        "statuses": list(snapshot.statuses),
+        "grid_cell_size": snapshot.grid.cell_size,
+        "regions": regions,
+    }
+    with open(os.path.join(temp, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temp, path)
+
+
+def load_snapshot(path: str, source: Dict, mmap_mode: Optional[str] = "r") -> Optional[Scenario]:
+    """The snapshot at path, or None when there is none or it was saved from a different source"""
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != FORMAT_VERSION or manifest.get("source") != source:
+        return None
+
+    with open(os.path.join(path, ROUTES_FILE), "rb") as f:
+        routes = pickle.load(f)
+    columns = {
+        name: np.load(os.path.join(path, f"vehicle_{name}.npy"), mmap_mode=mmap_mode)
+        for name in FleetSimulation.COLUMNS
+    }
+    if manifest["sequential_ids"]:
+        ids = SequentialIds(manifest["vehicles"])
+    else:
+        ids = np.load(os.path.join(path, IDS_FILE)).tolist()
+    grid = VehicleGrid(manifest["grid_cell_size"], *(
+        np.load(os.path.join(path, f"grid_{name}.npy"), mmap_mode=mmap_mode) for name in GRID_ARRAYS
+    ))
+    return Scenario(manifest, manifest["regions"], routes, columns, ids, manifest["statuses"], grid)
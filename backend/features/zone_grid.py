@@ -0,0 +1,316 @@
+"""
+Zone Grid
+=========
+Cuts the map into cells that work as zones, so every city is covered
+without hand-drawn zone boxes.
+
+Two cell schemes, both global (a point has the same cell whichever city it
+is in) and both addressed in O(1) from a lat/lng with plain arithmetic:
+- FixedCells: square cells of a fixed size in degrees, counted from
+  (-90, -180); ids "cell{size in metres}m_{row}_{col}"
+- QuadkeyCells: web map tiles (spherical Mercator) at one zoom level; ids
+  "qk_{quadkey}", so a cell's id starts with the ids of all its parents
+
+A cell's key is row * columns + column, so the cells of a bounding box are
+a few contiguous key ranges.
+
+ZoneGrid covers the cities of a region table (MockDataGenerator's
+_generate_regions by default): a square of CITY_RADIUS_KM around each city
+centre. Cell scores are stored sparsely: only cells that have received
+votes take memory, so city-wide coverage costs nothing until people vote.
+In Firestore the same holds: a voted cell has score shards and vote
+documents under its id, but no zone document.
+
+Each ZoneGrid also keeps a ScorePyramid (features/zone_pyramid.py) of its
+votes per web map tile, updated with every vote, for zoomed-out views.
+"""
+
+import math
+import os
+import sys
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from features.zone_pyramid import ScorePyramid
+
+# Cell scheme for the zone grid: "quadkey" or "fixed"
+ZONE_GRID_SCHEME = os.environ.get("ZONE_GRID_SCHEME", "quadkey")
+# Quadkey zoom level; 16 gives cells of ~540 m at Delhi's latitude
+ZONE_GRID_ZOOM = int(os.environ.get("ZONE_GRID_ZOOM", "16"))
+# Fixed cell edge in km (converted to degrees of latitude)
+ZONE_GRID_CELL_KM = float(os.environ.get("ZONE_GRID_CELL_KM", "0.5"))
+# Half the side of the square each city's grid covers
+CITY_RADIUS_KM = float(os.environ.get("CITY_RADIUS_KM", "15"))
+
+KM_PER_DEGREE = 111.0
+# Web Mercator stops short of the poles
+MAX_MERCATOR_LAT = 85.05112878
+
+Bounds = Tuple[float, float, float, float]  # lat_min, lng_min, lat_max, lng_max
+
+
+class FixedCells:
+    """Square cells of cell_degrees, rows from the south pole and columns from the antimeridian"""
+
+    name = "fixed"
+
+    def __init__(self, cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        self.rows = math.ceil(180 / cell_degrees)
+        self.columns = math.ceil(360 / cell_degrees)
+        self.prefix = f"cell{round(cell_degrees * KM_PER_DEGREE * 1000)}m_"
+        # Web map zoom with tiles about as wide as the cells, for the score pyramid
+        self.tile_zoom = min(max(round(math.log2(360 / cell_degrees)), 1), 30)
+        self._tiles = QuadkeyCells(self.tile_zoom)
+
+    def row_column(self, lat: float, lng: float) -> Tuple[int, int]:
+        row = min(int((lat + 90) // self.cell_degrees), self.rows - 1)
+        column = min(int((lng + 180) // self.cell_degrees), self.columns - 1)
+        return row, column
+
+    def key(self, lat: float, lng: float) -> int:
+        row, column = self.row_column(lat, lng)
+        return row * self.columns + column
+
+    def keys(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Vectorized key() for arrays of points"""
+        rows = np.minimum(((np.asarray(lats) + 90) // self.cell_degrees).astype(np.int64), self.rows - 1)
+        columns = np.minimum(((np.asarray(lngs) + 180) // self.cell_degrees).astype(np.int64), self.columns - 1)
+        return rows * self.columns + columns
+
+    def bounds(self, key: int) -> Bounds:
+        row, column = divmod(key, self.columns)
+        return (row * self.cell_degrees - 90, column * self.cell_degrees - 180,
+                (row + 1) * self.cell_degrees - 90, (column + 1) * self.cell_degrees - 180)
+
+    def cell_id(self, key: int) -> str:
+        row, column = divmod(key, self.columns)
+        return f"{self.prefix}{row}_{column}"
+
+    def tile(self, key: int) -> Tuple[int, int]:
+        """(x, y) of the web map tile at tile_zoom holding the cell's centre"""
+        lat_min, lng_min, lat_max, lng_max = self.bounds(key)
+        y, x = self._tiles.row_column((lat_min + lat_max) / 2, (lng_min + lng_max) / 2)
+        return x, y
+
+    def parse(self, cell_id: str) -> Optional[int]:
+        """Key of a cell id of this scheme, None for anything else"""
+        if not cell_id.startswith(self.prefix):
+            return None
+        try:
+            row, column = (int(part) for part in cell_id[len(self.prefix):].split("_"))
+        except ValueError:
+            return None
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            return None
+        return row * self.columns + column
+
+
+class QuadkeyCells:
+    """Web map tiles at one zoom level; rows are tile y (from the north), columns tile x"""
+
+    name = "quadkey"
+    prefix = "qk_"
+
+    def __init__(self, zoom: int):
+        if not 1 <= zoom <= 30:
+            raise ValueError("zoom must be between 1 and 30")
+        self.zoom = self.tile_zoom = zoom
+        self.rows = self.columns = 1 << zoom
+
+    def row_column(self, lat: float, lng: float) -> Tuple[int, int]:
+        lat = min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+        x = (lng + 180) / 360
+        y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2
+        return min(int(y * self.rows), self.rows - 1), min(int(x * self.columns), self.columns - 1)
+
+    def key(self, lat: float, lng: float) -> int:
+        row, column = self.row_column(lat, lng)
+        return row * self.columns + column
+
+    def keys(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Vectorized key() for arrays of points"""
+        lats = np.radians(np.clip(np.asarray(lats, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+        x = (np.asarray(lngs, dtype=np.float64) + 180) / 360
+        y = (1 - np.arcsinh(np.tan(lats)) / np.pi) / 2
+        rows = np.minimum((y * self.rows).astype(np.int64), self.rows - 1)
+        columns = np.minimum((x * self.columns).astype(np.int64), self.columns - 1)
+        return rows * self.columns + columns
+
+    def bounds(self, key: int) -> Bounds:
+        y, x = divmod(key, self.columns)
+        return tile_bounds(x, y, self.zoom)
+
+    def cell_id(self, key: int) -> str:
+        y, x = divmod(key, self.columns)
+        return self.prefix + quadkey(x, y, self.zoom)
+
+    def tile(self, key: int) -> Tuple[int, int]:
+        """(x, y) of the cell's web map tile: the cell itself"""
+        y, x = divmod(key, self.columns)
+        return x, y
+
+    def parse(self, cell_id: str) -> Optional[int]:
+        """Key of a cell id of this scheme, None for anything else"""
+        digits = cell_id[len(self.prefix):]
+        if not cell_id.startswith(self.prefix) or len(digits) != self.zoom or digits.strip("0123"):
+            return None
+        x, y, _ = quadkey_tile(digits)
+        return y * self.columns + x
+
+
+def tile_lat(y: int, zoom: int) -> float:
+    """Latitude of the northern edge of tile row y"""
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / (1 << zoom)))))
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> Bounds:
+    """Bounds of web map tile (x, y) at zoom"""
+    n = 1 << zoom
+    return (tile_lat(y + 1, zoom), x / n * 360 - 180, tile_lat(y, zoom), (x + 1) / n * 360 - 180)
+
+
+def quadkey(x: int, y: int, zoom: int) -> str:
+    """Quadkey of tile (x, y) at zoom: one base-4 digit per level, most significant first"""
+    return "".join(str(((x >> bit) & 1) + 2 * ((y >> bit) & 1)) for bit in range(zoom - 1, -1, -1))
+
+
+def quadkey_tile(key: str) -> Tuple[int, int, int]:
+    """(x, y, zoom) of a quadkey"""
+    x = y = 0
+    for digit in key:
+        d = int(digit)
+        x = (x << 1) | (d & 1)
+        y = (y << 1) | (d >> 1)
+    return x, y, len(key)
+
+
+def cells_from_env():
+    if ZONE_GRID_SCHEME == "fixed":
+        return FixedCells(ZONE_GRID_CELL_KM / KM_PER_DEGREE)
+    if ZONE_GRID_SCHEME == "quadkey":
+        return QuadkeyCells(ZONE_GRID_ZOOM)
+    raise ValueError(f"ZONE_GRID_SCHEME must be 'quadkey' or 'fixed', not {ZONE_GRID_SCHEME!r}")
+
+
+class ZoneGrid:
+    """Cell coverage of the cities in a region table, with sparse per-cell vote scores"""
+
+    def __init__(self, cells, regions: Dict, radius_km: float = CITY_RADIUS_KM):
+        self.cells = cells
+        self.radius_km = radius_km
+        self.cities: Dict[str, Bounds] = {}
+        for country in regions.values():
+            for state in country.values():
+                for city in state["cities"]:
+                    self.cities[city["name"]] = self._city_bounds(city["lat"], city["lng"])
+
+        self._cells: Dict[int, List[int]] = {}   # key -> [score, votes], voted cells only
+        self.pyramid = ScorePyramid(cells.tile_zoom)
+        self.generation = 0                      # bumped whenever the scores are reloaded
+        self._lock = threading.Lock()
+
+    def _city_bounds(self, lat: float, lng: float) -> Bounds:
+        d_lat = self.radius_km / KM_PER_DEGREE
+        d_lng = d_lat / max(math.cos(math.radians(lat)), 0.01)
+        return (lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng)
+
+    # =========================================
+    # ADDRESSING
+    # =========================================
+
+    def city_at(self, lat: float, lng: float) -> Optional[str]:
+        for name, (lat_min, lng_min, lat_max, lng_max) in self.cities.items():
+            if lat_min <= lat <= lat_max and lng_min <= lng <= lng_max:
+                return name
+        return None
+
+    def key_at(self, lat: float, lng: float) -> Optional[int]:
+        """Key of the cell at a point inside a covered city, else None"""
+        if self.city_at(lat, lng) is None:
+            return None
+        return self.cells.key(lat, lng)
+
+    def key_ranges(self, bounds: Bounds) -> Iterator[range]:
+        """Key ranges of the cells overlapping a bounding box, one per row"""
+        lat_min, lng_min, lat_max, lng_max = bounds
+        row_a, col_a = self.cells.row_column(lat_min, lng_min)
+        row_b, col_b = self.cells.row_column(lat_max, lng_max)
+        for row in range(min(row_a, row_b), max(row_a, row_b) + 1):
+            yield range(row * self.cells.columns + col_a, row * self.cells.columns + col_b + 1)
+
+    def city_cell_count(self, city: str) -> int:
+        return sum(len(keys) for keys in self.key_ranges(self.cities[city]))
+
+    # =========================================
+    # SPARSE SCORES
+    # =========================================
+
+    def vote(self, key: int, amount: int, votes: int = 1):
+        """Add votes totalling amount to a cell, and to its tiles in the pyramid"""
+        with self._lock:
+            cell = self._cells.setdefault(key, [0, 0])
+            cell[0] += amount
+            cell[1] += votes
+            self.pyramid.add(*self.cells.tile(key), amount, votes)
+
+    def load_scores(self, totals: Dict[str, Tuple[int, int]]) -> int:
+        """
+        Replace the scores with per-zone (score, votes) totals (e.g. from
+        Firestore), keeping the ids of this scheme, and rebuild the pyramid
+        """
+        cells = {}
+        for zone_id, (score, votes) in totals.items():
+            key = self.cells.parse(zone_id)
+            if key is not None:
+                cells[key] = [score, votes]
+        pyramid = ScorePyramid.build(self.cells.tile_zoom, (
+            (*self.cells.tile(key), score, votes) for key, (score, votes) in cells.items()
+        ))
+        with self._lock:
+            self._cells = cells
+            self.pyramid = pyramid
+            self.generation += 1
+        return len(cells)
+
+    def score(self, key: int) -> int:
+        return self._cells.get(key, (0, 0))[0]
+
+    def voted_keys(self, bounds: Optional[Bounds] = None) -> List[int]:
+        """Keys of the cells with votes, optionally only those overlapping bounds"""
+        with self._lock:
+            keys = list(self._cells)
+        if bounds is None:
+            return sorted(keys)
+        # Walk whichever is smaller: the voted cells or the cells in the box
+        ranges = list(self.key_ranges(bounds))
+        if sum(len(r) for r in ranges) < len(keys):
+            return [key for r in ranges for key in r if key in self._cells]
+        return sorted(key for key in keys if any(key in r for r in ranges))
+
+    def zone(self, key: int) -> Dict:
+        """A cell as a zone document (the fields ZoneManager reads)"""
+        lat_min, lng_min, lat_max, lng_max = self.cells.bounds(key)
+        return {
+            "id": self.cells.cell_id(key),
+            "name": self.cells.cell_id(key),
+            "lat_min": lat_min, "lat_max": lat_max,
+            "lng_min": lng_min, "lng_max": lng_max,
+            "score": self.score(key),
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            voted = len(self._cells)
+            # dict table, plus an int key and a two-int list per voted cell
+            memory = sys.getsizeof(self._cells) + voted * (28 + 72 + 2 * 28)
+        return {
+            "scheme": self.cells.name,
+            "cities": len(self.cities),
+            "covered_cells": sum(self.city_cell_count(city) for city in self.cities),
+            "voted_cells": voted,
+            "score_bytes": memory,
+            "pyramid_tiles": self.pyramid.tile_count(),
+        }
@@ -0,0 +1,286 @@
+"""
+Zone Import
+===========
+Bulk loading of zones into Firestore, for city grids with hundreds of
+thousands of cells.
+
+Sources:
+- CSV with the columns id, name, lat_min, lat_max, lng_min, lng_max and
+  optionally score and description
+- GeoJSON FeatureCollection of Polygon/MultiPolygon features; zones are
+  bounding boxes, so each feature becomes its bounding box. The id comes
+  from the feature's "id" (or properties.id), the rest from its properties
+- A generated grid: a bounding box cut into square cells of a fixed size
+
+validate_zones() checks ids and bounds before anything is written.
+import_zones() writes the zones as batched commits of up to 500 documents
+from a thread pool, retries failed batches with exponential backoff and
+records finished batches in a checkpoint file, so an interrupted import
+resumes where it stopped. Zone documents are overwritten ("set"), so
+re-running a batch is harmless.
+"""
+
+import csv
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.firebase_service import firebase, MAX_BATCH_WRITES
+
+COLLECTION = "zones"
+FIELDS = ("id", "name", "lat_min", "lat_max", "lng_min", "lng_max", "score", "description")
+KM_PER_DEGREE = 111.0
+
+# Largest zone accepted by validate_zones, in degrees per side
+MAX_ZONE_DEGREES = 1.0
+
+
+@dataclass
+class ImportResult:
+    zones: int
+    batches: int
+    written: int = 0
+    resumed: int = 0                # batches skipped because the checkpoint had them
+    failed: List[int] = field(default_factory=list)
+    retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def zones_per_second(self) -> float:
+        return self.written / self.seconds if self.seconds else 0.0
+
+
+# =========================================
+# SOURCES
+# =========================================
+
+def _zone(raw: Dict) -> Dict:
+    """Keep the known fields, numbers as numbers (validated later)"""
+    zone = {}
+    for name in FIELDS:
+        value = raw.get(name)
+        if value is None or value == "":
+            continue
+        if name in ("lat_min", "lat_max", "lng_min", "lng_max"):
+            value = float(value)
+        elif name == "score":
+            value = int(float(value))
+        else:
+            value = str(value)
+        zone[name] = value
+    return zone
+
+
+def read_csv(path: str) -> List[Dict]:
+    zones = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                zones.append(_zone(row))
+            except ValueError as e:
+                raise ValueError(f"{path}:{line}: {e}") from e
+    return zones
+
+
+def _coordinates(geometry: Dict) -> Iterable[Tuple[float, float]]:
+    rings = geometry["coordinates"] if geometry["type"] == "Polygon" else \
+        [ring for polygon in geometry["coordinates"] for ring in polygon]
+    for ring in rings:
+        for lng, lat, *_ in ring:
+            yield lng, lat
+
+
+def read_geojson(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+    zones = []
+    for number, feature in enumerate(collection.get("features", [])):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") not in ("Polygon", "MultiPolygon"):
+            raise ValueError(f"Feature {number}: expected a Polygon or MultiPolygon, got {geometry.get('type')}")
+        properties = feature.get("properties") or {}
+        lngs, lats = zip(*_coordinates(geometry))
+        zones.append(_zone({
+            **properties,
+            "id": feature.get("id", properties.get("id")),
+            "lat_min": min(lats), "lat_max": max(lats),
+            "lng_min": min(lngs), "lng_max": max(lngs),
+        }))
+    return zones
+
+
+def grid_zones(lat_min: float, lng_min: float, lat_max: float, lng_max: float,
+               cell_degrees: float, prefix: str = "cell") -> List[Dict]:
+    """Square cells of cell_degrees covering the box, ids "{prefix}_{row}_{col}" from the south-west corner"""
+    rows = max(1, round((lat_max - lat_min) / cell_degrees))
+    cols = max(1, round((lng_max - lng_min) / cell_degrees))
+    return [
+        {
+            "id": f"{prefix}_{row}_{col}",
+            "name": f"{prefix} {row},{col}",
+            "lat_min": round(lat_min + row * cell_degrees, 7),
+            "lat_max": round(lat_min + (row + 1) * cell_degrees, 7),
+            "lng_min": round(lng_min + col * cell_degrees, 7),
+            "lng_max": round(lng_min + (col + 1) * cell_degrees, 7),
+            "score": 0,
+        }
+        for row in range(rows) for col in range(cols)
+    ]
+
+
+def km_to_degrees(km: float) -> float:
+    return km / KM_PER_DEGREE
+
+
+# =========================================
+# VALIDATION
+# =========================================
+
+def _problem(zone: Dict, seen: set) -> Optional[str]:
+    zone_id = zone.get("id")
+    if not zone_id or "/" in zone_id or zone_id in (".", ".."):
+        return "missing or invalid id"
+    if zone_id in seen:
+        return "duplicate id"
+    seen.add(zone_id)
+    missing = [name for name in ("lat_min", "lat_max", "lng_min", "lng_max") if name not in zone]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    if not -90 <= zone["lat_min"] < zone["lat_max"] <= 90:
+        return "latitudes must satisfy -90 <= lat_min < lat_max <= 90"
+    if not -180 <= zone["lng_min"] < zone["lng_max"] <= 180:
+        return "longitudes must satisfy -180 <= lng_min < lng_max <= 180"
+    if max(zone["lat_max"] - zone["lat_min"], zone["lng_max"] - zone["lng_min"]) > MAX_ZONE_DEGREES:
+        return f"larger than {MAX_ZONE_DEGREES} degrees per side"
+    return None
+
+
+def validate_zones(zones: List[Dict]) -> List[Tuple[int, str]]:
+    """(position in zones, problem) for every invalid zone; empty when all are valid"""
+    seen = set()
+    problems = []
+    for number, zone in enumerate(zones):
+        problem = _problem(zone, seen)
+        if problem:
+            problems.append((number, f"Zone {number} ({zone.get('id')}): {problem}"))
+    return problems
+
+
+# =========================================
+# CHECKPOINT
+# =========================================
+
+class Checkpoint:
+    """Finished batch numbers of one import, kept in a JSON file"""
+
+    def __init__(self, path: Optional[str], fingerprint: Dict):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.done = set()
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """Pick up a previous run's progress; False if it was a different import"""
+        if not self.path or not os.path.exists(self.path):
+            return True
+        with open(self.path) as f:
+            saved = json.load(f)
+        if saved.get("fingerprint") != self.fingerprint:
+            return False
+        self.done = set(saved["done"])
+        return True
+
+    def mark(self, batch: int):
+        with self._lock:
+            self.done.add(batch)
+            if self.path:
+                temp = f"{self.path}.tmp"
+                with open(temp, "w") as f:
+                    json.dump({"fingerprint": self.fingerprint, "done": sorted(self.done)}, f)
+                os.replace(temp, self.path)
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def fingerprint(zones: List[Dict], batch_size: int) -> Dict:
+    """Identifies an import for resuming: same zones in the same batches"""
+    return {
+        "zones": len(zones),
+        "batch_size": batch_size,
+        "first": zones[0]["id"] if zones else None,
+        "last": zones[-1]["id"] if zones else None,
+    }
+
+
+# =========================================
+# IMPORT
+# =========================================
+
+def import_zones(zones: List[Dict], workers: int = 8, batch_size: int = MAX_BATCH_WRITES,
+                 checkpoint_path: Optional[str] = None, retries: int = 5, backoff: float = 0.5,
+                 commit: Optional[Callable] = None,
+                 progress: Optional[Callable[[ImportResult], None]] = None) -> ImportResult:
+    """
+    Write zones in batches of batch_size from a pool of workers.
+    A batch that fails is retried up to retries times, waiting backoff,
+    2 * backoff, 4 * backoff, ... seconds (with jitter) in between; batches
+    still failing are listed in ImportResult.failed and left out of the
+    checkpoint, so the next run with the same checkpoint retries them.
+    """
+    if not 1 <= batch_size <= MAX_BATCH_WRITES:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_WRITES}")
+    commit = commit or firebase.commit
+    batches = [zones[i:i + batch_size] for i in range(0, len(zones), batch_size)]
+    result = ImportResult(zones=len(zones), batches=len(batches))
+
+    checkpoint = Checkpoint(checkpoint_path, fingerprint(zones, batch_size))
+    if not checkpoint.load():
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to a different import; remove it to start over")
+    pending = [number for number in range(len(batches)) if number not in checkpoint.done]
+    result.resumed = len(batches) - len(pending)
+    lock = threading.Lock()
+
+    def write(number: int):
+        writes = [("set", (COLLECTION, zone["id"]), {k: v for k, v in zone.items() if k != "id"})
+                  for zone in batches[number]]
+        for attempt in range(retries + 1):
+            try:
+                commit(writes)
+                break
+            except Exception:
+                if attempt == retries:
+                    raise
+                with lock:
+                    result.retries += 1
+                delay = backoff * 2 ** attempt
+                time.sleep(delay / 2 + random.random() * delay / 2)
+        checkpoint.mark(number)
+        return len(writes)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(write, number): number for number in pending}
+        for future in as_completed(futures):
+            try:
+                written = future.result()
+                with lock:
+                    result.written += written
+            except Exception as e:
+                print(f"Batch {futures[future]} failed after {retries} retries: {e}")
+                result.failed.append(futures[future])
+            result.seconds = time.perf_counter() - start
+            if progress:
+                progress(result)
+
+    result.seconds = time.perf_counter() - start
+    result.failed.sort()
+    if not result.failed:
+        checkpoint.remove()
+    return result
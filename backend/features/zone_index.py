@@ -0,0 +1,262 @@
+"""
+Zone Spatial Index
+==================
+In-memory uniform-grid index over zone bounding boxes
+(`lat_min/lat_max/lng_min/lng_max`).
+
+Every zone is registered in each grid cell its box overlaps. The cell -> zone
+lists are stored CSR-style (one offsets array plus one flat members array), so
+building is vectorized and a point lookup only checks the few zones in one
+cell. Overlapping zones are supported: queries return every match, in
+insertion order.
+"""
+
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Upper bound on grid cells, keeps the offsets array small for sparse, wide extents
+MAX_CELLS = 1 << 22
+
+# Points classified per vectorized pass, bounds temporary memory in classify()
+CLASSIFY_CHUNK = 1 << 18
+
+
+class ZoneIndex:
+    """Uniform grid over zone bounds supporting point, bbox and k-nearest queries"""
+
+    def __init__(self, zones: List[Dict]):
+        """
+        Args:
+            zones: zones in API format (`bounds` dict) or raw Firestore format
+                   (flat `lat_min`... fields)
+        """
+        self.zones = list(zones)
+        self._positions = None
+        bounds = np.array([self._bounds_of(zone) for zone in zones], dtype=np.float64).reshape(-1, 4)
+        self.lat_min, self.lat_max, self.lng_min, self.lng_max = (np.ascontiguousarray(col) for col in bounds.T)
+        self.scores = np.array([zone.get("score", 0) for zone in zones], dtype=np.int64)
+        self.ids = np.array([zone.get("id") for zone in zones], dtype=object)
+        self._build_grid()
+
+    @staticmethod
+    def _bounds_of(zone: Dict) -> Tuple[float, float, float, float]:
+        bounds = zone.get("bounds", zone)
+        return (bounds.get("lat_min", 0), bounds.get("lat_max", 0), bounds.get("lng_min", 0), bounds.get("lng_max", 0))
+
+    def __len__(self):
+        return len(self.zones)
+
+    def position_of(self, zone_id: str) -> Optional[int]:
+        if self._positions is None:
+            self._positions = {zone.get("id"): i for i, zone in enumerate(self.zones)}
+        return self._positions.get(zone_id)
+
+    def update_zone(self, zone: Dict) -> bool:
+        """
+        Swap in a changed zone whose bounds are unchanged (e.g. a new score).
+        Returns False when the zone is unknown or moved, so the caller must rebuild.
+        """
+        i = self.position_of(zone.get("id"))
+        if i is None or self._bounds_of(zone) != (self.lat_min[i], self.lat_max[i], self.lng_min[i], self.lng_max[i]):
+            return False
+        self.zones[i] = zone
+        self.scores[i] = zone.get("score", 0)
+        return True
+
+    # =========================================
+    # BUILD
+    # =========================================
+
+    def _build_grid(self):
+        n = len(self.zones)
+        if not n:
+            self.origin_lat = self.origin_lng = 0.0
+            self.cell_size = 1.0
+            self.rows = self.cols = 1
+            self.offsets = np.zeros(2, dtype=np.int64)
+            self.members = np.empty(0, dtype=np.int64)
+            return
+
+        self.origin_lat = float(self.lat_min.min())
+        self.origin_lng = float(self.lng_min.min())
+        extent_lat = max(float(self.lat_max.max()) - self.origin_lat, 1e-9)
+        extent_lng = max(float(self.lng_max.max()) - self.origin_lng, 1e-9)
+
+        # Cells about the size of a typical zone, unless that would exceed MAX_CELLS
+        typical = float(np.median(np.maximum(self.lat_max - self.lat_min, self.lng_max - self.lng_min)))
+        cell_size = max(typical, math.sqrt(extent_lat * extent_lng / MAX_CELLS), 1e-9)
+        self.cell_size = cell_size
+        self.rows = int(extent_lat / cell_size) + 1
+        self.cols = int(extent_lng / cell_size) + 1
+
+        row_lo, col_lo = self._cell_coords(self.lat_min, self.lng_min)
+        row_hi, col_hi = self._cell_coords(self.lat_max, self.lng_max)
+        spans_rows = row_hi - row_lo + 1
+        spans_cols = col_hi - col_lo + 1
+        per_zone = spans_rows * spans_cols
+
+        # Expand every zone into (cell, zone) pairs without a Python loop
+        zone = np.repeat(np.arange(n, dtype=np.int64), per_zone)
+        within = np.arange(len(zone), dtype=np.int64) - np.repeat(np.cumsum(per_zone) - per_zone, per_zone)
+        cell_row = row_lo[zone] + within // spans_cols[zone]
+        cell_col = col_lo[zone] + within % spans_cols[zone]
+        cell = cell_row * self.cols + cell_col
+
+        order = np.lexsort((zone, cell))
+        self.members = zone[order]
+        self.offsets = np.searchsorted(cell[order], np.arange(self.rows * self.cols + 1))
+
+    # Every cell computation is floor((x - origin) / cell_size): with other
+    # roundings (e.g. float //) a point on a cell edge can land in a
+    # neighbouring cell, missing the zones registered in its own
+
+    def _cell_coords(self, lat, lng):
+        """Cells of arrays of points, clipped to the grid"""
+        row = np.floor((np.asarray(lat, dtype=np.float64) - self.origin_lat) / self.cell_size)
+        col = np.floor((np.asarray(lng, dtype=np.float64) - self.origin_lng) / self.cell_size)
+        return (np.clip(row, 0, self.rows - 1).astype(np.int64),
+                np.clip(col, 0, self.cols - 1).astype(np.int64))
+
+    def _cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        """Unclipped cell of one point; scalar twin of _cell_coords"""
+        return (math.floor((lat - self.origin_lat) / self.cell_size),
+                math.floor((lng - self.origin_lng) / self.cell_size))
+
+    # =========================================
+    # QUERIES
+    # =========================================
+
+    def _candidates(self, lat: float, lng: float) -> np.ndarray:
+        row, col = self._cell_of(lat, lng)
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return self.members[:0]
+        cell = row * self.cols + col
+        return self.members[self.offsets[cell]:self.offsets[cell + 1]]
+
+    def query_point(self, lat: float, lng: float) -> List[int]:
+        """Indexes of all zones containing the point, in insertion order"""
+        return [
+            i for i in self._candidates(lat, lng).tolist()
+            if self.lat_min[i] <= lat <= self.lat_max[i] and self.lng_min[i] <= lng <= self.lng_max[i]
+        ]
+
+    def first_at(self, lat: float, lng: float) -> Optional[Dict]:
+        """First inserted zone containing the point, or None"""
+        for i in self._candidates(lat, lng).tolist():
+            if self.lat_min[i] <= lat <= self.lat_max[i] and self.lng_min[i] <= lng <= self.lng_max[i]:
+                return self.zones[i]
+        return None
+
+    def query_bbox(self, lat_min: float, lng_min: float, lat_max: float, lng_max: float) -> List[int]:
+        """Indexes of all zones intersecting the bounding box, in insertion order"""
+        if not len(self.zones):
+            return []
+        row_lo, col_lo = self._cell_coords(lat_min, lng_min)
+        row_hi, col_hi = self._cell_coords(lat_max, lng_max)
+
+        chunks = []
+        for row in range(int(row_lo), int(row_hi) + 1):
+            start = self.offsets[row * self.cols + int(col_lo)]
+            end = self.offsets[row * self.cols + int(col_hi) + 1]
+            chunks.append(self.members[start:end])
+        candidates = np.unique(np.concatenate(chunks)) if chunks else self.members[:0]
+
+        hit = ((self.lat_min[candidates] <= lat_max) & (self.lat_max[candidates] >= lat_min) &
+               (self.lng_min[candidates] <= lng_max) & (self.lng_max[candidates] >= lng_min))
+        return candidates[hit].tolist()
+
+    def nearest(self, lat: float, lng: float, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        The k zones closest to the point as (index, distance in degrees),
+        nearest first. Zones containing the point have distance 0.
+        """
+        n = len(self.zones)
+        if not n or k <= 0:
+            return []
+        k = min(k, n)
+
+        row, col = self._cell_of(lat, lng)
+        seen = set()
+        best: List[Tuple[float, int]] = []  # max-heap of (-distance, index)
+        max_ring = max(self.rows, self.cols) + abs(row) + abs(col)
+
+        # Search rings of cells outward until nothing unseen can be closer than the k-th best
+        for ring in range(max_ring + 1):
+            ring_cells = self._ring(row, col, ring)
+            if ring_cells:
+                candidates = np.unique(np.concatenate([
+                    self.members[self.offsets[cell]:self.offsets[cell + 1]] for cell in ring_cells
+                ]))
+                candidates = candidates[[i not in seen for i in candidates.tolist()]] if seen else candidates
+                if len(candidates):
+                    seen.update(candidates.tolist())
+                    d_lat = np.maximum(0, np.maximum(self.lat_min[candidates] - lat, lat - self.lat_max[candidates]))
+                    d_lng = np.maximum(0, np.maximum(self.lng_min[candidates] - lng, lng - self.lng_max[candidates]))
+                    for i, distance in zip(candidates.tolist(), np.hypot(d_lat, d_lng).tolist()):
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance, i))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, i))
+
+            # Anything outside this ring is at least `ring` cells away
+            if len(best) == k and -best[0][0] <= ring * self.cell_size:
+                break
+
+        return sorted(((i, -d) for d, i in best), key=lambda item: (item[1], item[0]))
+
+    def _ring(self, row: int, col: int, ring: int) -> List[int]:
+        """Grid cells at Chebyshev distance `ring` from (row, col), clipped to the grid"""
+        cells = []
+        for r in range(row - ring, row + ring + 1):
+            if not 0 <= r < self.rows:
+                continue
+            if abs(r - row) == ring:
+                cols = range(max(col - ring, 0), min(col + ring, self.cols - 1) + 1)
+            else:
+                cols = [c for c in (col - ring, col + ring) if 0 <= c < self.cols]
+            cells.extend(r * self.cols + c for c in cols)
+        return cells
+
+    def classify(self, lats, lngs) -> np.ndarray:
+        """
+        Vectorized point-in-zone test for many points at once.
+        Returns, per point, the index of the first inserted zone containing it, or -1.
+        """
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        lngs = np.asarray(lngs, dtype=np.float64).ravel()
+        result = np.full(len(lats), -1, dtype=np.int64)
+        if not len(self.zones):
+            return result
+
+        for start in range(0, len(lats), CLASSIFY_CHUNK):
+            lat = lats[start:start + CLASSIFY_CHUNK]
+            lng = lngs[start:start + CLASSIFY_CHUNK]
+            result[start:start + CLASSIFY_CHUNK] = self._classify_chunk(lat, lng)
+        return result
+
+    def _classify_chunk(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        n = len(lat)
+        row = np.floor((lat - self.origin_lat) / self.cell_size)
+        col = np.floor((lng - self.origin_lng) / self.cell_size)
+        on_grid = (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+        cell = np.where(on_grid, row * self.cols + col, 0).astype(np.int64)
+        first = self.offsets[cell]
+        counts = np.where(on_grid, self.offsets[cell + 1] - first, 0)
+
+        # One (point, candidate zone) pair per zone registered in the point's cell
+        point = np.repeat(np.arange(n, dtype=np.int64), counts)
+        within = np.arange(len(point), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        zone = self.members[first[point] + within]
+
+        hit = ((self.lat_min[zone] <= lat[point]) & (lat[point] <= self.lat_max[zone]) &
+               (self.lng_min[zone] <= lng[point]) & (lng[point] <= self.lng_max[zone]))
+        point, zone = point[hit], zone[hit]
+
+        # Candidates are ordered by zone within each point, so the first hit is the earliest zone
+        result = np.full(n, -1, dtype=np.int64)
+        first_hit = np.unique(point, return_index=True)[1]
+        result[point[first_hit]] = zone[first_hit]
+        return result
@@ -0,0 +1,84 @@
+"""
+Zone Score Pyramid
+==================
+Multi-resolution sums of zone grid votes, for safety heatmaps zoomed out
+over a city or the whole country.
+
+Every level is a zoom level of web map tiles (spherical Mercator, the same
+tiles as QuadkeyCells). A tile holds the sum of the vote scores and the
+number of votes of all grid cells inside it, so its vote-weighted mean score
+is score / votes. A vote is added to its leaf tile and to each ancestor
+(x >> 1, y >> 1 per level up): leaf_zoom + 1 dict updates, no rescans.
+
+Like the grid itself, levels are sparse: only tiles containing voted cells
+exist.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Zoom levels below the requested tile that a tile response is made of: 3 gives 8 x 8 cells per tile
+TILE_DETAIL_LEVELS = 3
+
+
+class ScorePyramid:
+    """Sparse per-tile [score, votes] sums from zoom 0 down to leaf_zoom"""
+
+    def __init__(self, leaf_zoom: int):
+        self.leaf_zoom = leaf_zoom
+        self._levels: List[Dict[int, List[int]]] = [{} for _ in range(leaf_zoom + 1)]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, leaf_zoom: int, leaves: Iterable[Tuple[int, int, int, int]]) -> "ScorePyramid":
+        """Pyramid over (x, y, score, votes) leaf tiles"""
+        pyramid = cls(leaf_zoom)
+        for x, y, score, votes in leaves:
+            pyramid.add(x, y, score, votes)
+        return pyramid
+
+    def add(self, x: int, y: int, score: int, votes: int = 1):
+        """Add score and votes to leaf tile (x, y) and all its ancestors"""
+        with self._lock:
+            for zoom in range(self.leaf_zoom, -1, -1):
+                node = self._levels[zoom].setdefault((y << zoom) | x, [0, 0])
+                node[0] += score
+                node[1] += votes
+                x >>= 1
+                y >>= 1
+
+    def node(self, zoom: int, x: int, y: int) -> Tuple[int, int]:
+        """(score, votes) of one tile; past leaf_zoom, of the leaf tile containing it"""
+        if zoom > self.leaf_zoom:
+            shift = zoom - self.leaf_zoom
+            zoom, x, y = self.leaf_zoom, x >> shift, y >> shift
+        score, votes = self._levels[zoom].get((y << zoom) | x, (0, 0))
+        return score, votes
+
+    def tile(self, zoom: int, x: int, y: int, detail: int = TILE_DETAIL_LEVELS) -> Tuple[int, List[Tuple]]:
+        """
+        (detail zoom, [(x, y, score, votes), ...]) for the voted tiles
+        detail levels below tile (zoom, x, y), capped at leaf_zoom. Past
+        leaf_zoom, the one leaf tile containing the requested tile.
+        """
+        if zoom >= self.leaf_zoom:
+            shift = zoom - self.leaf_zoom
+            x, y = x >> shift, y >> shift
+            score, votes = self.node(self.leaf_zoom, x, y)
+            return self.leaf_zoom, [(x, y, score, votes)] if votes or score else []
+
+        detail_zoom = min(zoom + detail, self.leaf_zoom)
+        shift = detail_zoom - zoom
+        level = self._levels[detail_zoom]
+        cells = []
+        with self._lock:
+            for child_y in range(y << shift, (y + 1) << shift):
+                row = child_y << detail_zoom
+                for child_x in range(x << shift, (x + 1) << shift):
+                    node = level.get(row | child_x)
+                    if node:
+                        cells.append((child_x, child_y, node[0], node[1]))
+        return detail_zoom, cells
+
+    def tile_count(self) -> int:
+        return sum(len(level) for level in self._levels)
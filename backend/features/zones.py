@@ -3,24 +3,70 @@ Geo-Fencing Zones Feature (Firestore-backed)
 =============================================
 Divides the map into chunks with zone classifications based on user voting.
 Data is stored in Firebase Firestore.
+
+A zone's score is the "score" field of its document plus its score shards,
+zones/{zone_id}/score_shards/{n}. Votes never rewrite the zone document:
+each adds an atomic increment to one randomly picked shard, so concurrent
+votes don't lose updates, and hot zones don't queue up on a single
+document. The vote document's id is "{zone_id}__{user_id}", and it is
+created in the same batch as the increment, so a repeat vote fails as a
+whole and never touches the score. Reading one zone reads only its own
+shards; listings sum every zone's shards with one collection group read,
+cached for its TTL rather than invalidated by each vote.
+
+With WRITE_BEHIND=1 votes are queued instead (services/write_behind.py):
+each zone's pending votes are committed together with a single increment
+of their sum, and reads show them once flushed (within a second or so).
+A vote whose document is already stored is refused before queueing; one
+that still turns out to be a repeat at flush time (a race with another
+server) is dropped, and taken back out of the in-memory grid and index.
+
+Besides the hand-drawn zones, every city is covered by a grid of cells
+(features/zone_grid.py) that can be voted on the same way; only voted
+cells are stored. A pyramid of per-tile vote sums over the grid serves
+zoomed-out heatmaps from /api/zones/tiles/<z>/<x>/<y>.
 """
 
 import os
+import random
 import sys
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
+import numpy as np
+from flask import Blueprint, g, jsonify, request
+
 # Add parent dir to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Try to import Firebase service
 try:
-    from services.firebase_service import firebase, FIREBASE_AVAILABLE
+    from services.firebase_service import firebase, increment, AlreadyExistsError, FIREBASE_AVAILABLE
 except ImportError:
     FIREBASE_AVAILABLE = False
     firebase = None
 
+from features.auth import require_auth
+from features.live_stream import parse_bbox
+from features.mock_data_generator import MockDataGenerator
+from features.zone_grid import ZoneGrid, cells_from_env, quadkey, tile_bounds
+from features.zone_index import ZoneIndex
+from services.http_cache import is_not_modified, make_etag, not_modified, with_etag
+from services.lazy import LazyInstance
+from services.write_behind import write_behind, WRITE_BEHIND_ENABLED
+
+# Rebuild the in-memory zone index at least this often, to pick up changes from other servers
+ZONE_INDEX_TTL_SECONDS = float(os.environ.get("ZONE_INDEX_TTL_SECONDS", "60"))
+
+# Deepest web map zoom the tile endpoint accepts (past the grid's resolution it serves the containing cell)
+MAX_TILE_ZOOM = 22
+
+# Score shards per zone; a zone document's "score_shards" field overrides it for very hot zones
+ZONE_SCORE_SHARDS = int(os.environ.get("ZONE_SCORE_SHARDS", "8"))
+
 
 class ZoneColor(Enum):
     """Safety classification for a chunk"""
@@ -29,16 +75,26 @@ class ZoneColor(Enum):
     GREEN = "green"   # Safe zone (score >= 5)
 
 
+SAFE_SCORE = 5
+DANGER_SCORE = -5
+
+
 def calculate_zone_color(score: int) -> str:
     """Calculate zone color based on vote score"""
-    if score >= 5:
+    if score >= SAFE_SCORE:
         return ZoneColor.GREEN.value
-    elif score <= -5:
+    elif score <= DANGER_SCORE:
         return ZoneColor.RED.value
     else:
         return ZoneColor.YELLOW.value
 
 
+def calculate_zone_colors(scores: np.ndarray) -> np.ndarray:
+    """Vectorized calculate_zone_color for an array of scores"""
+    return np.where(scores >= SAFE_SCORE, ZoneColor.GREEN.value,
+                    np.where(scores <= DANGER_SCORE, ZoneColor.RED.value, ZoneColor.YELLOW.value))
+
+
 # ============================================================
 # DELHI MOCK DATA (fallback if Firestore is empty)
 # ============================================================
@@ -66,6 +122,14 @@ class ZoneManager:
     
     COLLECTION = "zones"
     VOTES_COLLECTION = "votes"
+    SHARDS_COLLECTION = "score_shards"
+    SCORE_COUNTER = "zone_score"
+    
+    _index: Optional[ZoneIndex] = None
+    _index_built_at = 0.0
+    _index_generation = 0
+    _index_lock = threading.Lock()
+    _grid_loaded_at = float("-inf")
     
     @staticmethod
     def _zone_to_dict(zone: Dict) -> Dict:
@@ -84,6 +148,71 @@ class ZoneManager:
             "zone_color": calculate_zone_color(score),
         }
     
+    @staticmethod
+    def vote_id(zone_id: str, user_id: str) -> str:
+        """Vote document id: one vote per user per zone"""
+        return f"{zone_id}__{user_id}"
+    
+    @staticmethod
+    def vote_totals() -> Dict[str, Tuple[int, int]]:
+        """
+        (score, votes) summed over the score shards of every zone that has any,
+        by zone id. A collection group scan, for bulk reads only: it is cached
+        for the score_shards TTL and votes don't invalidate it.
+        """
+        totals: Dict[str, Tuple[int, int]] = {}
+        for shard in firebase.get_collection_group(ZoneManager.SHARDS_COLLECTION):
+            score, votes = totals.get(shard["parent_id"], (0, 0))
+            totals[shard["parent_id"]] = (score + shard.get("score", 0), votes + shard.get("votes", 0))
+        return totals
+    
+    @staticmethod
+    def shard_totals() -> Dict[str, int]:
+        """Sum of the score shards of every zone that has any, by zone id"""
+        return {zone_id: score for zone_id, (score, _) in ZoneManager.vote_totals().items()}
+    
+    @staticmethod
+    def _shards_path(zone_id: str) -> str:
+        return f"{ZoneManager.COLLECTION}/{zone_id}/{ZoneManager.SHARDS_COLLECTION}"
+    
+    @staticmethod
+    def shard_total(zone_id: str) -> int:
+        """Sum of one zone's score shards (at most its score_shards documents)"""
+        return sum(shard.get("score", 0) for shard in firebase.get_collection(ZoneManager._shards_path(zone_id)))
+    
+    @staticmethod
+    def _cached_score(zone_doc: Dict) -> int:
+        """
+        A zone's score from what this process already has, without a read,
+        counting each queued write-behind vote once: the spatial index's copy
+        (votes update it as they are queued), else the document plus its
+        cached shards plus the votes still queued for it
+        """
+        zone_id = zone_doc.get("id")
+        index = ZoneManager._index
+        position = index.position_of(zone_id) if index is not None else None
+        if position is not None:
+            return int(index.scores[position])
+        shards = firebase.cache.get_collection(ZoneManager._shards_path(zone_id)) or []
+        stored = zone_doc.get("score", 0) + sum(shard.get("score", 0) for shard in shards)
+        return stored + write_behind.pending_amount(ZoneManager.SCORE_COUNTER, zone_id)
+    
+    @staticmethod
+    def _score_increment(zone_id: str, amount: int, votes: int = 1) -> tuple:
+        """Write adding amount (and the number of votes it came from) to one randomly picked score shard"""
+        shards = ZONE_SCORE_SHARDS
+        if zone_grid.cells.parse(zone_id) is None:  # grid cells have no zone document
+            zone_doc = firebase.get_document(ZoneManager.COLLECTION, zone_id) or {}
+            shards = zone_doc.get("score_shards", ZONE_SCORE_SHARDS)
+        shard = str(random.randrange(shards))
+        return ("merge", (ZoneManager.COLLECTION, zone_id, ZoneManager.SHARDS_COLLECTION, shard),
+                {"score": increment(amount), "votes": increment(votes)})
+    
+    @staticmethod
+    def _with_votes(doc: Dict, totals: Dict[str, int]) -> Dict:
+        """Zone document with its shard total added to the stored score"""
+        return {**doc, "score": doc.get("score", 0) + totals.get(doc.get("id"), 0)}
+    
     @staticmethod
     def get_all_zones() -> Dict:
         """Get all zones from Firestore (or mock data)"""
@@ -93,7 +222,8 @@ class ZoneManager:
         if firebase and firebase.db:
             docs = firebase.get_collection(ZoneManager.COLLECTION)
             if docs:
-                zones = [ZoneManager._zone_to_dict(doc) for doc in docs]
+                totals = ZoneManager.shard_totals()
+                zones = [ZoneManager._zone_to_dict(ZoneManager._with_votes(doc, totals)) for doc in docs]
         
         # Fallback to mock data
         if not zones:
@@ -113,6 +243,7 @@ class ZoneManager:
         if firebase and firebase.db:
             doc = firebase.get_document(ZoneManager.COLLECTION, zone_id)
             if doc:
+                doc = ZoneManager._with_votes(doc, {zone_id: ZoneManager.shard_total(zone_id)})
                 return {"success": True, "zone": ZoneManager._zone_to_dict(doc)}
         
         # Fallback to mock
@@ -122,6 +253,52 @@ class ZoneManager:
         
         return {"success": False, "error": "Zone not found"}
     
+    @staticmethod
+    def _record_vote(zone_id: str, user_id: str, vote: int) -> Optional[Dict]:
+        """
+        Store a vote together with its score increment (or queue both with
+        WRITE_BEHIND). Returns the error response for a repeat vote, else None.
+        """
+        vote_data = {
+            "zone_id": zone_id,
+            "user_id": user_id,
+            "vote": vote,
+        }
+        vote_path = (ZoneManager.VOTES_COLLECTION, ZoneManager.vote_id(zone_id, user_id))
+        
+        if WRITE_BEHIND_ENABLED:
+            # Repeats committed meanwhile are dropped at flush time, see _drop_queued_vote
+            if (firebase.get_document(*vote_path)
+                    or not write_behind.create_counted(ZoneManager.SCORE_COUNTER, zone_id, vote_path, vote_data, vote)):
+                return {"success": False, "error": "Already voted on this zone"}
+            return None
+        try:
+            firebase.commit([
+                ("create", vote_path, vote_data),
+                ZoneManager._score_increment(zone_id, vote),
+            ])
+        except AlreadyExistsError:
+            return {"success": False, "error": "Already voted on this zone"}
+        return None
+    
+    @staticmethod
+    def _drop_queued_vote(zone_id: str, vote: int, queued_at: float):
+        """
+        Undo the in-memory effect of a queued vote that the write-behind flush
+        found to be a repeat, unless a reload since it was queued already did
+        """
+        key = zone_grid.resolve().cells.parse(zone_id)
+        if key is not None:
+            if ZoneManager._grid_loaded_at < queued_at:
+                zone_grid.resolve().vote(key, -vote, -1)
+            return
+        index = ZoneManager._index
+        position = index.position_of(zone_id) if index is not None else None
+        if position is not None and ZoneManager._index_built_at < queued_at:
+            zone = index.zones[position]
+            score = zone["score"] - vote
+            index.update_zone({**zone, "score": score, "zone_color": calculate_zone_color(score)})
+    
     @staticmethod
     def submit_vote(zone_id: str, user_id: str, vote: int) -> Dict:
         """
@@ -137,22 +314,18 @@ class ZoneManager:
         if not firebase or not firebase.db:
             return {"success": False, "error": "Database not connected"}
         
-        # Get current zone
         zone_doc = firebase.get_document(ZoneManager.COLLECTION, zone_id)
         if not zone_doc:
             return {"success": False, "error": "Zone not found"}
+        score = ZoneManager._cached_score(zone_doc)
         
-        # Save the vote
-        vote_data = {
-            "zone_id": zone_id,
-            "user_id": user_id,
-            "vote": vote,
-        }
-        firebase.create_document(ZoneManager.VOTES_COLLECTION, vote_data)
+        repeat = ZoneManager._record_vote(zone_id, user_id, vote)
+        if repeat:
+            return repeat
+        # Best known score without another read: concurrent votes show up on the next get_zone
+        new_score = score + vote
         
-        # Update zone score
-        new_score = zone_doc.get("score", 0) + vote
-        firebase.update_document(ZoneManager.COLLECTION, zone_id, {"score": new_score})
+        ZoneManager._update_indexed_zone({**zone_doc, "score": new_score})
         
         return {
             "success": True,
@@ -161,16 +334,322 @@ class ZoneManager:
             "new_zone_color": calculate_zone_color(new_score)
         }
     
+    # =========================================
+    # ZONE GRID
+    # =========================================
+    
+    @staticmethod
+    def grid() -> ZoneGrid:
+        """
+        The city zone grid, with cell scores re-read from Firestore every
+        ZONE_INDEX_TTL_SECONDS to pick up votes through other servers.
+        """
+        grid = zone_grid.resolve()
+        if firebase and firebase.db and time.monotonic() - ZoneManager._grid_loaded_at > ZONE_INDEX_TTL_SECONDS:
+            with ZoneManager._index_lock:
+                if time.monotonic() - ZoneManager._grid_loaded_at > ZONE_INDEX_TTL_SECONDS:
+                    grid.load_scores(ZoneManager.vote_totals())
+                    ZoneManager._grid_loaded_at = time.monotonic()
+        return grid
+    
+    @staticmethod
+    def get_grid_cell(lat: float, lng: float) -> Dict:
+        """The grid cell at a location, as a zone"""
+        grid = ZoneManager.grid()
+        key = grid.key_at(lat, lng)
+        if key is None:
+            return {"success": False, "error": "No city grid covers this location"}
+        return {"success": True, "city": grid.city_at(lat, lng), "zone": ZoneManager._zone_to_dict(grid.zone(key))}
+    
+    @staticmethod
+    def get_voted_cells(bounds) -> Dict:
+        """Cells with votes inside a bounding box; every other covered cell has score 0"""
+        grid = ZoneManager.grid()
+        zones = [ZoneManager._zone_to_dict(grid.zone(key)) for key in grid.voted_keys(bounds)]
+        return {"success": True, "count": len(zones), "zones": zones}
+    
+    @staticmethod
+    def submit_cell_vote(lat: float, lng: float, user_id: str, vote: int) -> Dict:
+        """Vote on the grid cell at a location (one vote per user per cell)"""
+        if vote not in [-1, 1]:
+            return {"success": False, "error": "Vote must be +1 or -1"}
+        
+        if not firebase or not firebase.db:
+            return {"success": False, "error": "Database not connected"}
+        
+        grid = ZoneManager.grid()
+        key = grid.key_at(lat, lng)
+        if key is None:
+            return {"success": False, "error": "No city grid covers this location"}
+        
+        repeat = ZoneManager._record_vote(grid.cells.cell_id(key), user_id, vote)
+        if repeat:
+            return repeat
+        grid.vote(key, vote)
+        
+        zone = ZoneManager._zone_to_dict(grid.zone(key))
+        return {
+            "success": True,
+            "zone": zone,
+            "new_score": zone["score"],
+            "new_zone_color": zone["zone_color"]
+        }
+    
+    @staticmethod
+    def get_zone_tile(z: int, x: int, y: int) -> Dict:
+        """
+        Pre-aggregated grid scores for web map tile z/x/y: the voted tiles
+        TILE_DETAIL_LEVELS zoom levels further in, each with its score sum,
+        vote count and vote-weighted mean score.
+        """
+        pyramid = ZoneManager.grid().pyramid
+        detail_zoom, cells = pyramid.tile(z, x, y)
+        score, votes = pyramid.node(z, x, y)
+        return {
+            "success": True,
+            "z": z, "x": x, "y": y,
+            "bbox": list(tile_bounds(x, y, z)),
+            "score": score,
+            "votes": votes,
+            "detail_zoom": detail_zoom,
+            "count": len(cells),
+            "cells": [
+                {
+                    "id": quadkey(cell_x, cell_y, detail_zoom),
+                    "x": cell_x, "y": cell_y,
+                    "bbox": list(tile_bounds(cell_x, cell_y, detail_zoom)),
+                    "score": cell_score,
+                    "votes": cell_votes,
+                    "mean": round(cell_score / cell_votes, 3) if cell_votes else None,
+                    "zone_color": calculate_zone_color(cell_score),
+                }
+                for cell_x, cell_y, cell_score, cell_votes in cells
+            ],
+        }
+    
+    # =========================================
+    # SPATIAL INDEX
+    # =========================================
+    
+    @staticmethod
+    def _cache_generation() -> int:
+        """Generation of the cached zones collection (see services/firestore_cache.py)"""
+        if firebase and firebase.db:
+            return firebase.cache.generation(ZoneManager.COLLECTION)
+        return 0
+    
+    @staticmethod
+    def zone_index() -> ZoneIndex:
+        """
+        Spatial index over all zones. Rebuilt after ZONE_INDEX_TTL_SECONDS, or
+        sooner when the cached zones collection changed underneath it.
+        """
+        index = ZoneManager._index
+        if (index is None or time.monotonic() - ZoneManager._index_built_at > ZONE_INDEX_TTL_SECONDS
+                or ZoneManager._index_generation != ZoneManager._cache_generation()):
+            with ZoneManager._index_lock:
+                if ZoneManager._index is index:
+                    generation = ZoneManager._cache_generation()
+                    zones = ZoneManager.get_all_zones()["zones"]
+                    ZoneManager._index = ZoneIndex(zones)
+                    ZoneManager._index_built_at = time.monotonic()
+                    ZoneManager._index_generation = generation
+                index = ZoneManager._index
+        return index
+    
+    @staticmethod
+    def refresh_index():
+        """Drop the spatial index; it is rebuilt on the next lookup"""
+        with ZoneManager._index_lock:
+            ZoneManager._index = None
+    
+    @staticmethod
+    def _update_indexed_zone(zone_doc: Dict):
+        """Keep the index in step with a changed zone, rebuilding only if its bounds moved"""
+        index = ZoneManager._index
+        if index is not None and not index.update_zone(ZoneManager._zone_to_dict(zone_doc)):
+            ZoneManager.refresh_index()
+        elif index is not None:
+            # The write invalidated the zones cache, but the index already has the change
+            ZoneManager._index_generation = ZoneManager._cache_generation()
+    
     @staticmethod
     def get_zone_by_location(lat: float, lng: float) -> Dict:
         """Find zone at a specific location"""
-        result = ZoneManager.get_all_zones()
-        for zone in result.get("zones", []):
-            bounds = zone.get("bounds", {})
-            if (bounds.get("lat_min", 0) <= lat <= bounds.get("lat_max", 0) and
-                bounds.get("lng_min", 0) <= lng <= bounds.get("lng_max", 0)):
-                return {"success": True, "zone": zone}
+        zone = ZoneManager.zone_index().first_at(lat, lng)
+        if zone:
+            return {"success": True, "zone": zone}
         return {"success": False, "error": "No zone at this location"}
+    
+    @staticmethod
+    def get_zones_at_location(lat: float, lng: float) -> Dict:
+        """Find all (possibly overlapping) zones at a specific location"""
+        index = ZoneManager.zone_index()
+        zones = [index.zones[i] for i in index.query_point(lat, lng)]
+        return {"success": True, "count": len(zones), "zones": zones}
+    
+    @staticmethod
+    def get_zones_in_bounds(lat_min: float, lng_min: float, lat_max: float, lng_max: float) -> Dict:
+        """Find all zones intersecting a bounding box"""
+        index = ZoneManager.zone_index()
+        zones = [index.zones[i] for i in index.query_bbox(lat_min, lng_min, lat_max, lng_max)]
+        return {"success": True, "count": len(zones), "zones": zones}
+    
+    @staticmethod
+    def get_nearest_zones(lat: float, lng: float, k: int = 5) -> Dict:
+        """Find the k zones closest to a location (distance in degrees, 0 = inside)"""
+        index = ZoneManager.zone_index()
+        zones = [{**index.zones[i], "distance": distance} for i, distance in index.nearest(lat, lng, k)]
+        return {"success": True, "count": len(zones), "zones": zones}
+    
+    @staticmethod
+    def classify_points(lats, lngs) -> Dict:
+        """
+        Batch point-in-zone classification, e.g. for a whole vehicle fleet.
+        Returns per-point zone ids and zone colors (None where no zone covers the point).
+        """
+        index = ZoneManager.zone_index()
+        positions = index.classify(lats, lngs)
+        found = positions >= 0
+        
+        zone_ids = np.full(len(positions), None, dtype=object)
+        zone_ids[found] = index.ids[positions[found]]
+        zone_colors = np.full(len(positions), None, dtype=object)
+        zone_colors[found] = calculate_zone_colors(index.scores[positions[found]])
+        
+        return {
+            "success": True,
+            "count": len(positions),
+            "matched": int(found.sum()),
+            "zone_ids": zone_ids.tolist(),
+            "zone_colors": zone_colors.tolist(),
+        }
+
+
+write_behind.register_counter(ZoneManager.SCORE_COUNTER, ZoneManager._score_increment, ZoneManager._drop_queued_vote)
+
+# Global instance; built on first use
+zone_grid = LazyInstance(lambda: ZoneGrid(cells_from_env(), MockDataGenerator._generate_regions()), "Zone grid")
+
+
+# ============================================================
+# API ENDPOINTS
+# ============================================================
+
+zones_bp = Blueprint('zones', __name__)
+
+@zones_bp.route('/api/zones/classify', methods=['POST'])
+def classify_points():
+    """
+    Classify many points against the safety zones in one call.
+    Body: JSON { "points": [[lat, lng], ...] }
+       or application/octet-stream: packed little-endian float64 (lat, lng) pairs
+          (?dtype=float32 for float32 pairs)
+    """
+    try:
+        if request.mimetype == 'application/octet-stream':
+            dtype = '<f4' if request.args.get('dtype') == 'float32' else '<f8'
+            raw = request.get_data()
+            if len(raw) % (2 * np.dtype(dtype).itemsize):
+                return jsonify({"success": False, "error": "Binary body must hold whole (lat, lng) pairs"}), 400
+            points = np.frombuffer(raw, dtype=dtype).reshape(-1, 2)
+        else:
+            data = request.get_json(silent=True) or {}
+            points = np.asarray(data.get('points', []), dtype=np.float64).reshape(-1, 2)
+        
+        return jsonify(ZoneManager.classify_points(points[:, 0], points[:, 1])), 200
+    except ValueError:
+        return jsonify({"success": False, "error": "points must be a list of [lat, lng] pairs"}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@zones_bp.route('/api/zones/grid', methods=['GET'])
+def grid_overview():
+    """Cell scheme, covered cities (with bounds and cell counts) and how many cells have votes"""
+    try:
+        grid = ZoneManager.grid()
+        cities = [
+            {"name": name, "bbox": list(bounds), "cells": grid.city_cell_count(name)}
+            for name, bounds in grid.cities.items()
+        ]
+        return jsonify({"success": True, **grid.stats(), "city_grids": cities}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@zones_bp.route('/api/zones/grid/cell', methods=['GET'])
+def grid_cell():
+    """The zone grid cell at ?lat=&lng="""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None:
+        return jsonify({"success": False, "error": "lat and lng are required"}), 400
+    try:
+        result = ZoneManager.get_grid_cell(lat, lng)
+        return jsonify(result), 200 if result["success"] else 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@zones_bp.route('/api/zones/grid/cells', methods=['GET'])
+def grid_cells():
+    """
+    Grid cells that have votes, inside ?bbox=lat_min,lng_min,lat_max,lng_max
+    or ?city=<name>. Covered cells missing from the list have score 0.
+    """
+    try:
+        city = request.args.get('city')
+        if city:
+            bounds = ZoneManager.grid().cities.get(city)
+            if bounds is None:
+                return jsonify({"success": False, "error": f"No grid for city {city}"}), 404
+        else:
+            bounds = parse_bbox(request.args.get('bbox', ''))
+        return jsonify(ZoneManager.get_voted_cells(bounds)), 200
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@zones_bp.route('/api/zones/grid/vote', methods=['POST'])
+@require_auth
+def grid_vote():
+    """
+    Vote on the grid cell at a location.
+    Body: { "lat": ..., "lng": ..., "vote": 1 | -1 }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        lat, lng, vote = float(data['lat']), float(data['lng']), int(data['vote'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"success": False, "error": "lat, lng and vote are required"}), 400
+    try:
+        result = ZoneManager.submit_cell_vote(lat, lng, g.user["uid"], vote)
+        return jsonify(result), 200 if result["success"] else 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@zones_bp.route('/api/zones/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def zone_tile(z, x, y):
+    """
+    Zone grid scores for one web map tile, pre-aggregated at a resolution
+    that suits the zoom level (see ZoneManager.get_zone_tile). Only tiles
+    with votes are listed. Revalidate with If-None-Match.
+    """
+    if not 0 <= z <= MAX_TILE_ZOOM or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+        return jsonify({"success": False, "error": f"No tile {z}/{x}/{y} (zoom 0-{MAX_TILE_ZOOM})"}), 400
+    try:
+        grid = ZoneManager.grid()
+        # Any vote below the tile changes its own (score, votes)
+        etag = make_etag("zone-tile", grid.generation, z, x, y, *grid.pyramid.node(z, x, y))
+        if is_not_modified(etag):
+            return not_modified(etag)
+        return with_etag(jsonify(ZoneManager.get_zone_tile(z, x, y)), etag)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
 
 # Alias for backward compatibility
@@ -179,6 +658,14 @@ class ZoneRoutes:
     get_zone = ZoneManager.get_zone
     submit_vote = ZoneManager.submit_vote
     get_zone_by_location = ZoneManager.get_zone_by_location
+    get_zones_at_location = ZoneManager.get_zones_at_location
+    get_zones_in_bounds = ZoneManager.get_zones_in_bounds
+    get_nearest_zones = ZoneManager.get_nearest_zones
+    classify_points = ZoneManager.classify_points
+    get_grid_cell = ZoneManager.get_grid_cell
+    get_voted_cells = ZoneManager.get_voted_cells
+    get_zone_tile = ZoneManager.get_zone_tile
+    submit_cell_vote = ZoneManager.submit_cell_vote
 
 
 # ============================================================
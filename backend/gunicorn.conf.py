@@ -0,0 +1,33 @@
+"""
+Gunicorn Settings
+=================
+Serves the API with gevent workers: every connection, including each idle
+live stream subscriber (/api/tracking/stream and /api/tracking/ws), is a
+greenlet instead of an OS thread, so one process holds 10k+ open streams.
+
+    cd backend && gunicorn main:app
+
+One worker by default: the simulated fleet, the stream hub and the caches
+live in the process, so several workers would each simulate their own fleet.
+The background jobs (simulation ticks, GTFS polling, write-behind flushes)
+run as greenlets too.
+"""
+
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+worker_class = "gevent"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+# Open connections per worker; each needs a file descriptor (check ulimit -n)
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", "20000"))
+# Queued connections not yet accepted, for bursts of (re)connecting subscribers
+backlog = 4096
+
+
+def post_worker_init(worker):
+    # Firestore talks gRPC, whose threads must cooperate with gevent's event loop
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+    except ImportError:
+        return
+    grpc_gevent.init_gevent()
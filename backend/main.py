@@ -1,5 +1,11 @@
 """
 Main Flask Application for Public Transport Tracking System
+
+create_app() builds the app. Heavy subsystems (the mock data, the Google Maps
+and Firebase clients) are created on first use rather than at import, so the
+server answers /api/health right away; the mock data is built on a
+background thread meanwhile. WARM_SNAPSHOT_PATH lets restarts load the
+generated data from disk instead of regenerating it.
 """
 
 from flask import Flask, jsonify
@@ -11,22 +17,61 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import feature blueprints
-from features.routes import routes_bp
+from features.routes import routes_bp, directions_prefetcher
 from features.tracking import tracking_bp
 from features.reporting import reporting_bp
+from features.zones import zones_bp
+from features.tick_scheduler import tick_scheduler
+from features.gtfs_handler import gtfs_poller, GTFS_POLLING_ENABLED
+from services.directions_cache import directions_cache
+from features.mock_data_generator import mock_data
+from services.json_encoding import configure_json
+from services.write_behind import write_behind
+
+# Build the mock data on a background thread at startup instead of on the first request that needs it
+WARM_ON_START = os.environ.get("WARM_ON_START", "1").lower() not in ("0", "false", "no")
+
+
+def create_app(start_background: bool = True) -> Flask:
+    """Flask app with every blueprint registered; optionally starts the background jobs"""
+    app = Flask(__name__)
+
+    # Serialize responses with orjson when JSON_ENCODER=orjson
+    configure_json(app)
+
+    # Enable CORS for frontend communication
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+
+    # Register blueprints
+    app.register_blueprint(routes_bp)
+    app.register_blueprint(tracking_bp)
+    app.register_blueprint(reporting_bp)
+    app.register_blueprint(zones_bp)
 
-# Create Flask app
-app = Flask(__name__)
+    app.add_url_rule('/', view_func=home)
+    app.add_url_rule('/api/health', view_func=health_check, methods=['GET'])
 
-# Enable CORS for frontend communication
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+    if start_background:
+        start_background_jobs()
+    return app
 
-# Register blueprints
-app.register_blueprint(routes_bp)
-app.register_blueprint(tracking_bp)
-app.register_blueprint(reporting_bp)
 
-@app.route('/')
+def start_background_jobs():
+    """Warm the mock data and start the tick, GTFS and directions schedulers"""
+    if WARM_ON_START:
+        mock_data.warm_in_background()
+
+    # Advance the simulated fleet in the background, independent of client polling
+    tick_scheduler.start()
+
+    # Poll GTFS-Realtime feeds in the background when endpoints are configured
+    if GTFS_POLLING_ENABLED:
+        gtfs_poller.start()
+
+    # Keep directions for popular routes warm when a Google Maps key is configured
+    if directions_cache.enabled:
+        directions_prefetcher.start()
+
 def home():
     """API home endpoint"""
     return jsonify({
@@ -39,18 +84,31 @@ def home():
             "route_details": "/api/routes/<route_id>",
             "tracking": "/api/tracking/<route_id>",
             "tracking_updates": "/api/tracking/<route_id>/updates",
-            "all_vehicles": "/api/tracking/all"
+            "all_vehicles": "/api/tracking/all",
+            "viewport_vehicles": "/api/tracking/viewport?bbox=<lat_min,lng_min,lat_max,lng_max>&zoom=<z>",
+            "realtime_vehicles": "/api/realtime/<region>",
+            "vehicle_stream": "/api/tracking/stream?route=<route_id>",
+            "classify_points": "/api/zones/classify",
+            "zone_grid": "/api/zones/grid",
+            "zone_grid_cell": "/api/zones/grid/cell?lat=<lat>&lng=<lng>",
+            "zone_grid_cells": "/api/zones/grid/cells?city=<name> | bbox=<lat_min,lng_min,lat_max,lng_max>",
+            "zone_grid_vote": "/api/zones/grid/vote",
+            "zone_tiles": "/api/zones/tiles/<z>/<x>/<y>"
         }
     })
 
-@app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; healthy while the mock data is still warming up"""
     return jsonify({
         "status": "healthy",
-        "service": "transport-tracking-api"
+        "service": "transport-tracking-api",
+        "data_ready": mock_data.initialized,
+        "write_behind": write_behind.status()
     }), 200
 
+
+app = create_app()
+
 if __name__ == '__main__':
     print("Starting Public Transport Tracking API...")
     print("Server running on http://localhost:5000")
@@ -0,0 +1,93 @@
+"""
+GTFS-Realtime Parse Benchmark
+=============================
+Compares the two GTFSHandler parse modes on synthetic VehiclePositions feeds:
+
+- dicts:    one Python dict per FeedEntity (`_parse_feed`)
+- columnar: the same fields stored as one NumPy structured array per feed
+            (`_parse_feed_columnar`), dicts built only for the vehicles a
+            response returns
+
+Both modes read fields from the same decoded FeedMessage, so protobuf
+decoding (`ParseFromString`) is reported separately. The parse column is
+mostly protobuf field access, which both modes share.
+
+Usage:
+    python backend/scripts/bench_gtfs_parse.py
+    python backend/scripts/bench_gtfs_parse.py --entities 10000 50000 100000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from google.transit import gtfs_realtime_pb2
+
+from features.gtfs_handler import gtfs_handler
+from gtfs_replay_server import synthetic_feed
+
+
+def best_of(repeat, fn):
+    """Fastest of `repeat` runs in ms, and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def retained_kib(fn):
+    """Memory still held by fn's result, in KiB"""
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current // 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'entities':>8} {'mode':<9} {'decode ms':>10} {'parse ms':>9} {'route ms':>9} {'all ms':>8} {'held KiB':>9}")
+    for entities in args.entities:
+        content = synthetic_feed(entities, time.time())
+        decode_ms, feed = best_of(args.repeat, lambda: gtfs_realtime_pb2.FeedMessage.FromString(content))
+
+        dicts = gtfs_handler._parse_feed(feed)
+        table = gtfs_handler._parse_feed_columnar(feed)
+        route_id = dicts[0]["route_id"]
+
+        modes = {
+            "dicts": (
+                lambda: gtfs_handler._parse_feed(feed),
+                lambda: [v for v in dicts if v["route_id"] == route_id],
+                lambda: list(dicts),
+            ),
+            "columnar": (
+                lambda: gtfs_handler._parse_feed_columnar(feed),
+                lambda: gtfs_handler.vehicle_dicts(table, np.flatnonzero(table["route_id"] == route_id)),
+                lambda: gtfs_handler.vehicle_dicts(table),
+            ),
+        }
+        for mode, (parse, one_route, everything) in modes.items():
+            parse_ms, _ = best_of(args.repeat, parse)
+            route_ms, _ = best_of(args.repeat, one_route)
+            all_ms, _ = best_of(args.repeat, everything)
+            print(f"{entities:>8} {mode:<9} {decode_ms:>10.1f} {parse_ms:>9.1f} {route_ms:>9.2f} "
+                  f"{all_ms:>8.1f} {retained_kib(parse):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Live Stream Benchmark
+=====================
+Opens thousands of /api/tracking/stream subscribers against one server
+process and checks that every tick's delta reaches all of them.
+
+The server is started by the script, either under gunicorn with gevent
+(backend/gunicorn.conf.py, one greenlet per subscriber) or under the
+threaded Flask development server (one OS thread per subscriber). The
+clients are gevent greenlets in this process, so gevent is required.
+
+Reported: subscribers connected, deltas delivered per tick, the fan-out
+time from the first to the last subscriber receiving a tick, and the
+server's resident memory and thread count.
+
+Usage:
+    python backend/scripts/bench_live_stream.py --clients 10000
+    python backend/scripts/bench_live_stream.py --clients 3000 --server threads
+    python backend/scripts/bench_live_stream.py --query "route=<route_id>" --ticks 10
+"""
+
+try:
+    from gevent import monkey
+    monkey.patch_all()
+    import gevent
+except ImportError:
+    raise SystemExit("gevent is required: pip install gevent gunicorn")
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+THREADED_SERVER = (
+    "import sys; from werkzeug.serving import run_simple; from main import app; "
+    "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, tick):
+    env = {**os.environ, "SIM_TICK_SECONDS": str(tick), "MOCK_DATA_SEED": os.environ.get("MOCK_DATA_SEED", "1")}
+    if kind == "gevent":
+        command = [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{port}", "main:app"]
+    else:
+        command = [sys.executable, "-c", THREADED_SERVER, str(port)]
+    return subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(port, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=2) as response:
+                if json.load(response)["data_ready"]:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit("Server did not become ready")
+
+
+def process_usage(pid):
+    """(resident MB, threads) of a process and its children (gunicorn's workers)"""
+    pids = [pid] + [int(child) for child in os.listdir("/proc") if child.isdigit() and _parent(child) == pid]
+    rss = threads = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Threads:"):
+                        threads += int(line.split()[1])
+        except OSError:
+            pass
+    return rss / 1024, threads
+
+
+def _parent(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return int(f.read().rsplit(")", 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Subscribers:
+    """Greenlet clients reading SSE frames and recording when each version arrives"""
+
+    def __init__(self, port, query):
+        self.request = (f"GET /api/tracking/stream?{query} HTTP/1.0\r\n"
+                        f"Host: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n").encode()
+        self.port = port
+        self.connected = 0
+        self.failed = 0
+        self.arrivals = defaultdict(list)
+
+    def subscribe(self):
+        try:
+            sock = socket.create_connection(("127.0.0.1", self.port), timeout=60)
+            sock.settimeout(None)
+            sock.sendall(self.request)
+            stream = sock.makefile("rb")
+            if b" 200 " not in stream.readline():
+                raise OSError("not 200")
+            while stream.readline().strip():
+                pass
+        except OSError:
+            self.failed += 1
+            return
+        self.connected += 1
+        for line in stream:
+            if line.startswith(b"id: "):
+                self.arrivals[int(line[4:])].append(time.monotonic())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--server", choices=("gevent", "threads"), default="gevent")
+    parser.add_argument("--query", default="bbox=28.60,77.20,28.62,77.22", help="subscription query string")
+    parser.add_argument("--tick", type=float, default=2.0, help="SIM_TICK_SECONDS for the server")
+    parser.add_argument("--ticks", type=int, default=5, help="ticks to measure once everyone is connected")
+    parser.add_argument("--ramp", type=int, default=2000, help="new connections per second")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(args.server, port, args.tick)
+    try:
+        wait_ready(port)
+        idle_rss, idle_threads = process_usage(server.pid)
+        subscribers = Subscribers(port, args.query)
+
+        start = time.perf_counter()
+        greenlets = []
+        for _ in range(args.clients):
+            greenlets.append(gevent.spawn(subscribers.subscribe))
+            gevent.sleep(1 / args.ramp)
+        while subscribers.connected + subscribers.failed < args.clients and time.perf_counter() - start < 120:
+            gevent.sleep(0.1)
+        ramp = time.perf_counter() - start
+
+        # Measure whole ticks only: from the first version published after everyone connected
+        first = max(subscribers.arrivals, default=0) + 1
+        gevent.sleep(args.tick * (args.ticks + 1.5))
+        rss, threads = process_usage(server.pid)
+        versions = [v for v in sorted(subscribers.arrivals) if first <= v < first + args.ticks]
+        gevent.killall(greenlets)
+
+        print(f"{args.server} server, {args.clients} subscribers ({args.query})")
+        print(f"  connected {subscribers.connected}, failed {subscribers.failed}, in {ramp:.1f}s")
+        print(f"  server: {idle_rss:.0f} MB / {idle_threads} threads idle, "
+              f"{rss:.0f} MB / {threads} threads with subscribers "
+              f"({(rss - idle_rss) * 1024 / max(subscribers.connected, 1):.0f} KB each)")
+        spreads = []
+        for version in versions:
+            times = subscribers.arrivals[version]
+            spreads.append((max(times) - min(times)) * 1000)
+            print(f"  version {version}: delivered to {len(times)}/{subscribers.connected}, "
+                  f"fan-out {spreads[-1]:.0f} ms")
+        if spreads:
+            print(f"  fan-out median {statistics.median(spreads):.0f} ms, max {max(spreads):.0f} ms")
+        complete = versions and all(len(subscribers.arrivals[v]) == subscribers.connected for v in versions)
+        if subscribers.failed or not complete:
+            sys.exit("FAIL: not every subscriber connected or received every tick")
+        print("OK")
+    finally:
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
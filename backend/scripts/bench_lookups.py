@@ -0,0 +1,79 @@
+"""
+Route/Vehicle Lookup Benchmark
+==============================
+Measures per-request latency of the lookup-heavy tracking and route endpoints
+while the route catalog grows from a few hundred routes to 100k.
+
+With the dict-backed indexes in MockDataGenerator the numbers should stay flat
+as the network grows.
+
+Usage:
+    python backend/scripts/bench_lookups.py
+    python backend/scripts/bench_lookups.py --sizes 500 5000 100000 --requests 300
+"""
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.mock_data_generator import mock_data
+from main import app
+
+
+def grow_network(num_routes):
+    """Clone the generated routes until the catalog holds num_routes routes"""
+    base_routes = mock_data.routes[:]
+    routes = []
+    for i in range(num_routes):
+        route = copy.copy(base_routes[i % len(base_routes)])
+        route.id = f"route_{i + 1}"
+        routes.append(route)
+
+    mock_data.reload_routes(routes)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench(client, num_requests):
+    """Time the lookup endpoints against random route ids"""
+    route_ids = [r.id for r in mock_data.routes]
+    paths = ["/api/tracking/{}", "/api/routes/{}"]
+    results = {}
+    for path in paths:
+        samples = []
+        for _ in range(num_requests):
+            url = path.format(random.choice(route_ids))
+            start = time.perf_counter()
+            response = client.get(url)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, url
+        results[path] = samples
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 20000, 100000])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    print(f"{'routes':>8} {'vehicles':>9}  {'endpoint':<28} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in args.sizes:
+        grow_network(size)
+        for path, samples in bench(client, args.requests).items():
+            print(f"{size:>8} {len(mock_data.fleet):>9}  {path:<28} "
+                  f"{percentile(samples, 50):>8.3f} {percentile(samples, 99):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Route Catalog Memory Benchmark
+==============================
+Generates a nationwide network by scaling every city's route count, then
+measures the memory held by the compact Route records against the same
+catalog as nested route/stop dicts (the API shape, as the catalog was stored
+before).
+
+Memory is measured with tracemalloc as the bytes still allocated after
+building each representation.
+
+Usage:
+    python backend/scripts/bench_route_memory.py
+    python backend/scripts/bench_route_memory.py --routes 10000 100000 500000
+"""
+
+import argparse
+import copy
+import gc
+import math
+import os
+import random
+import sys
+import tracemalloc
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.mock_data_generator import MockDataGenerator, mock_data
+
+
+def nationwide_routes(num_routes, seed=0):
+    """About num_routes Route records over the generator's cities, scaled up evenly"""
+    base = sum(city["routes"] for countries in mock_data.regions.values()
+               for country in countries.values() for city in country["cities"])
+    scale = max(1, math.ceil(num_routes / base))
+
+    generator = MockDataGenerator.__new__(MockDataGenerator)
+    generator.rng = random.Random(seed)
+    generator.regions = copy.deepcopy(mock_data.regions)
+    for countries in generator.regions.values():
+        for country in countries.values():
+            for city in country["cities"]:
+                city["routes"] *= scale
+    return generator._generate_routes()
+
+
+def traced(build):
+    """(result, bytes still allocated after build())"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'routes':>8} {'stops':>9} {'records MB':>11} {'dicts MB':>9} {'B/route':>8} {'dict B/route':>13} {'ratio':>6}")
+    for num_routes in args.routes:
+        routes, compact = traced(lambda: nationwide_routes(num_routes))
+        # The same catalog again, converted route by route; only the dicts stay alive
+        dicts, nested = traced(lambda: [route.to_dict() for route in nationwide_routes(num_routes)])
+        stops = sum(route.stop_count for route in routes)
+
+        assert [route.to_dict() for route in routes[:100]] == dicts[:100]
+        print(f"{len(routes):>8} {stops:>9} {compact / 2**20:>11.1f} {nested / 2**20:>9.1f} "
+              f"{compact / len(routes):>8.0f} {nested / len(routes):>13.0f} {nested / compact:>5.1f}x")
+        del routes, dicts
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Route Search Benchmark
+======================
+Builds the route search index over a synthetic network and measures query
+latency for exact, prefix-as-you-type, typo, multi-term and filtered queries,
+including follow-up pages through the cursor.
+
+Route numbers are drawn from a wide range so the vocabulary grows with the
+network, as it would for a real nationwide catalog.
+
+Usage:
+    python backend/scripts/bench_route_search.py
+    python backend/scripts/bench_route_search.py --sizes 100000 1000000 --queries 2000
+"""
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.mock_data_generator import mock_data
+from features.route_search import RouteSearchIndex
+
+
+def synthetic_routes(count, seed=0):
+    """count routes in the shape MockDataGenerator produces, with varied route numbers"""
+    rng = random.Random(seed)
+    base = mock_data.routes
+    routes = []
+    for i in range(count):
+        template = base[i % len(base)]
+        number = str(rng.randint(1, 99999))
+        route = copy.copy(template)
+        route.id = f"route_{i + 1}"
+        route.route_number = number
+        route.name = f"{template.city} {template.type} {number}"
+        routes.append(route)
+    return routes
+
+
+def typo(word, rng):
+    """word with one adjacent transposition"""
+    if len(word) < 4:
+        return word
+    i = rng.randint(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def query_mix(routes, count, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        route = rng.choice(routes)
+        kind = rng.randrange(6)
+        if kind == 0:
+            queries.append(("exact", route.route_number, None))
+        elif kind == 1:
+            queries.append(("prefix", route.city[:rng.randint(1, 4)], None))
+        elif kind == 2:
+            queries.append(("typo", typo(route.city.split()[0], rng), None))
+        elif kind == 3:
+            queries.append(("multi", f"{route.city} {route.type} {route.route_number[:2]}", None))
+        elif kind == 4:
+            queries.append(("country", route.city[:3], route.country_code))
+        else:
+            queries.append(("multi", f"{route.name.split()[0]} {route.route_number[:3]}", None))
+    return queries
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=3, help="pages fetched per query through the cursor")
+    args = parser.parse_args()
+
+    print(f"{'routes':>8} {'tokens':>7} {'build s':>8}  {'kind':<8} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    for size in args.sizes:
+        routes = synthetic_routes(size)
+        start = time.perf_counter()
+        index = RouteSearchIndex(routes)
+        build = time.perf_counter() - start
+
+        samples = {}
+        for kind, query, country in query_mix(routes, args.queries):
+            cursor = None
+            for page in range(args.pages):
+                start = time.perf_counter()
+                result = index.search(query, country, cursor=cursor)
+                elapsed = (time.perf_counter() - start) * 1000
+                samples.setdefault(kind if page == 0 else "next", []).append(elapsed)
+                samples.setdefault("all", []).append(elapsed)
+                cursor = result["next_cursor"]
+                if not cursor:
+                    break
+
+        for kind, values in samples.items():
+            print(f"{size:>8} {len(index.vocabulary):>7} {build:>8.2f}  {kind:<8} "
+                  f"{percentile(values, 50):>7.3f} {percentile(values, 99):>7.3f} {max(values):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
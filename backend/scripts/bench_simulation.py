@@ -0,0 +1,59 @@
+"""
+Fleet Simulation Benchmark
+==========================
+Times one vectorized FleetSimulation tick for fleets of increasing size, up
+to 1M vehicles, plus the cost of building API dicts for a single route from a snapshot.
+
+Usage:
+    python backend/scripts/bench_simulation.py
+    python backend/scripts/bench_simulation.py --sizes 10000 1000000 --ticks 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.fleet_simulation import FleetSimulation
+from features.mock_data_generator import mock_data
+
+
+def build_fleet(num_vehicles):
+    """Spread num_vehicles evenly over the generated routes"""
+    per_route = max(1, num_vehicles // len(mock_data.routes))
+    fleet = FleetSimulation(mock_data.routes, seed=42)
+    fleet.spawn(per_route, per_route)
+    return fleet
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--ticks", type=int, default=10)
+    args = parser.parse_args()
+
+    route_id = mock_data.routes[0].id
+    print(f"{'vehicles':>9} {'tick avg ms':>12} {'tick max ms':>12} {'route dicts ms':>15}")
+    for size in args.sizes:
+        fleet = build_fleet(size)
+        fleet.step()  # warm up
+
+        samples = []
+        for _ in range(args.ticks):
+            start = time.perf_counter()
+            fleet.step()
+            samples.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        snapshot = fleet.snapshot()
+        snapshot.vehicle_dicts(snapshot.rows_for_route(route_id))
+        view_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{len(fleet):>9} {sum(samples) / len(samples):>12.2f} {max(samples):>12.2f} {view_ms:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
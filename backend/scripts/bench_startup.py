@@ -0,0 +1,126 @@
+"""
+Startup Benchmark
+=================
+Cold-starts the backend in fresh interpreters and breaks down where the time
+goes, up to the first healthy /api/health and then until the mock data is
+ready (generated, loaded from a scenario, or loaded from a warm snapshot).
+
+Each run is a new process, so every import is cold except for the OS file
+cache. Medians over --runs are reported.
+
+Usage:
+    python backend/scripts/bench_startup.py
+    python backend/scripts/bench_startup.py --runs 10 --snapshot /tmp/warm
+    python backend/scripts/bench_startup.py --scenario /tmp/scenario --snapshot /tmp/warm
+"""
+
+import argparse
+import importlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+START = time.perf_counter()
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported one after another in the child, so each line only counts what the previous ones didn't load
+PHASES = [
+    ("flask", "flask"),
+    ("numpy", "numpy"),
+    ("flask_sock", "flask_sock"),
+    ("mock data module", "features.mock_data_generator"),
+    ("tracking", "features.tracking"),
+    ("routes + gtfs", "features.routes"),
+    ("reporting", "features.reporting"),
+    ("zones", "features.zones"),
+]
+
+
+def child():
+    """Runs inside the cold interpreter; prints one JSON line of phase timings in ms"""
+    sys.path.append(BACKEND)
+    timings = {}
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[name] = (time.perf_counter() - start) * 1000
+        return result
+
+    for name, module in PHASES:
+        try:
+            timed(name, lambda: importlib.import_module(module))
+        except ImportError:
+            timings[name] = 0.0
+    main = timed("main + create_app", lambda: importlib.import_module("main"))
+    client = main.app.test_client()
+    response = timed("first /api/health", lambda: client.get("/api/health"))
+    assert response.status_code == 200
+    timings["healthy at"] = (time.perf_counter() - START) * 1000
+    sys.stdout.write(f"HEALTHY {time.time()}\n")
+    sys.stdout.flush()
+
+    timed("mock data ready", main.mock_data.resolve)
+    timed("first vehicles page", lambda: client.get("/api/tracking/all?limit=100"))
+    timed("firebase connect", lambda: importlib.import_module("services.firebase_service").firebase.db)
+    print(json.dumps(timings))
+
+
+def run_once(env):
+    """(wall ms until the child reported healthy, phase timings)"""
+    start = time.time()
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                             capture_output=True, text=True, env=env, cwd=BACKEND)
+    if process.returncode:
+        raise RuntimeError(process.stderr)
+    lines = process.stdout.splitlines()
+    healthy_at = next(float(line.split()[1]) for line in lines if line.startswith("HEALTHY "))
+    return (healthy_at - start) * 1000, json.loads(lines[-1])
+
+
+def report(label, env, runs):
+    results = [run_once(env) for _ in range(runs)]
+    walls = [wall for wall, _ in results]
+    print(f"\n{label}: process start -> healthy /api/health  median {statistics.median(walls):.0f} ms "
+          f"(min {min(walls):.0f}, max {max(walls):.0f})")
+    for name in results[0][1]:
+        values = [timings[name] for _, timings in results]
+        print(f"  {name:<32} {statistics.median(values):>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scenario", help="SCENARIO_PATH to load instead of generating mock data")
+    parser.add_argument("--snapshot", help="WARM_SNAPSHOT_PATH to compare against (rebuilt by this script)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    # The data is built explicitly in the child, after health, to time it on its own
+    env = {**os.environ, "WARM_ON_START": "0", "MOCK_DATA_SEED": os.environ.get("MOCK_DATA_SEED", "1")}
+    env.pop("WARM_SNAPSHOT_PATH", None)
+    if args.scenario:
+        env["SCENARIO_PATH"] = os.path.abspath(args.scenario)
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    print(f"Bare interpreter start: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    report("Without warm snapshot", env, args.runs)
+    if args.snapshot:
+        shutil.rmtree(args.snapshot, ignore_errors=True)
+        env["WARM_SNAPSHOT_PATH"] = os.path.abspath(args.snapshot)
+        run_once(env)  # writes the snapshot
+        report("From warm snapshot", env, args.runs)
+
+
+if __name__ == "__main__":
+    main()
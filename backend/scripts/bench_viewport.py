@@ -0,0 +1,79 @@
+"""
+Viewport Query Benchmark
+========================
+Measures the spatial vehicle grid behind /api/tracking/viewport: the cost of
+keeping it current on every tick (incremental vs full rebuild) and viewport
+query latency against a full scan of the position columns.
+
+Usage:
+    python backend/scripts/bench_viewport.py
+    python backend/scripts/bench_viewport.py --sizes 100000 1000000 --queries 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.fleet_simulation import FleetSimulation
+from features.mock_data_generator import mock_data
+from features.vehicle_grid import VehicleGrid
+
+
+def percentile(samples, pct):
+    return float(np.percentile(samples, pct)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'vehicles':>9} {'grid/tick ms':>13} {'rebuild ms':>11} {'query p50':>10} {'query p99':>10} {'scan p50':>9}")
+    for size in args.sizes:
+        per_route = max(1, size // len(mock_data.routes))
+        fleet = FleetSimulation(mock_data.routes, seed=42)
+        fleet.spawn(per_route, per_route)
+
+        incremental, rebuild = [], []
+        for _ in range(args.ticks):
+            fleet._step(None)
+            lat, lng = fleet.columns["lat"], fleet.columns["lng"]
+            start = time.perf_counter()
+            VehicleGrid.build(lat, lng)
+            rebuild.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            fleet._update_grid()
+            incremental.append(time.perf_counter() - start)
+        fleet._publish()
+        snapshot = fleet.snapshot()
+        lat, lng = snapshot.columns["lat"], snapshot.columns["lng"]
+
+        # Street-level to city-level viewports centred on random vehicles
+        queries, scans = [], []
+        for _ in range(args.queries):
+            centre = rng.integers(snapshot.size)
+            half = rng.uniform(0.002, 0.05)
+            bbox = (lat[centre] - half, lng[centre] - half, lat[centre] + half, lng[centre] + half)
+            start = time.perf_counter()
+            rows = snapshot.rows_in_bbox(bbox)
+            queries.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            scanned = np.flatnonzero((lat >= bbox[0]) & (lat <= bbox[2]) & (lng >= bbox[1]) & (lng <= bbox[3]))
+            scans.append(time.perf_counter() - start)
+            assert np.array_equal(rows, scanned)
+
+        print(f"{snapshot.size:>9} {np.mean(incremental) * 1000:>13.2f} {np.mean(rebuild) * 1000:>11.2f} "
+              f"{percentile(queries, 50):>10.3f} {percentile(queries, 99):>10.3f} {percentile(scans, 50):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Zone Import Benchmark
+=====================
+Writes a generated grid of zones to the Firestore emulator one document at a
+time (the old seed_zones.py way, on a sample) and with import_zones() at a
+few worker counts, and reports zones per second.
+
+    firebase emulators:start --only firestore
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python backend/scripts/bench_zone_import.py
+
+Usage:
+    python backend/scripts/bench_zone_import.py --zones 100000 --workers 1,4,16
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import firebase
+from features.zone_import import grid_zones, import_zones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", type=int, default=50000)
+    parser.add_argument("--workers", default="1,4,8,16", help="comma separated worker counts")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sequential-sample", type=int, default=1000,
+                        help="zones written one by one for the baseline")
+    args = parser.parse_args()
+
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("Set FIRESTORE_EMULATOR_HOST: this benchmark writes many documents")
+    if not firebase.db:
+        sys.exit("Firestore emulator not reachable")
+
+    side = int(args.zones ** 0.5) + 1
+    zones = grid_zones(28.40, 76.84, 28.40 + side * 0.0025, 76.84 + side * 0.0025, 0.0025, "bench")[:args.zones]
+    print(f"{len(zones)} zones")
+
+    sample = zones[:args.sequential_sample]
+    start = time.perf_counter()
+    for zone in sample:
+        firebase.create_document("zones", {k: v for k, v in zone.items() if k != "id"}, doc_id=zone["id"])
+    rate = len(sample) / (time.perf_counter() - start)
+    print(f"  one document per call:        {rate:>8.0f} zones/s "
+          f"(all {len(zones)} would take {len(zones) / rate:.0f}s)")
+
+    for workers in (int(w) for w in args.workers.split(",")):
+        result = import_zones(zones, workers=workers, batch_size=args.batch_size)
+        print(f"  batches of {args.batch_size}, {workers:>2} workers: {result.zones_per_second:>8.0f} zones/s "
+              f"({result.seconds:.1f}s, {result.retries} retries, {len(result.failed)} failed)")
+
+
+if __name__ == "__main__":
+    main()
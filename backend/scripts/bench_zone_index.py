@@ -0,0 +1,121 @@
+"""
+Zone Spatial Index Benchmark
+============================
+Builds a ZoneIndex over up to 1M synthetic, partly overlapping zones spread
+across India and times point, bounding-box and k-nearest lookups.
+
+Before timing, lookups at zone corners (where a point sits exactly on a
+zone edge, and often on a grid cell edge) are checked against a brute-force
+scan of every zone.
+
+Usage:
+    python backend/scripts/bench_zone_index.py
+    python backend/scripts/bench_zone_index.py --zones 1000000 --queries 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.zone_index import ZoneIndex
+
+# Rough bounding box of India
+LAT_RANGE = (8.0, 35.0)
+LNG_RANGE = (68.0, 97.0)
+
+
+def synthetic_zones(count, seed=7):
+    """Zones of 0.005-0.02 degrees (~0.5-2 km) at random positions"""
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(*LAT_RANGE, count)
+    lng = rng.uniform(*LNG_RANGE, count)
+    size = rng.uniform(0.005, 0.02, count)
+    return [
+        {"id": f"zone_{i}", "lat_min": la, "lat_max": la + s, "lng_min": ln, "lng_max": ln + s, "score": 0}
+        for i, (la, ln, s) in enumerate(zip(lat.tolist(), lng.tolist(), size.tolist()))
+    ]
+
+
+# Two identical zones and one whose corner (1.0, 1.0) falls exactly on a grid cell edge
+EDGE_CASE_ZONES = [
+    {"id": "a", "lat_min": 0.0, "lat_max": 0.1, "lng_min": 0.0, "lng_max": 0.1},
+    {"id": "b", "lat_min": 0.0, "lat_max": 0.1, "lng_min": 0.0, "lng_max": 0.1},
+    {"id": "c", "lat_min": 1.0, "lat_max": 1.1, "lng_min": 1.0, "lng_max": 1.1},
+]
+
+
+def check_corners(zones, samples, seed=3):
+    """
+    query_point, first_at, classify and nearest at the corners of (up to
+    samples) zones must agree with a scan of every zone. Returns the
+    number of points checked; exits on the first mismatch.
+    """
+    index = ZoneIndex(zones)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(zones), min(samples, len(zones)), replace=False)
+    points = [(zones[i][lat], zones[i][lng]) for i in picks.tolist()
+              for lat in ("lat_min", "lat_max") for lng in ("lng_min", "lng_max")]
+    lats, lngs = (np.array(column) for column in zip(*points))
+    classified = index.classify(lats, lngs).tolist()
+    for (lat, lng), first in zip(points, classified):
+        expected = np.flatnonzero((index.lat_min <= lat) & (lat <= index.lat_max) &
+                                  (index.lng_min <= lng) & (lng <= index.lng_max)).tolist()
+        found = index.first_at(lat, lng)
+        nearest = index.nearest(lat, lng)
+        if (index.query_point(lat, lng) != expected
+                or (found["id"] if found else None) != (zones[expected[0]]["id"] if expected else None)
+                or first != (expected[0] if expected else -1)
+                or (expected and nearest[0][1] != 0)):
+            sys.exit(f"FAIL: lookups at ({lat}, {lng}) disagree with a scan of all zones (expected {expected})")
+    return len(points)
+
+
+def time_per_call(fn, points):
+    start = time.perf_counter()
+    for lat, lng in points:
+        fn(lat, lng)
+    return (time.perf_counter() - start) / len(points) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--check", type=int, default=2000, help="zones whose corners are checked against a full scan")
+    args = parser.parse_args()
+
+    checked = check_corners(EDGE_CASE_ZONES, len(EDGE_CASE_ZONES))
+    checked += check_corners(synthetic_zones(min(args.zones)), args.check)
+    print(f"Corner lookups agree with a full scan at {checked} points")
+
+    rng = np.random.default_rng(1)
+    print(f"{'zones':>9} {'build s':>8} {'point us':>9} {'bbox us':>8} {'knn(5) us':>10} {'hit rate':>9}")
+    for count in args.zones:
+        zones = synthetic_zones(count)
+        start = time.perf_counter()
+        index = ZoneIndex(zones)
+        build = time.perf_counter() - start
+
+        # Half of the queries land inside a zone, half at random positions
+        picks = rng.integers(0, count, args.queries // 2)
+        inside = [(zones[i]["lat_min"] + 0.001, zones[i]["lng_min"] + 0.001) for i in picks.tolist()]
+        random_points = list(zip(rng.uniform(*LAT_RANGE, args.queries // 2).tolist(),
+                                 rng.uniform(*LNG_RANGE, args.queries // 2).tolist()))
+        points = inside + random_points
+
+        point_us = time_per_call(index.first_at, points)
+        bbox_us = time_per_call(lambda lat, lng: index.query_bbox(lat, lng, lat + 0.05, lng + 0.05), points[:2000])
+        knn_us = time_per_call(lambda lat, lng: index.nearest(lat, lng, 5), points[:2000])
+        hits = sum(1 for lat, lng in points if index.first_at(lat, lng)) / len(points)
+
+        print(f"{count:>9} {build:>8.2f} {point_us:>9.2f} {bbox_us:>8.1f} {knn_us:>10.1f} {hits:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
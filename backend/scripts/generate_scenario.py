@@ -0,0 +1,70 @@
+"""
+Scenario Generator
+==================
+Writes a seeded synthetic network (cities, routes, stops and a vehicle
+fleet) to a directory the backend can load at startup:
+
+    SCENARIO_PATH=/tmp/scenario python backend/main.py
+
+The built-in region table supplies the first cities; the rest are synthetic
+towns around them. Reports generation and load times.
+
+Usage:
+    python backend/scripts/generate_scenario.py /tmp/scenario
+    python backend/scripts/generate_scenario.py /tmp/scenario --seed 7 --cities 500 --routes 100000 --vehicles 5000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.mock_data_generator import MockDataGenerator
+from features.scenario_generator import ScenarioConfig, generate_scenario, load_scenario
+
+
+def directory_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def main():
+    defaults = ScenarioConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="output directory")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--cities", type=int, default=defaults.cities)
+    parser.add_argument("--routes", type=int, default=defaults.routes)
+    parser.add_argument("--vehicles", type=int, default=defaults.vehicles)
+    parser.add_argument("--stops-mean", type=float, default=defaults.stops_mean)
+    parser.add_argument("--stops-min", type=int, default=defaults.stops_min)
+    parser.add_argument("--stops-max", type=int, default=defaults.stops_max)
+    parser.add_argument("--stop-pool", type=int, default=defaults.stop_pool)
+    parser.add_argument("--chunk-size", type=int, default=defaults.chunk_size)
+    parser.add_argument("--no-load", action="store_true", help="skip timing the load back")
+    args = parser.parse_args()
+
+    config = ScenarioConfig(
+        seed=args.seed, cities=args.cities, routes=args.routes, vehicles=args.vehicles,
+        stops_mean=args.stops_mean, stops_min=args.stops_min, stops_max=args.stops_max,
+        stop_pool=args.stop_pool, chunk_size=args.chunk_size,
+    )
+
+    start = time.perf_counter()
+    manifest = generate_scenario(args.path, config, MockDataGenerator._generate_regions())
+    elapsed = time.perf_counter() - start
+    counts = manifest["counts"]
+    print(f"Generated {counts['cities']} cities, {counts['routes']} routes, {counts['stops']} stops, "
+          f"{counts['vehicles']} vehicles in {elapsed:.2f}s "
+          f"({counts['vehicles'] / elapsed / 1e6:.2f}M vehicles/s), {directory_size(args.path) / 2**20:.1f} MiB")
+
+    if not args.no_load:
+        start = time.perf_counter()
+        scenario = load_scenario(args.path)
+        print(f"Loaded {len(scenario.routes)} routes and {len(scenario.ids)} vehicles in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
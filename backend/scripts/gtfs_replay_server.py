@@ -0,0 +1,186 @@
+"""
+GTFS-Realtime Replay Server
+===========================
+Local HTTP server that replays recorded VehiclePositions `.pb` files, so the
+GTFS ingestion pipeline can be exercised without a real feed or API key.
+
+The files in --dir are served in name order, advancing to the next one every
+--interval seconds (and looping). Responses carry ETag and Last-Modified and
+honour If-None-Match / If-Modified-Since with 304, like a real feed behind a CDN.
+
+Without --dir, synthetic feeds of --vehicles entities are generated instead.
+--record saves snapshots of a real feed into --dir for later replay.
+
+Usage:
+    python backend/scripts/gtfs_replay_server.py --dir recordings/delhi --port 8765
+    python backend/scripts/gtfs_replay_server.py --vehicles 50000 --frames 10
+    python backend/scripts/gtfs_replay_server.py --record "https://.../VehiclePositions.pb?key=..." --dir recordings/delhi --count 20
+
+    GTFS_ENDPOINTS="delhi=http://localhost:8765/delhi.pb" python backend/main.py
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import random
+import sys
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.transit import gtfs_realtime_pb2
+
+# Roughly Delhi, where the default feed lives
+CENTER_LAT, CENTER_LNG = 28.6139, 77.2090
+
+
+def synthetic_feed(num_vehicles, timestamp, seed=0):
+    """Serialized FeedMessage with num_vehicles VehiclePosition entities"""
+    rng = random.Random(seed)
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.incrementality = gtfs_realtime_pb2.FeedHeader.FULL_DATASET
+    feed.header.timestamp = int(timestamp)
+    for i in range(num_vehicles):
+        entity = feed.entity.add()
+        entity.id = str(i)
+        vehicle = entity.vehicle
+        vehicle.vehicle.id = f"DL1PC{i:05d}"
+        vehicle.trip.route_id = str(rng.randint(1, 800))
+        vehicle.position.latitude = CENTER_LAT + rng.uniform(-0.3, 0.3)
+        vehicle.position.longitude = CENTER_LNG + rng.uniform(-0.3, 0.3)
+        vehicle.position.speed = rng.uniform(0, 15)
+        vehicle.timestamp = int(timestamp) - rng.randint(0, 30)
+        vehicle.occupancy_status = rng.randint(0, 6)
+    return feed.SerializeToString()
+
+
+class Frame:
+    """One feed snapshot with its ETag"""
+
+    def __init__(self, content):
+        self.content = content
+        self.etag = '"' + hashlib.sha1(content).hexdigest()[:16] + '"'
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, frames, interval):
+        super().__init__(address, ReplayHandler)
+        self.frames = [Frame(content) for content in frames]
+        self.interval = interval
+        self.started_at = time.time()
+        self.requests = 0
+        self.not_modified = 0
+
+    def current_frame(self):
+        """(frame, modified_at); a frame counts as modified when it went live, not when it was recorded"""
+        position = int((time.time() - self.started_at) // self.interval) if self.interval > 0 else 0
+        return self.frames[position % len(self.frames)], int(self.started_at + position * self.interval)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        frame, modified_at = server.current_frame()
+
+        if self._not_modified(frame, modified_at):
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", frame.etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-protobuf")
+        self.send_header("Content-Length", str(len(frame.content)))
+        self.send_header("ETag", frame.etag)
+        self.send_header("Last-Modified", formatdate(modified_at, usegmt=True))
+        self.end_headers()
+        self.wfile.write(frame.content)
+
+    def _not_modified(self, frame, modified_at):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            return frame.etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return modified_at <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_frames(directory):
+    paths = sorted(glob.glob(os.path.join(directory, "*.pb")))
+    if not paths:
+        raise SystemExit(f"No .pb files in {directory}")
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            frames.append(f.read())
+    return frames
+
+
+def record(url, directory, count, interval):
+    """Save count snapshots of a live feed, interval seconds apart"""
+    import requests
+
+    os.makedirs(directory, exist_ok=True)
+    with requests.Session() as session:
+        for i in range(count):
+            response = session.get(url, timeout=30)
+            response.raise_for_status()
+            path = os.path.join(directory, f"{int(time.time())}_{i:04d}.pb")
+            with open(path, "wb") as f:
+                f.write(response.content)
+            print(f"Saved {path} ({len(response.content)} bytes)")
+            if i + 1 < count:
+                time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", help="directory of recorded .pb files")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds each frame is served")
+    parser.add_argument("--vehicles", type=int, default=1000, help="entities per synthetic frame")
+    parser.add_argument("--frames", type=int, default=5, help="number of synthetic frames")
+    parser.add_argument("--record", metavar="URL", help="record a live feed into --dir instead of serving")
+    parser.add_argument("--count", type=int, default=10, help="snapshots to record")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.dir:
+            parser.error("--record needs --dir")
+        record(args.record, args.dir, args.count, args.interval)
+        return
+
+    if args.dir:
+        frames = load_frames(args.dir)
+    else:
+        now = time.time()
+        frames = [synthetic_feed(args.vehicles, now + i * args.interval, seed=i) for i in range(args.frames)]
+
+    server = ReplayServer(("0.0.0.0", args.port), frames, args.interval)
+    print(f"Replaying {len(frames)} frames on http://localhost:{args.port}/ (every {args.interval}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Served {server.requests} requests, {server.not_modified} not modified")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Import Zones to Firestore
+=========================
+Bulk-loads zones from a CSV or GeoJSON file, or generates a grid of square
+cells, validates them and writes them in parallel batched commits.
+
+An interrupted import resumes from its checkpoint file when run again with
+the same input (the checkpoint is removed once everything is written).
+
+Usage:
+    python backend/scripts/import_zones.py csv zones.csv
+    python backend/scripts/import_zones.py geojson zones.geojson --workers 16
+    python backend/scripts/import_zones.py grid --bbox 28.40,76.84,28.88,77.35 --cell-km 0.25 --prefix delhi
+    python backend/scripts/import_zones.py grid --bbox 28.40,76.84,28.88,77.35 --cell-km 0.25 --dry-run
+"""
+
+import argparse
+import os
+import sys
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import firebase, MAX_BATCH_WRITES
+from features.zone_import import (
+    grid_zones, import_zones, km_to_degrees, read_csv, read_geojson, validate_zones,
+)
+
+
+def load(args):
+    if args.source == "csv":
+        return read_csv(args.path)
+    if args.source == "geojson":
+        return read_geojson(args.path)
+    lat_min, lng_min, lat_max, lng_max = (float(v) for v in args.bbox.split(","))
+    cell = args.cell_degrees if args.cell_degrees else km_to_degrees(args.cell_km)
+    return grid_zones(lat_min, lng_min, lat_max, lng_max, cell, args.prefix)
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--workers", type=int, default=8)
+    common.add_argument("--batch-size", type=int, default=MAX_BATCH_WRITES)
+    common.add_argument("--retries", type=int, default=5)
+    common.add_argument("--checkpoint", help="progress file (default: zone_import.checkpoint.json)",
+                        default="zone_import.checkpoint.json")
+    common.add_argument("--skip-invalid", action="store_true", help="drop invalid zones instead of aborting")
+    common.add_argument("--dry-run", action="store_true", help="read and validate only")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sources = parser.add_subparsers(dest="source", required=True)
+    for name in ("csv", "geojson"):
+        sources.add_parser(name, parents=[common]).add_argument("path")
+    grid = sources.add_parser("grid", parents=[common])
+    grid.add_argument("--bbox", required=True, help="lat_min,lng_min,lat_max,lng_max")
+    size = grid.add_mutually_exclusive_group(required=True)
+    size.add_argument("--cell-km", type=float)
+    size.add_argument("--cell-degrees", type=float)
+    grid.add_argument("--prefix", default="cell", help="zone id prefix")
+    args = parser.parse_args()
+
+    zones = load(args)
+    problems = validate_zones(zones)
+    if problems:
+        for _, problem in problems[:20]:
+            print(f"  {problem}")
+        if len(problems) > 20:
+            print(f"  ... and {len(problems) - 20} more")
+        if not args.skip_invalid:
+            sys.exit(f"{len(problems)} invalid zones of {len(zones)}; nothing written (--skip-invalid to drop them)")
+        invalid = {number for number, _ in problems}
+        zones = [zone for number, zone in enumerate(zones) if number not in invalid]
+    print(f"{len(zones)} valid zones")
+    if args.dry_run:
+        return
+
+    if not firebase.db:
+        sys.exit("Firebase not connected (service account key or FIRESTORE_EMULATOR_HOST needed)")
+
+    def progress(result):
+        done = result.written + result.resumed * args.batch_size
+        print(f"\r  {min(done, result.zones)}/{result.zones} zones, {result.zones_per_second:.0f}/s", end="", flush=True)
+
+    result = import_zones(zones, workers=args.workers, batch_size=args.batch_size,
+                          checkpoint_path=args.checkpoint, retries=args.retries, progress=progress)
+    print(f"\nWrote {result.written} zones in {result.batches - result.resumed} batches in {result.seconds:.1f}s "
+          f"({result.zones_per_second:.0f} zones/s), {result.retries} retries"
+          + (f", resumed past {result.resumed} batches" if result.resumed else ""))
+    if result.failed:
+        sys.exit(f"{len(result.failed)} batches failed; run again to resume from {args.checkpoint}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Roads API Stand-in
+==================
+Local HTTP server speaking the Roads API `nearestRoads` protocol, for running
+the road snapper without a Google key or quota.
+
+The "road network" is a square grid of streets every --grid degrees. Each
+point snaps to the closest street. Requests with more than 100 points are
+rejected with 400, like the real API. --latency adds a per-request delay.
+
+--selftest starts the stand-in in-process and checks RoadSnapper against it:
+batching, cache reuse, concurrency and the polyline fallback.
+
+Usage:
+    python backend/scripts/roads_standin_server.py --port 8766
+    ROADS_API_URL=http://localhost:8766/v1/nearestRoads ROADS_API_KEY=test GTFS_SNAP_TO_ROADS=1 python backend/main.py
+    python backend/scripts/roads_standin_server.py --selftest --points 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MAX_POINTS = 100
+
+
+def snap_to_grid(lat, lng, grid):
+    """Closest point on a grid of streets running along every multiple of grid"""
+    on_lat_street = (round(lat / grid) * grid, lng)
+    on_lng_street = (lat, round(lng / grid) * grid)
+    if abs(on_lat_street[0] - lat) <= abs(on_lng_street[1] - lng):
+        return on_lat_street
+    return on_lng_street
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, grid, latency):
+        super().__init__(address, StandinHandler)
+        self.grid = grid
+        self.latency = latency
+        self.requests = 0
+        self.max_batch = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        if not parsed.path.endswith("/nearestRoads"):
+            return self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+        query = parse_qs(parsed.query)
+        if not query.get("key"):
+            return self._send(403, {"error": {"code": 403, "message": "API key required", "status": "PERMISSION_DENIED"}})
+        raw = query.get("points", [""])[0]
+        points = [p for p in raw.split("|") if p]
+        if not points or len(points) > MAX_POINTS:
+            return self._send(400, {"error": {"code": 400, "message": "Invalid points", "status": "INVALID_ARGUMENT"}})
+
+        with server._lock:
+            server.requests += 1
+            server.max_batch = max(server.max_batch, len(points))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            snapped = []
+            for i, point in enumerate(points):
+                lat, lng = (float(x) for x in point.split(","))
+                s_lat, s_lng = snap_to_grid(lat, lng, server.grid)
+                snapped.append({
+                    "location": {"latitude": s_lat, "longitude": s_lng},
+                    "originalIndex": i,
+                    "placeId": f"standin_{round(s_lat / server.grid)}_{round(s_lng / server.grid)}",
+                })
+            self._send(200, {"snappedPoints": snapped})
+        finally:
+            with server._lock:
+                server.in_flight -= 1
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def selftest(num_points, grid, latency):
+    from features.road_snapper import BATCH_SIZE, RoadSnapper
+    from features.route_records import Route
+
+    server = StandinServer(("127.0.0.1", 0), grid, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/nearestRoads"
+
+    rng = random.Random(0)
+    lats = [round(28.6 + rng.uniform(-0.2, 0.2), 5) for _ in range(num_points)]
+    lngs = [round(77.2 + rng.uniform(-0.2, 0.2), 5) for _ in range(num_points)]
+
+    snapper = RoadSnapper(api_key="test", url=url)
+    start = time.perf_counter()
+    s_lats, s_lngs = snapper.snap_points(lats, lngs)
+    cold = time.perf_counter() - start
+    cold_requests = server.requests
+
+    for lat, lng, s_lat, s_lng in zip(lats, lngs, s_lats.tolist(), s_lngs.tolist()):
+        expected = snap_to_grid(lat, lng, grid)
+        assert abs(expected[0] - s_lat) < 1e-9 and abs(expected[1] - s_lng) < 1e-9, (lat, lng, s_lat, s_lng)
+    assert server.max_batch <= BATCH_SIZE, server.max_batch
+    assert cold_requests == -(-num_points // BATCH_SIZE), cold_requests
+
+    # Same positions again, and jitter below the quantization step: all from cache
+    start = time.perf_counter()
+    snapper.snap_points(lats, lngs)
+    snapper.snap_points([lat + 2e-6 for lat in lats], lngs)
+    warm = (time.perf_counter() - start) / 2
+    assert server.requests == cold_requests, server.requests
+
+    print(f"{num_points} points: {cold_requests} requests (max {server.max_batch} points, "
+          f"{server.max_in_flight} in flight), cold {cold * 1000:.1f} ms, warm {warm * 1000:.1f} ms")
+
+    # Fallback without a key: project onto the route polyline
+    route = Route.from_dict({
+        "id": "r", "route_number": "1", "name": "Test 1", "type": "Bus", "city": "Test", "country": "Test",
+        "country_code": "test", "continent": "test",
+        "path": [{"lat": 0.0, "lng": 0.0}, {"lat": 0.0, "lng": 1.0}, {"lat": 1.0, "lng": 1.0}],
+    })
+    fallback = RoadSnapper(api_key=None, route_lookup=lambda route_id: route if route_id == "r" else None)
+    p_lats, p_lngs = fallback.snap_points([0.1, 0.5, 0.2], [0.5, 1.3, 0.5], ["r", "r", "unknown"])
+    assert [round(x, 9) for x in p_lats.tolist()] == [0.0, 0.5, 0.2], p_lats
+    assert [round(x, 9) for x in p_lngs.tolist()] == [0.5, 1.0, 0.5], p_lngs
+    print("Polyline fallback: ok")
+
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--grid", type=float, default=0.002, help="street spacing in degrees")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--selftest", action="store_true", help="check RoadSnapper against an in-process stand-in")
+    parser.add_argument("--points", type=int, default=5000, help="points snapped by --selftest")
+    args = parser.parse_args()
+
+    if args.selftest:
+        selftest(args.points, args.grid, args.latency)
+        return
+
+    server = StandinServer(("0.0.0.0", args.port), args.grid, args.latency)
+    print(f"Roads API stand-in on http://localhost:{args.port}/v1/nearestRoads (grid {args.grid}°)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Served {server.requests} requests, largest batch {server.max_batch} points")
+
+
+if __name__ == "__main__":
+    main()
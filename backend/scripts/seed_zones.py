@@ -2,6 +2,7 @@
 Seed Zones to Firestore
 =======================
 Run this script ONCE to populate Firestore with Delhi zones.
+Larger zone sets (CSV, GeoJSON, generated grids) go through import_zones.py.
 
 Usage:
     python backend/scripts/seed_zones.py
@@ -15,6 +16,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from services.firebase_service import firebase
+from features.zone_import import import_zones, validate_zones
 
 # Delhi zones data
 DELHI_ZONES = [
@@ -100,19 +102,19 @@ def seed_zones():
         print("Make sure firebase/service_account.json exists")
         return False
     
-    print("Seeding Delhi zones to Firestore...\n")
+    problems = validate_zones(DELHI_ZONES)
+    if problems:
+        for _, problem in problems:
+            print(f"  {problem}")
+        return False
     
-    for zone in DELHI_ZONES:
-        zone_id = zone["id"]
-        print(f"  Creating: {zone['name']}...", end=" ")
-        
-        try:
-            firebase.create_document("zones", zone, doc_id=zone_id)
-            print("✓")
-        except Exception as e:
-            print(f"✗ Error: {e}")
+    print("Seeding Delhi zones to Firestore...\n")
+    result = import_zones(DELHI_ZONES)
+    if result.failed:
+        print(f"✗ {len(result.failed)} batches failed; run again to retry")
+        return False
     
-    print(f"\nDone! {len(DELHI_ZONES)} zones created.")
+    print(f"Done! {result.written} zones created in {result.seconds:.2f}s.")
     return True
 
 
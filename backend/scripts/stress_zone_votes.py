@@ -0,0 +1,160 @@
+"""
+Zone Vote Stress Test
+=====================
+Hundreds of voters hit one fresh zone at the same moment, some of them
+voting more than once, and the final score is checked to be exact: one
+stored vote per voter, and a score equal to the sum of the stored votes.
+
+With WRITE_BEHIND=1 the votes go through the write-behind queue, which is
+flushed before checking; a repeat that passes the stored-vote check while
+its first vote is being flushed is answered with success and dropped at the
+next flush.
+
+A second, sequential check votes +1 on another zone one voter at a time,
+with the zone in the spatial index: every new_score must be the running
+total, and the index must agree with Firestore at the end (queued votes
+counted once).
+
+Runs against the Firestore emulator only, since it writes a vote document
+per voter:
+
+    firebase emulators:start --only firestore
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python backend/scripts/stress_zone_votes.py
+
+Usage:
+    python backend/scripts/stress_zone_votes.py --voters 500 --workers 200
+    python backend/scripts/stress_zone_votes.py --voters 1000 --repeat 0.3 --shards 1
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add paths for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import firebase
+from services.write_behind import write_behind, WRITE_BEHIND_ENABLED
+from features.zones import ZoneManager, ZONE_SCORE_SHARDS
+
+
+def check_sequential(voters):
+    """One +1 vote after another on an indexed zone; returns failure messages"""
+    zone_id = f"stress_seq_{int(time.time() * 1000)}"
+    firebase.create_document(ZoneManager.COLLECTION, {
+        "name": f"Sequential test {zone_id}",
+        "lat_min": 0.02, "lat_max": 0.03, "lng_min": 0.02, "lng_max": 0.03,
+        "score": 0,
+    }, doc_id=zone_id)
+    ZoneManager.zone_index()
+
+    failures = []
+    for i in range(voters):
+        result = ZoneManager.submit_vote(zone_id, f"seq_{i}", 1)
+        if not result["success"] or result["new_score"] != i + 1:
+            failures.append(f"vote {i + 1} returned {result}")
+    index = ZoneManager.zone_index()
+    indexed = index.zones[index.position_of(zone_id)]["score"]
+    write_behind.flush()
+
+    firebase.cache.clear()
+    final = ZoneManager.get_zone(zone_id)["zone"]["score"]
+    print(f"{voters} sequential votes: new_score {'OK' if not failures else 'WRONG'}, "
+          f"index {indexed}, final score {final}")
+    if indexed != voters or final != voters:
+        failures.append(f"index {indexed} and final score {final}, expected {voters}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voters", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=200, help="parallel voting threads")
+    parser.add_argument("--repeat", type=float, default=0.2, help="share of voters who also vote a second time")
+    parser.add_argument("--shards", type=int, default=ZONE_SCORE_SHARDS, help="score shards for the test zone")
+    parser.add_argument("--sequential", type=int, default=20, help="one-at-a-time voters for the index check")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("Set FIRESTORE_EMULATOR_HOST: this test writes one document per voter")
+    if not firebase.db:
+        sys.exit("Firestore emulator not reachable")
+
+    rng = random.Random(args.seed)
+    zone_id = f"stress_{int(time.time() * 1000)}"
+    firebase.create_document(ZoneManager.COLLECTION, {
+        "name": f"Stress test {zone_id}",
+        "lat_min": 0.0, "lat_max": 0.01, "lng_min": 0.0, "lng_max": 0.01,
+        "score": 0,
+        "score_shards": args.shards,
+    }, doc_id=zone_id)
+
+    votes = {f"user_{i}": rng.choice((-1, 1)) for i in range(args.voters)}
+    attempts = list(votes.items())
+    attempts += [(user, -vote) for user, vote in attempts[:int(args.voters * args.repeat)]]
+    rng.shuffle(attempts)
+
+    go = threading.Event()
+    latencies = []
+
+    def cast(attempt):
+        user, vote = attempt
+        go.wait()
+        start = time.perf_counter()
+        result = ZoneManager.submit_vote(zone_id, user, vote)
+        latencies.append(time.perf_counter() - start)
+        return user, vote, result
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = pool.map(cast, attempts)
+        time.sleep(0.5)  # let the threads line up
+        start = time.perf_counter()
+        go.set()
+        results = list(futures)
+    elapsed = time.perf_counter() - start
+    write_behind.flush()
+
+    accepted = set()
+    rejected = errors = 0
+    for user, vote, result in results:
+        if result["success"]:
+            if user in accepted and not WRITE_BEHIND_ENABLED:
+                sys.exit(f"FAIL: {user} voted twice")
+            accepted.add(user)
+        elif result["error"] == "Already voted on this zone":
+            rejected += 1
+        else:
+            errors += 1
+            print(f"  error: {result['error']}")
+
+    # Read the score back from Firestore, not from this process's cache
+    firebase.cache.clear()
+    final = ZoneManager.get_zone(zone_id)["zone"]["score"]
+    stored = firebase.query_collection(ZoneManager.VOTES_COLLECTION, "zone_id", "==", zone_id)
+    expected = sum(vote["vote"] for vote in stored)
+
+    print(f"{len(attempts)} votes from {args.voters} voters on {args.shards} shards "
+          f"in {elapsed:.2f}s ({len(attempts) / elapsed:.0f} votes/s)")
+    print(f"  latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p99 {sorted(latencies)[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"  accepted {len(accepted)}, rejected repeats {rejected}, errors {errors}, stored votes {len(stored)}")
+    print(f"  final score {final}, sum of stored votes {expected}")
+    if WRITE_BEHIND_ENABLED:
+        print(f"  write-behind: {write_behind.status()}")
+
+    failures = check_sequential(args.sequential)
+    for failure in failures:
+        print(f"  {failure}")
+    if failures or errors or len(accepted) != args.voters or len(stored) != args.voters or final != expected:
+        sys.exit("FAIL")
+    print("OK: score is exact")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Directions Cache
+================
+Google Directions results for routes, kept in a small SQLite database so they
+survive restarts.
+
+- One shared googlemaps.Client for the whole process
+- Entries are keyed by origin/destination stop coordinates and travel mode,
+  and are fresh for DIRECTIONS_TTL_SECONDS
+- Stale entries are served immediately and refreshed in the background
+  (stale-while-revalidate); one refresh per key at a time
+- On a miss the caller waits at most DIRECTIONS_MISS_WAIT_SECONDS; the fetch
+  keeps going in the background and fills the cache either way
+- prefetch_popular() refreshes the most viewed routes ahead of expiry
+  (scheduled by `directions_prefetcher` in features/routes.py)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Dict, Optional, Tuple
+
+DIRECTIONS_CACHE_PATH = os.environ.get(
+    "DIRECTIONS_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "directions_cache.sqlite3"),
+)
+DIRECTIONS_TTL_SECONDS = float(os.environ.get("DIRECTIONS_TTL_SECONDS", 6 * 3600))
+DIRECTIONS_MISS_WAIT_SECONDS = float(os.environ.get("DIRECTIONS_MISS_WAIT_SECONDS", 2))
+
+# Background prefetch: how often, how many of the most viewed routes, and how
+# close to expiry an entry must be to get refreshed early
+DIRECTIONS_PREFETCH_SECONDS = float(os.environ.get("DIRECTIONS_PREFETCH_SECONDS", 300))
+PREFETCH_TOP_ROUTES = 50
+PREFETCH_MARGIN_SECONDS = 600
+
+FETCH_WORKERS = 4
+
+
+def directions_key(route, mode: str = "transit") -> Optional[str]:
+    """Cache key from the route's first and last stop, or None without two stops"""
+    if route.stop_count < 2:
+        return None
+    (origin_lat, origin_lng), (dest_lat, dest_lng) = route.stop_position(0), route.stop_position(-1)
+    return f"{origin_lat:.5f},{origin_lng:.5f}|{dest_lat:.5f},{dest_lng:.5f}|{mode}"
+
+
+class DirectionsCache:
+    """Persistent, TTL'd directions cache with background refresh"""
+
+    def __init__(self, api_key: Optional[str] = None, path: str = DIRECTIONS_CACHE_PATH,
+                 ttl: float = DIRECTIONS_TTL_SECONDS, miss_wait: float = DIRECTIONS_MISS_WAIT_SECONDS):
+        self.api_key = api_key
+        self.path = path
+        self.ttl = ttl
+        self.miss_wait = miss_wait
+        self._client = None
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="directions")
+        self.popularity: Counter = Counter()
+        self._routes = {}
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "fetches": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        """The shared googlemaps.Client, created on first use"""
+        if self._client is None:
+            import googlemaps
+            self._client = googlemaps.Client(key=self.api_key)
+        return self._client
+
+    # =========================================
+    # STORAGE
+    # =========================================
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS directions (key TEXT PRIMARY KEY, fetched_at REAL, body TEXT)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _load(self, key: str) -> Optional[Tuple[float, Dict]]:
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT fetched_at, body FROM directions WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _store(self, key: str, directions: Dict):
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO directions (key, fetched_at, body) VALUES (?, ?, ?)",
+                (key, time.time(), json.dumps(directions)),
+            )
+            db.commit()
+
+    # =========================================
+    # LOOKUP
+    # =========================================
+
+    def get(self, route, mode: str = "transit") -> Optional[Dict]:
+        """
+        Directions for the route's first-to-last stop trip. Never blocks on a
+        stale entry; waits at most miss_wait on a miss. None if unavailable.
+        """
+        key = directions_key(route, mode)
+        if not self.enabled or key is None:
+            return None
+        self.popularity[route.id] += 1
+        self._routes[route.id] = route
+
+        cached = self._load(key)
+        if cached:
+            fetched_at, directions = cached
+            if time.time() - fetched_at < self.ttl:
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale"] += 1
+                self.refresh(route, mode)
+            return directions
+
+        self.stats["misses"] += 1
+        future = self.refresh(route, mode)
+        try:
+            return future.result(timeout=self.miss_wait)
+        except TimeoutError:
+            return None
+
+    def refresh(self, route, mode: str = "transit"):
+        """Fetch directions in the background; returns the (possibly shared) in-flight future"""
+        key = directions_key(route, mode)
+        with self._pending_lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pool.submit(self._fetch, key, route, mode)
+                self._pending[key] = future
+        return future
+
+    def _fetch(self, key: str, route, mode: str) -> Optional[Dict]:
+        try:
+            origin = "{},{}".format(*route.stop_position(0))
+            dest = "{},{}".format(*route.stop_position(-1))
+            self.stats["fetches"] += 1
+            directions = self.client.directions(origin, dest, mode=mode)
+            if directions:
+                self._store(key, directions[0])
+                return directions[0]
+            return None
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Google Maps API Error: {e}")
+            return None
+        finally:
+            with self._pending_lock:
+                self._pending.pop(key, None)
+
+    def prefetch_popular(self, top: int = PREFETCH_TOP_ROUTES):
+        """Refresh the most viewed routes whose entries are missing or about to expire"""
+        if not self.enabled:
+            return
+        for route_id, _ in self.popularity.most_common(top):
+            route = self._routes.get(route_id)
+            key = directions_key(route) if route else None
+            if key is None:
+                continue
+            cached = self._load(key)
+            if cached is None or time.time() - cached[0] > self.ttl - PREFETCH_MARGIN_SECONDS:
+                self.refresh(route)
+
+
+# Global instance
+directions_cache = DirectionsCache(api_key=os.environ.get("GOOGLE_MAPS_API_KEY"))
@@ -6,25 +6,70 @@ Handles all Firebase operations:
 - Firestore (database operations)
 - Storage (file uploads)
 
+Reads go through a read-through cache (see services/firestore_cache.py).
+commit() applies several writes as one atomic batch, in a single round trip.
+
+The SDK is imported and the connection made on first use (the first
+Firestore, Storage or Auth call), not at import, so server start stays fast.
+
 SETUP:
 1. Create a Firebase project at console.firebase.google.com
 2. Download service account key (Project Settings > Service Accounts > Generate New Private Key)
 3. Save it as: firebase/service_account.json
+
+For local testing against the Firestore emulator, set FIRESTORE_EMULATOR_HOST
+(e.g. localhost:8080) and leave out the key; GCLOUD_PROJECT names the project.
 """
 
+import importlib.util
 import os
+import sys
 import json
-from typing import Dict, List, Optional
-
-# Check if firebase_admin is installed
-try:
-    import firebase_admin
-    from firebase_admin import credentials, firestore, auth, storage
-    FIREBASE_AVAILABLE = True
-except ImportError:
-    FIREBASE_AVAILABLE = False
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Add parent dir to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firestore_cache import FirestoreCache
+
+# Check if firebase_admin is installed (imported on first use, it takes a few hundred ms)
+FIREBASE_AVAILABLE = importlib.util.find_spec("firebase_admin") is not None
+if not FIREBASE_AVAILABLE:
     print("WARNING: firebase-admin not installed. Run: pip install firebase-admin")
 
+firebase_admin = credentials = firestore = auth = storage = None
+
+# Firestore rejects batches with more writes than this
+MAX_BATCH_WRITES = 500
+
+
+class AlreadyExistsError(Exception):
+    """A "create" write in commit() hit a document that already exists"""
+
+
+def _import_sdk():
+    global firebase_admin, credentials, firestore, auth, storage
+    if firebase_admin is None:
+        import firebase_admin
+        from firebase_admin import credentials, firestore, auth, storage
+
+
+def server_timestamp():
+    """Firestore's server timestamp sentinel (None without the SDK)"""
+    if not FIREBASE_AVAILABLE:
+        return None
+    _import_sdk()
+    return firestore.SERVER_TIMESTAMP
+
+
+def increment(amount):
+    """Firestore's atomic increment transform (the plain amount without the SDK)"""
+    if not FIREBASE_AVAILABLE:
+        return amount
+    _import_sdk()
+    return firestore.Increment(amount)
+
 
 class FirebaseService:
     """Singleton Firebase service wrapper"""
@@ -41,16 +86,40 @@ class FirebaseService:
         if FirebaseService._initialized:
             return
             
-        self.db = None
-        self.bucket = None
-        self._initialize()
+        self._db = None
+        self._bucket = None
+        self._connected = False
+        self._connect_lock = threading.Lock()
+        self.cache = FirestoreCache()
+        self._watches = {}
         FirebaseService._initialized = True
     
+    @property
+    def db(self):
+        """Firestore client (None when Firebase isn't configured), connected on first use"""
+        self._connect()
+        return self._db
+    
+    @property
+    def bucket(self):
+        """Storage bucket (None when Firebase isn't configured), connected on first use"""
+        self._connect()
+        return self._bucket
+    
+    def _connect(self):
+        if self._connected:
+            return
+        with self._connect_lock:
+            if not self._connected:
+                self._initialize()
+                self._connected = True
+    
     def _initialize(self):
         """Initialize Firebase Admin SDK"""
         if not FIREBASE_AVAILABLE:
             print("Firebase Admin SDK not available")
             return
+        _import_sdk()
             
         # Look for service account key in multiple locations
         possible_paths = [
@@ -65,6 +134,10 @@ class FirebaseService:
                 cred_path = path
                 break
         
+        if not cred_path and os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            self._connect_emulator()
+            return
+        
         if not cred_path:
             print("WARNING: Firebase service account key not found!")
             print("Please download it from Firebase Console and save to: firebase/service_account.json")
@@ -75,12 +148,22 @@ class FirebaseService:
             firebase_admin.initialize_app(cred, {
                 'storageBucket': f'{cred.project_id}.appspot.com'
             })
-            self.db = firestore.client()
-            self.bucket = storage.bucket()
+            self._db = firestore.client()
+            self._bucket = storage.bucket()
             print(f"Firebase initialized for project: {cred.project_id}")
         except Exception as e:
             print(f"Firebase initialization failed: {e}")
     
+    def _connect_emulator(self):
+        """Firestore only, against FIRESTORE_EMULATOR_HOST (no Auth or Storage)"""
+        from google.cloud import firestore as cloud_firestore
+        project = os.environ.get("GCLOUD_PROJECT", "demo-transport")
+        try:
+            self._db = cloud_firestore.Client(project=project)
+            print(f"Firestore emulator at {os.environ['FIRESTORE_EMULATOR_HOST']} (project {project})")
+        except Exception as e:
+            print(f"Firestore emulator connection failed: {e}")
+    
     # =========================================
     # AUTHENTICATION
     # =========================================
@@ -92,6 +175,7 @@ class FirebaseService:
         """
         if not FIREBASE_AVAILABLE:
             return None
+        self._connect()
         try:
             decoded = auth.verify_id_token(id_token)
             return decoded
@@ -103,6 +187,7 @@ class FirebaseService:
         """Get user info by UID"""
         if not FIREBASE_AVAILABLE:
             return None
+        self._connect()
         try:
             user = auth.get_user(uid)
             return {
@@ -119,21 +204,44 @@ class FirebaseService:
     # FIRESTORE DATABASE
     # =========================================
     
+    def set_cache(self, cache):
+        """Replace the read cache (e.g. with NullCache to disable caching)"""
+        self.cache = cache
+    
     def get_collection(self, collection_name: str) -> List[Dict]:
-        """Get all documents from a collection"""
+        """Get all documents from a collection (or a subcollection path, e.g. "zones/z1/score_shards")"""
         if not self.db:
             return []
-        docs = self.db.collection(collection_name).stream()
-        return [{"id": doc.id, **doc.to_dict()} for doc in docs]
+        docs = self.cache.get_collection(collection_name)
+        if docs is not None:
+            return docs
+        generation = self.cache.generation(collection_name)
+        docs = [{"id": doc.id, **doc.to_dict()} for doc in self.db.collection(collection_name).stream()]
+        self.cache.put_collection(collection_name, docs, generation)
+        return list(docs)
     
+    def query_collection(self, collection_name: str, field: str, op: str, value) -> List[Dict]:
+        """
+        Get the documents matching one filter, e.g. ("created_at", ">=", cutoff).
+        Not cached: callers use it for bounded range reads.
+        """
+        if not self.db:
+            return []
+        query = self.db.collection(collection_name).where(field, op, value)
+        return [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+
     def get_document(self, collection_name: str, doc_id: str) -> Optional[Dict]:
         """Get a single document by ID"""
         if not self.db:
             return None
+        found, cached = self.cache.get_document(collection_name, doc_id)
+        if found:
+            return dict(cached) if cached else None
+        generation = self.cache.generation(collection_name)
         doc = self.db.collection(collection_name).document(doc_id).get()
-        if doc.exists:
-            return {"id": doc.id, **doc.to_dict()}
-        return None
+        result = {"id": doc.id, **doc.to_dict()} if doc.exists else None
+        self.cache.put_document(collection_name, doc_id, result, generation)
+        return dict(result) if result else None
     
     def create_document(self, collection_name: str, data: Dict, doc_id: str = None) -> str:
         """Create a new document. Returns the document ID."""
@@ -141,10 +249,11 @@ class FirebaseService:
             return ""
         if doc_id:
             self.db.collection(collection_name).document(doc_id).set(data)
-            return doc_id
         else:
             doc_ref = self.db.collection(collection_name).add(data)
-            return doc_ref[1].id
+            doc_id = doc_ref[1].id
+        self.cache.invalidate(collection_name, doc_id)
+        return doc_id
     
     def update_document(self, collection_name: str, doc_id: str, data: Dict) -> bool:
         """Update an existing document"""
@@ -156,6 +265,8 @@ class FirebaseService:
         except Exception as e:
             print(f"Update failed: {e}")
             return False
+        finally:
+            self.cache.invalidate(collection_name, doc_id)
     
     def delete_document(self, collection_name: str, doc_id: str) -> bool:
         """Delete a document"""
@@ -167,6 +278,99 @@ class FirebaseService:
         except Exception as e:
             print(f"Delete failed: {e}")
             return False
+        finally:
+            self.cache.invalidate(collection_name, doc_id)
+    
+    def get_collection_group(self, collection_name: str) -> List[Dict]:
+        """
+        Get the documents of every subcollection with this name, e.g. all
+        "score_shards" under any zone. Each carries its parent's id as "parent_id".
+        """
+        if not self.db:
+            return []
+        docs = self.cache.get_collection(collection_name)
+        if docs is not None:
+            return docs
+        generation = self.cache.generation(collection_name)
+        docs = [
+            {"id": doc.id, "parent_id": doc.reference.parent.parent.id, **doc.to_dict()}
+            for doc in self.db.collection_group(collection_name).stream()
+        ]
+        self.cache.put_collection(collection_name, docs, generation)
+        return list(docs)
+    
+    def commit(self, writes: Iterable[Tuple[str, Tuple[str, ...], Optional[Dict]]]) -> bool:
+        """
+        Apply several writes atomically, in one round trip: all of them or none.
+        Each write is (op, path, data), path being (collection, doc_id, ...) and op one of
+          "create"  - fails the whole batch with AlreadyExistsError if the document exists
+          "set"     - overwrite
+          "merge"   - set with merge (creates the document if missing)
+          "update"  - fails if the document doesn't exist
+          "delete"  - data is ignored
+        At most MAX_BATCH_WRITES writes per call.
+        """
+        if not self.db:
+            return False
+        writes = list(writes)
+        if len(writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"A batch holds at most {MAX_BATCH_WRITES} writes, got {len(writes)}")
+        
+        batch = self.db.batch()
+        for op, path, data in writes:
+            ref = self.db.document(*path)
+            if op == "create":
+                batch.create(ref, data)
+            elif op == "set":
+                batch.set(ref, data)
+            elif op == "merge":
+                batch.set(ref, data, merge=True)
+            elif op == "update":
+                batch.update(ref, data)
+            elif op == "delete":
+                batch.delete(ref)
+            else:
+                raise ValueError(f"Unknown write: {op}")
+        
+        from google.api_core.exceptions import AlreadyExists, Conflict
+        try:
+            batch.commit()
+            return True
+        except (AlreadyExists, Conflict) as e:
+            raise AlreadyExistsError(str(e)) from e
+        finally:
+            # Only the written documents' own collections: a subcollection write
+            # leaves cached collection group reads to expire on their TTL
+            for _, path, _ in writes:
+                self.cache.invalidate("/".join(path[:-1]), path[-1])
+    
+    def watch_collection(self, collection_name: str) -> bool:
+        """
+        Keep the cached copy of a collection current with an on_snapshot listener.
+        Reads of a watched collection are then always served from memory.
+        """
+        if not self.db:
+            return False
+        if collection_name in self._watches:
+            return True
+        
+        def on_snapshot(col_snapshot, changes, read_time):
+            docs = [{"id": doc.id, **doc.to_dict()} for doc in col_snapshot]
+            self.cache.apply_snapshot(collection_name, docs)
+        
+        try:
+            self._watches[collection_name] = self.db.collection(collection_name).on_snapshot(on_snapshot)
+            return True
+        except Exception as e:
+            print(f"Watch failed: {e}")
+            return False
+    
+    def unwatch_collection(self, collection_name: str):
+        """Stop a listener started by watch_collection"""
+        watch = self._watches.pop(collection_name, None)
+        if watch:
+            watch.unsubscribe()
+            self.cache.invalidate(collection_name)
     
     # =========================================
     # STORAGE
@@ -224,7 +428,7 @@ def save_vote_to_firebase(zone_id: str, user_id: str, vote: int) -> bool:
         "zone_id": zone_id,
         "user_id": user_id,
         "vote": vote,
-        "timestamp": firestore.SERVER_TIMESTAMP if FIREBASE_AVAILABLE else None
+        "timestamp": server_timestamp()
     }
     firebase.create_document("votes", vote_data)
     return True
@@ -238,3 +442,4 @@ if __name__ == "__main__":
     print(f"Firebase available: {FIREBASE_AVAILABLE}")
     print(f"Database connected: {firebase.db is not None}")
     print(f"Storage connected: {firebase.bucket is not None}")
+    print(f"Cache stats: {firebase.cache.stats()}")
@@ -0,0 +1,230 @@
+"""
+Firestore Read-Through Cache
+============================
+In-process cache in front of FirebaseService reads.
+
+- Whole collections and single documents are cached with per-collection TTLs.
+  Subcollections ("zones/z1/score_shards") are cached under their path and
+  take the TTL and hit/miss counters of their name ("score_shards")
+- Both are LRU-bounded; listener-fed collections are never evicted
+- FirebaseService writes invalidate the affected entries (write-through invalidation)
+- A fill is dropped if the collection was written to since the read started
+  (fills carry the generation taken before the read), so a read racing a
+  write can't cache pre-write data for a whole TTL
+- Collections fed by Firestore `on_snapshot` listeners never expire, so reads
+  don't block on the network
+- Hit/miss counters per collection
+- A generation counter per collection lets derived structures (e.g. the zone
+  spatial index) notice that the underlying data changed
+
+Swap in NullCache (or any object with the same methods) via
+`firebase.set_cache(...)` to disable or replace caching.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Seconds a cached read stays valid, per collection
+DEFAULT_TTL_SECONDS = 30
+COLLECTION_TTLS = {
+    "zones": 60,
+    "score_shards": 60,
+    "reports": 5,
+    "votes": 10,
+}
+
+MAX_DOCUMENTS = 10000
+MAX_COLLECTIONS = 64
+
+
+def _ttls_from_env() -> Dict[str, float]:
+    """Overrides like FIRESTORE_CACHE_TTLS="zones=120,reports=2" """
+    ttls = dict(COLLECTION_TTLS)
+    for item in os.environ.get("FIRESTORE_CACHE_TTLS", "").split(","):
+        name, _, seconds = item.partition("=")
+        if name.strip() and seconds.strip():
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+class FirestoreCache:
+    """TTL + LRU cache for Firestore collections and documents"""
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = DEFAULT_TTL_SECONDS,
+                 max_documents: int = MAX_DOCUMENTS, max_collections: int = MAX_COLLECTIONS):
+        self.ttls = _ttls_from_env() if ttls is None else dict(ttls)
+        self.default_ttl = default_ttl
+        self.max_documents = max_documents
+        self.max_collections = max_collections
+
+        self._collections: "OrderedDict[str, Tuple[float, List[Dict], Dict[str, Dict]]]" = OrderedDict()
+        self._documents: "OrderedDict[Tuple[str, str], Tuple[float, Optional[Dict]]]" = OrderedDict()
+        self._live = set()
+        self._generations: Dict[str, int] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _name(collection: str) -> str:
+        """Collection name of a (sub)collection path"""
+        return collection.rsplit("/", 1)[-1]
+
+    def _expires_at(self, collection: str) -> float:
+        if collection in self._live:
+            return float("inf")
+        return time.monotonic() + self.ttls.get(self._name(collection), self.default_ttl)
+
+    def _count(self, collection: str, outcome: str):
+        stats = self._stats.setdefault(self._name(collection), {"hits": 0, "misses": 0})
+        stats[outcome] += 1
+
+    # =========================================
+    # READS
+    # =========================================
+
+    def get_collection(self, collection: str) -> Optional[List[Dict]]:
+        """Cached documents of a collection, or None on a miss"""
+        with self._lock:
+            entry = self._collections.get(collection)
+            if entry and entry[0] > time.monotonic():
+                self._collections.move_to_end(collection)
+                self._count(collection, "hits")
+                return list(entry[1])
+            self._count(collection, "misses")
+            return None
+
+    def get_document(self, collection: str, doc_id: str) -> Tuple[bool, Optional[Dict]]:
+        """(found, document). A cached "does not exist" is (True, None)."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._documents.get((collection, doc_id))
+            if entry and entry[0] > now:
+                self._documents.move_to_end((collection, doc_id))
+                self._count(collection, "hits")
+                return True, entry[1]
+
+            # A fresh copy of the whole collection answers single-document reads too
+            listing = self._collections.get(collection)
+            if listing and listing[0] > now:
+                self._count(collection, "hits")
+                return True, listing[2].get(doc_id)
+
+            self._count(collection, "misses")
+            return False, None
+
+    # =========================================
+    # FILLS
+    # =========================================
+
+    def put_collection(self, collection: str, docs: List[Dict], generation: Optional[int] = None):
+        """Cache a collection read; skipped if generation (taken before the read) is out of date"""
+        with self._lock:
+            if generation is not None and generation != self.generation(collection):
+                return
+            self._collections[collection] = (self._expires_at(collection), list(docs), {doc["id"]: doc for doc in docs})
+            self._collections.move_to_end(collection)
+            while len(self._collections) > self.max_collections:
+                # Listener-fed collections stay: evicting one would turn it back into a TTL entry
+                evicted = next((name for name in self._collections if name not in self._live), None)
+                if evicted is None:
+                    break
+                del self._collections[evicted]
+
+    def put_document(self, collection: str, doc_id: str, doc: Optional[Dict], generation: Optional[int] = None):
+        """Cache a document read; skipped if generation (taken before the read) is out of date"""
+        with self._lock:
+            if generation is not None and generation != self.generation(collection):
+                return
+            self._documents[(collection, doc_id)] = (self._expires_at(collection), doc)
+            self._documents.move_to_end((collection, doc_id))
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+
+    def apply_snapshot(self, collection: str, docs: List[Dict]):
+        """Replace a collection with the state pushed by an on_snapshot listener"""
+        with self._lock:
+            self._live.add(collection)
+            self.put_collection(collection, docs)
+            for key in [key for key in self._documents if key[0] == collection]:
+                del self._documents[key]
+            self._bump(collection)
+
+    # =========================================
+    # INVALIDATION
+    # =========================================
+
+    def invalidate(self, collection: str, doc_id: Optional[str] = None):
+        """Forget cached reads after a write to a collection (or one document of it)"""
+        with self._lock:
+            if collection not in self._live:
+                self._collections.pop(collection, None)
+            if doc_id is None:
+                for key in [key for key in self._documents if key[0] == collection]:
+                    del self._documents[key]
+            else:
+                self._documents.pop((collection, doc_id), None)
+            self._bump(collection)
+
+    def clear(self):
+        with self._lock:
+            self._collections.clear()
+            self._documents.clear()
+            self._live.clear()
+            for collection in list(self._generations):
+                self._bump(collection)
+
+    def _bump(self, collection: str):
+        self._generations[collection] = self._generations.get(collection, 0) + 1
+
+    def generation(self, collection: str) -> int:
+        """Changes whenever cached data for the collection is replaced or invalidated"""
+        return self._generations.get(collection, 0)
+
+    def is_live(self, collection: str) -> bool:
+        return collection in self._live
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "collections": {name: dict(stats) for name, stats in self._stats.items()},
+                "cached_collections": len(self._collections),
+                "cached_documents": len(self._documents),
+                "live_collections": sorted(self._live),
+            }
+
+
+class NullCache:
+    """Cache that never stores anything; every read goes to Firestore"""
+
+    def get_collection(self, collection: str) -> Optional[List[Dict]]:
+        return None
+
+    def get_document(self, collection: str, doc_id: str) -> Tuple[bool, Optional[Dict]]:
+        return False, None
+
+    def put_collection(self, collection: str, docs: List[Dict], generation: Optional[int] = None):
+        pass
+
+    def put_document(self, collection: str, doc_id: str, doc: Optional[Dict], generation: Optional[int] = None):
+        pass
+
+    def apply_snapshot(self, collection: str, docs: List[Dict]):
+        pass
+
+    def invalidate(self, collection: str, doc_id: Optional[str] = None):
+        pass
+
+    def clear(self):
+        pass
+
+    def generation(self, collection: str) -> int:
+        return 0
+
+    def is_live(self, collection: str) -> bool:
+        return False
+
+    def stats(self) -> Dict:
+        return {}
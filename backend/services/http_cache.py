@@ -0,0 +1,42 @@
+"""
+HTTP Caching Helpers
+====================
+ETag and conditional-request helpers for API responses.
+
+Handlers compute an ETag from cheap version numbers *before* building the
+response body, so a matching If-None-Match is answered with a bodyless 304
+without serializing anything.
+"""
+
+import hashlib
+from typing import Optional
+
+from flask import Response, request
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag value (unquoted) from the parts that determine a response body"""
+    raw = "|".join(str(part) for part in parts)
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def is_not_modified(etag: str) -> bool:
+    """Whether the current request's If-None-Match already covers this ETag"""
+    if_none_match = request.if_none_match
+    return bool(if_none_match) and (if_none_match.star_tag or if_none_match.contains_weak(etag))
+
+
+def not_modified(etag: str) -> Response:
+    """Bodyless 304 response carrying the ETag"""
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response: Response, etag: str, max_age: Optional[int] = None) -> Response:
+    """Attach a strong ETag; clients must revalidate unless max_age is given"""
+    response.set_etag(etag)
+    if max_age is None:
+        response.headers["Cache-Control"] = "no-cache"
+    else:
+        response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    return response
@@ -0,0 +1,63 @@
+"""
+Lazy Instances
+==============
+Module-level singletons that are built on first use instead of at import.
+
+    mock_data = LazyInstance(MockDataGenerator)
+
+Callers keep importing and using the global as before; the first attribute
+access builds the real object (once, even from several threads) and every
+access after that is forwarded to it. warm_in_background() starts the build
+on a daemon thread, so a server can answer requests that don't need the
+object while it is being built.
+"""
+
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyInstance(Generic[T]):
+    """Proxy that builds its target with factory() on first attribute access"""
+
+    def __init__(self, factory: Callable[[], T], name: Optional[str] = None):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name or getattr(factory, "__name__", "instance"))
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "build_seconds", None)
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def resolve(self) -> T:
+        """The real object, built on the first call"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                start = time.perf_counter()
+                object.__setattr__(self, "_instance", self._factory())
+                object.__setattr__(self, "build_seconds", time.perf_counter() - start)
+                print(f"{self._name} ready in {self.build_seconds * 1000:.0f} ms")
+            return self._instance
+
+    def warm_in_background(self) -> threading.Thread:
+        """Build the object on a daemon thread"""
+        thread = threading.Thread(target=self.resolve, name=f"warm-{self._name}", daemon=True)
+        thread.start()
+        return thread
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.resolve(), name, value)
+
+    def __repr__(self):
+        state = "ready" if self.initialized else "not built"
+        return f"<LazyInstance {self._name} ({state})>"
@@ -0,0 +1,60 @@
+"""
+Pagination and Projection Helpers
+=================================
+Query parameters shared by the large list endpoints.
+
+- `limit` / `cursor`: cursor-based pages. Cursors are opaque, URL-safe
+  strings; each endpoint decides what position they encode. Requests
+  without either parameter get the full list, as before.
+- `fields=id,position,status`: only the named top-level fields are built
+  for each object.
+"""
+
+import base64
+import json
+from typing import Iterable, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_page(args) -> Optional[Tuple[int, Optional[list]]]:
+    """(limit, decoded cursor or None) when the request asks for a page, else None. Raises ValueError."""
+    limit = args.get("limit")
+    cursor = args.get("cursor")
+    if limit is None and cursor is None:
+        return None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE), (decode_cursor(cursor) if cursor else None)
+
+
+def parse_fields(args, allowed: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """Requested fields in order, or None for all fields. Raises ValueError on unknown names."""
+    value = args.get("fields")
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def encode_cursor(position: list) -> str:
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, list):
+        raise ValueError("Invalid cursor")
+    return position
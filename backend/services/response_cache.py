@@ -0,0 +1,144 @@
+"""
+Response Cache
+==============
+Pre-encoded JSON responses for endpoints whose body only changes when the
+underlying data is reloaded (the region list and the route catalog).
+
+- Each key (e.g. a country/city filter combination) is serialized once as
+  compact JSON (services/json_encoding.py, like jsonify) and kept as bytes,
+  along with gzip and, when the `brotli` package is installed, brotli variants
+- A request gets the best variant its Accept-Encoding allows, with
+  Content-Encoding, Vary and a strong ETag per variant. If-None-Match is
+  answered with a bodyless 304.
+- Entries belong to a data version; when the caller passes a new version
+  (e.g. after a catalog reload) every entry is dropped
+- LRU-bounded, so arbitrary filter values can't grow it without limit
+
+response_cache compresses at the highest levels, for the few responses
+every client asks for (the region list, the catalog per region filter).
+page_cache holds paged and projected responses: many distinct keys, each
+requested rarely (a cursor walk touches every page once), so it compresses
+at cheap levels and has its own LRU, which a walk can't flush the catalog
+entries out of.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from flask import Response, request
+
+from services.http_cache import is_not_modified, not_modified, with_etag
+from services.json_encoding import dumps
+
+# Optional brotli support
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+# Compression runs once per entry, so use high levels for entries that are requested over and over
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Levels for entries that are built on the request thread and rarely reused
+FAST_GZIP_LEVEL = 6
+FAST_BROTLI_QUALITY = 4
+
+MAX_ENTRIES = 256
+
+
+class CachedResponse:
+    """Encoded body variants of one response, keyed by content coding"""
+
+    __slots__ = ("etag", "bodies")
+
+    def __init__(self, body: bytes, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY):
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.bodies: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=gzip_level, mtime=0)
+            if BROTLI_AVAILABLE:
+                self.bodies["br"] = brotli.compress(body, quality=brotli_quality)
+
+
+class ResponseCache:
+    """Versioned, LRU-bounded cache of pre-encoded JSON responses"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, gzip_level: int = GZIP_LEVEL,
+                 brotli_quality: int = BROTLI_QUALITY):
+        self.max_entries = max_entries
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def invalidate(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+
+    def get(self, key: Hashable, version, build: Callable[[], object]) -> CachedResponse:
+        """Cached response for key at this data version, encoding build() on a miss"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+                self.stats["invalidations"] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+
+        # Encoded outside the lock; two concurrent misses just build the same bytes twice
+        self.stats["misses"] += 1
+        entry = CachedResponse(dumps(build()).encode(), self.gzip_level, self.brotli_quality)
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, key: Hashable, version, build: Callable[[], object]) -> Response:
+        """Flask response for key, in the best encoding the client accepts"""
+        entry = self.get(key, version, build)
+        coding = _choose_coding(entry)
+        # A strong ETag identifies the exact bytes, so each coding gets its own
+        etag = entry.etag if coding == "identity" else f"{entry.etag}-{coding}"
+        if is_not_modified(etag):
+            response = not_modified(etag)
+        else:
+            response = Response(entry.bodies[coding], status=200, mimetype="application/json")
+            if coding != "identity":
+                response.headers["Content-Encoding"] = coding
+            with_etag(response, etag)
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def _choose_coding(entry: CachedResponse) -> str:
+    """Best available coding by the client's Accept-Encoding quality, preferring smaller bodies"""
+    accepted = request.accept_encodings
+    best: Optional[str] = None
+    best_quality = 0.0
+    for coding in ("br", "gzip"):
+        quality = accepted.quality(coding) if coding in entry.bodies else 0
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best or "identity"
+
+
+# Global instances
+response_cache = ResponseCache()
+page_cache = ResponseCache(gzip_level=FAST_GZIP_LEVEL, brotli_quality=FAST_BROTLI_QUALITY)
@@ -0,0 +1,345 @@
+"""
+Write-Behind Queue
+==================
+Buffers Firestore writes in memory and commits them in batches on a
+background thread, so request handlers don't wait on a round trip per write.
+
+- set_latest(key, path, data): latest wins, e.g. one report per vehicle
+- create_counted(kind, counter_id, path, data, amount): a document that must
+  not exist yet (a vote) plus an amount for a counter (the zone's score).
+  Amounts for the same counter are summed into one write, produced by the
+  writer registered for the kind (given the sum and the number of
+  documents), and committed in the same batch as the documents they came
+  from
+- Flushed every WRITE_BEHIND_SECONDS, or as soon as WRITE_BEHIND_MAX_PENDING
+  writes are waiting, in batches of at most MAX_BATCH_WRITES
+- When a batch fails because one of its counted documents already exists
+  (e.g. a repeat vote through another server), its counted documents are
+  retried one at a time, so only the duplicates are dropped. The kind's
+  on_duplicate callback hears of each, to undo what the caller counted
+  in memory
+- Batches that fail otherwise are put back and retried on the next flush
+- stop(), registered with atexit, drains whatever is still pending
+- status() reports queue depth, counters and flush latency
+
+Buffered writes are lost if the process dies before a flush, so this is
+opt-in: WRITE_BEHIND=1.
+"""
+
+import atexit
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+# Add parent dir to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import firebase, AlreadyExistsError, MAX_BATCH_WRITES
+
+# Queue reports and votes instead of writing them from the request handler
+WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+# Seconds between flushes
+WRITE_BEHIND_SECONDS = float(os.environ.get("WRITE_BEHIND_SECONDS", "1"))
+# Flush early once this many writes are waiting
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", str(MAX_BATCH_WRITES)))
+
+Path = Tuple[str, ...]
+Write = Tuple[str, Path, Optional[Dict]]
+CounterWriter = Callable[[str, int, int], Write]
+# (counter_id, amount, queued_at): a counted document was dropped as a duplicate;
+# queued_at is the time.monotonic() of its create_counted call
+DuplicateCallback = Callable[[str, int, float], None]
+
+
+def new_document_id() -> str:
+    """Random document id, like the ones Firestore assigns to added documents"""
+    return uuid.uuid4().hex[:20]
+
+
+@dataclass
+class _Unit:
+    """Writes that must land in the same batch, and what to put back if they don't"""
+    writes: List[Write]
+    key: Optional[Hashable] = None          # set_latest key
+    counter: Optional[Tuple[str, str]] = None  # (kind, counter_id) of counted documents
+    documents: Optional[List[Tuple[Path, Dict, int, float]]] = None  # (path, data, amount, queued_at)
+
+
+class WriteBehindQueue:
+    """Coalescing, batching write buffer in front of a commit function"""
+
+    def __init__(self, commit: Callable[[List[Write]], bool], interval: float = WRITE_BEHIND_SECONDS,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING, batch_size: int = MAX_BATCH_WRITES):
+        self._commit = commit
+        self.interval = interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._counter_writers: Dict[str, CounterWriter] = {}
+        self._duplicate_callbacks: Dict[str, DuplicateCallback] = {}
+
+        self._latest: Dict[Hashable, Tuple[Path, Dict]] = {}
+        self._counted: Dict[Tuple[str, str], Dict[Path, Tuple[Dict, int, float]]] = {}
+        self._depth = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._exit_hook = False
+
+        self.stats = {"accepted": 0, "coalesced": 0, "flushes": 0, "batches": 0, "writes": 0,
+                      "duplicates": 0, "errors": 0}
+        self._latencies = deque(maxlen=256)
+        self.last_flush_at: Optional[float] = None
+
+    def register_counter(self, kind: str, writer: CounterWriter, on_duplicate: Optional[DuplicateCallback] = None):
+        """
+        writer(counter_id, amount, count) returns the write adding amount, from
+        count documents, to that counter. on_duplicate(counter_id, amount,
+        queued_at) is called from the flush for every document dropped because
+        it already existed.
+        """
+        self._counter_writers[kind] = writer
+        if on_duplicate:
+            self._duplicate_callbacks[kind] = on_duplicate
+
+    # =========================================
+    # ENQUEUE
+    # =========================================
+
+    def set_latest(self, key: Hashable, path: Path, data: Dict):
+        """Write data at path, unless a newer set_latest with the same key comes before the flush"""
+        with self._lock:
+            if key in self._latest:
+                self.stats["coalesced"] += 1
+            else:
+                self._depth += 1
+            self._latest[key] = (path, data)
+            self._accepted()
+
+    def create_counted(self, kind: str, counter_id: str, path: Path, data: Dict, amount: int) -> bool:
+        """
+        Create the document at path and add amount to the counter. False if a
+        document at the same path is already waiting (nothing is queued then).
+        """
+        with self._lock:
+            documents = self._counted.setdefault((kind, counter_id), {})
+            if path in documents:
+                return False
+            if documents:
+                self.stats["coalesced"] += 1
+            documents[path] = (data, amount, time.monotonic())
+            self._depth += 1
+            self._accepted()
+        return True
+
+    def pending_amount(self, kind: str, counter_id: str) -> int:
+        """Sum of the amounts still waiting for this counter"""
+        with self._lock:
+            return sum(amount for _, amount, _ in self._counted.get((kind, counter_id), {}).values())
+
+    def _accepted(self):
+        self.stats["accepted"] += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if self._depth >= self.max_pending:
+            self._wake.set()
+        if not self.running:
+            self.start()
+
+    # =========================================
+    # FLUSH
+    # =========================================
+
+    def flush(self) -> int:
+        """Commit everything pending now; returns the number of writes committed"""
+        with self._flush_lock:
+            with self._lock:
+                latest, self._latest = self._latest, {}
+                counted, self._counted = self._counted, {}
+                self._depth = 0
+                self._oldest = None
+            if not latest and not counted:
+                return 0
+
+            start = time.perf_counter()
+            written = sum(self._commit_units(batch) for batch in self._batches(latest, counted))
+            self._latencies.append(time.perf_counter() - start)
+            self.stats["flushes"] += 1
+            self.last_flush_at = time.time()
+            return written
+
+    def _units(self, latest, counted) -> Iterator[_Unit]:
+        for key, (path, data) in latest.items():
+            yield _Unit([("set", path, data)], key=key)
+        for (kind, counter_id), documents in counted.items():
+            items = [(path, *document) for path, document in documents.items()]
+            # Each chunk carries its own counter write, so it can commit on its own
+            step = self.batch_size - 1
+            for i in range(0, len(items), step):
+                chunk = items[i:i + step]
+                writes = [("create", path, data) for path, data, _, _ in chunk]
+                amount = sum(amount for _, _, amount, _ in chunk)
+                writes.append(self._counter_writers[kind](counter_id, amount, len(chunk)))
+                yield _Unit(writes, counter=(kind, counter_id), documents=chunk)
+
+    def _batches(self, latest, counted) -> Iterator[List[_Unit]]:
+        batch, size = [], 0
+        for unit in self._units(latest, counted):
+            if size + len(unit.writes) > self.batch_size:
+                yield batch
+                batch, size = [], 0
+            batch.append(unit)
+            size += len(unit.writes)
+        if batch:
+            yield batch
+
+    def _commit_units(self, units: List[_Unit]) -> int:
+        writes = [write for unit in units for write in unit.writes]
+        try:
+            self._commit(writes)
+        except AlreadyExistsError:
+            return self._commit_one_by_one(units)
+        except Exception as e:
+            print(f"Write-behind batch failed, retrying on the next flush: {e}")
+            self.stats["errors"] += 1
+            self._requeue(units)
+            return 0
+        self.stats["batches"] += 1
+        self.stats["writes"] += len(writes)
+        return len(writes)
+
+    def _commit_one_by_one(self, units: List[_Unit]) -> int:
+        """Retry a batch that hit an existing document, dropping only the documents that exist"""
+        written = 0
+        for unit in units:
+            if unit.documents is None:
+                singles = [(unit, unit.writes)]
+            else:
+                kind, counter_id = unit.counter
+                writer = self._counter_writers[kind]
+                singles = [
+                    (_Unit([], counter=unit.counter, documents=[document]),
+                     [("create", document[0], document[1]), writer(counter_id, document[2], 1)])
+                    for document in unit.documents
+                ]
+            for single, writes in singles:
+                try:
+                    self._commit(writes)
+                    self.stats["batches"] += 1
+                    self.stats["writes"] += len(writes)
+                    written += len(writes)
+                except AlreadyExistsError:
+                    self.stats["duplicates"] += 1
+                    self._duplicate(single)
+                except Exception as e:
+                    print(f"Write-behind write failed, retrying on the next flush: {e}")
+                    self.stats["errors"] += 1
+                    self._requeue([single])
+        return written
+
+    def _duplicate(self, unit: _Unit):
+        kind, counter_id = unit.counter
+        callback = self._duplicate_callbacks.get(kind)
+        if callback:
+            _, _, amount, queued_at = unit.documents[0]
+            try:
+                callback(counter_id, amount, queued_at)
+            except Exception as e:
+                print(f"Write-behind duplicate callback failed: {e}")
+
+    def _requeue(self, units: List[_Unit]):
+        """Put failed writes back, behind anything newer queued meanwhile"""
+        with self._lock:
+            for unit in units:
+                if unit.documents is None:
+                    _, path, data = unit.writes[0]
+                    if unit.key not in self._latest:
+                        self._latest[unit.key] = (path, data)
+                        self._depth += 1
+                else:
+                    documents = self._counted.setdefault(unit.counter, {})
+                    for path, data, amount, queued_at in unit.documents:
+                        if path not in documents:
+                            documents[path] = (data, amount, queued_at)
+                            self._depth += 1
+            if self._depth and self._oldest is None:
+                self._oldest = time.monotonic()
+
+    # =========================================
+    # BACKGROUND THREAD
+    # =========================================
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start flushing in the background (done on the first enqueue); drains at exit"""
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            if not self._exit_hook:
+                atexit.register(self.stop)
+                self._exit_hook = True
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """Stop the flush thread and drain what is still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+        # A few rounds, in case a failed batch was put back
+        for _ in range(3):
+            if not self._depth:
+                break
+            self.flush()
+        if self._depth:
+            print(f"Write-behind: {self._depth} writes could not be flushed at shutdown")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Write-behind flush failed: {e}")
+
+    # =========================================
+    # METRICS
+    # =========================================
+
+    def status(self) -> Dict:
+        latencies = sorted(self._latencies)
+        oldest = self._oldest
+        return {
+            "enabled": WRITE_BEHIND_ENABLED,
+            "running": self.running,
+            "depth": self._depth,
+            "oldest_pending_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else None,
+            "flush_interval_seconds": self.interval,
+            "max_pending": self.max_pending,
+            **self.stats,
+            "last_flush_at": self.last_flush_at,
+            "last_flush_ms": round(self._latencies[-1] * 1000, 1) if latencies else None,
+            "flush_p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+            "flush_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else None,
+        }
+
+
+# Global instance
+write_behind = WriteBehindQueue(firebase.commit)